@@ -0,0 +1,164 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+
+from check_balance import get_account_resources
+from check_block import get_latest_block_height
+from check_transaction import get_tx_events, get_event_account
+from query import normalize_addr
+from rpc_client import record_cache
+
+# Whole-account state: every resource of an account in one paginated listing (check_balance.get_account_resources),
+# parsed into typed records, and kept in memory for the rest of the run, e.g.
+#   loader = AccountStateLoader(base_url)
+#   loader.load(addr).balance, loader.load(addr).multisig.owners    # one listing for both
+#   follower.add_sink(loader.on_block)                               # chain_follower.ChainFollower
+# An entry records the height it was fetched at (the node's head, read just before the listing, so the state is at
+# least that new) and the account's version, which `invalidate` bumps. As a follower sink the loader invalidates
+# every account a block touches (transaction senders and accounts of emitted events), so a cached state is never
+# older than the last block that changed the account. Without a follower, entries live until `invalidate` or `clear`.
+#
+# Reads can also ask for state at least as new as a height: `load(addr, min_height=h)` refetches entries fetched
+# below `h`. A fetch costs one extra request for the head height; `load_many` reads it once for all its fetches.
+
+COIN_STORE = "0x1::coin::CoinStore<0x1::supra_coin::SupraCoin>"
+MULTISIG_RESOURCE = "0x1::multisig_account::MultisigAccount"
+ACCOUNT_RESOURCE = "0x1::account::Account"
+
+
+@dataclass(frozen=True)
+class AccountResource:
+    sequence_number: int
+    authentication_key: str
+
+
+@dataclass(frozen=True)
+class CoinStore:
+    value: int
+    frozen: bool
+
+
+@dataclass(frozen=True)
+class MultisigAccountResource:
+    owners: tuple[str, ...]
+    num_signatures_required: int
+    last_executed_sequence_number: int
+    next_sequence_number: int
+
+
+RESOURCE_PARSERS: dict[str, Callable[[dict], object]] = {
+    ACCOUNT_RESOURCE: lambda d: AccountResource(int(d["sequence_number"]), d["authentication_key"]),
+    COIN_STORE: lambda d: CoinStore(int(d["coin"]["value"]), bool(d.get("frozen", False))),
+    MULTISIG_RESOURCE: lambda d: MultisigAccountResource(
+        tuple(d["owners"]), int(d["num_signatures_required"]), int(d["last_executed_sequence_number"]),
+        int(d["next_sequence_number"])),
+}
+
+
+@dataclass
+class AccountState:
+    address: str
+    exists: bool
+    height: int
+    version: int
+    # Raw resource data by type; typed records are parsed on first access.
+    resources: dict[str, dict] = field(default_factory=dict)
+    parsed: dict[str, object] = field(default_factory=dict, repr=False)
+
+    def resource(self, resource_type: str):
+        # The typed record of a resource (the raw dict for types without a parser), or None when absent.
+        if resource_type not in self.parsed:
+            data = self.resources.get(resource_type)
+            parser = RESOURCE_PARSERS.get(resource_type)
+            self.parsed[resource_type] = parser(data) if data is not None and parser is not None else data
+        return self.parsed[resource_type]
+
+    @property
+    def account(self) -> AccountResource | None:
+        return self.resource(ACCOUNT_RESOURCE)
+
+    @property
+    def coin_store(self) -> CoinStore | None:
+        return self.resource(COIN_STORE)
+
+    @property
+    def multisig(self) -> MultisigAccountResource | None:
+        return self.resource(MULTISIG_RESOURCE)
+
+    @property
+    def balance(self) -> int:
+        return self.coin_store.value if self.coin_store is not None else 0
+
+    @property
+    def sequence_number(self) -> int:
+        return self.account.sequence_number if self.account is not None else 0
+
+
+class AccountStateLoader:
+    def __init__(self, base_url: str, max_workers: int = 16):
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.states: dict[str, AccountState] = {}
+        self.versions: dict[str, int] = {}
+
+    def cached(self, addr: str, min_height: int = None) -> AccountState | None:
+        with self.lock:
+            state = self.states.get(addr)
+        fresh = state is not None and (min_height is None or state.height >= min_height)
+        record_cache("account_state", fresh)
+        return state if fresh else None
+
+    def load(self, addr: str, min_height: int = None) -> AccountState:
+        addr = normalize_addr(str(addr))
+        return self.cached(addr, min_height) or self.fetch(addr, get_latest_block_height(self.base_url))
+
+    def fetch(self, addr: str, height: int) -> AccountState:
+        # `height` is the node's head read before calling, which the listing is at least as new as.
+        with self.lock:
+            version = self.versions.get(addr, 0)
+        resources = get_account_resources(self.base_url, "0x" + addr[2:].zfill(64))
+        state = AccountState(addr, resources is not None, height, version, resources or {})
+        with self.lock:
+            # An invalidation while fetching means the result may predate the change; return it, but do not keep it.
+            if self.versions.get(addr, 0) == version:
+                self.states[addr] = state
+        return state
+
+    def load_many(self, addrs: list[str], min_height: int = None) -> dict[str, AccountState]:
+        cached = {addr: self.cached(addr, min_height) for addr in dict.fromkeys(normalize_addr(str(a)) for a in addrs)}
+        states = [state for state in cached.values() if state is not None]
+        stale = [addr for addr, state in cached.items() if state is None]
+        if stale:
+            height = get_latest_block_height(self.base_url)
+            with ThreadPoolExecutor(self.max_workers) as executor:
+                states += executor.map(lambda addr: self.fetch(addr, height), stale)
+        return {state.address: state for state in states}
+
+    def invalidate(self, addr: str) -> None:
+        addr = normalize_addr(str(addr))
+        with self.lock:
+            self.versions[addr] = self.versions.get(addr, 0) + 1
+            self.states.pop(addr, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            for addr in self.states:
+                self.versions[addr] = self.versions.get(addr, 0) + 1
+            self.states.clear()
+
+    def on_block(self, height: int, txs: list[dict]) -> None:
+        # Follower sink: invalidates the accounts this block touched.
+        touched = set()
+        for tx in txs or []:
+            if "header" in tx:
+                touched.add(normalize_addr(tx["header"]["sender"]["Move"]))
+            for event in get_tx_events(tx):
+                account = get_event_account(event)
+                if account:
+                    touched.add(normalize_addr(account))
+        with self.lock:
+            for addr in touched:
+                self.versions[addr] = self.versions.get(addr, 0) + 1
+                self.states.pop(addr, None)
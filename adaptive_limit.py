@@ -0,0 +1,83 @@
+import threading
+import time
+
+from metrics import registry
+
+# AIMD concurrency limit for one class of RPC calls. While latency stays near its baseline, the limit grows by one
+# per `limit` successful calls, or by one per call until the first cut, to find the node's capacity quickly. A 429,
+# a 5xx or a transport error halves it; a latency spike (over `latency_tolerance` times the baseline) cuts it by a
+# fifth. It is cut at most once per baseline latency, so one burst of failures from the same overloaded moment
+# counts once. A Retry-After pauses every new call of the budget until it passes.
+#
+# The baseline follows the fastest recent latencies: it drops to any faster call at once and rises slowly, so a
+# sustained slowdown becomes the new normal instead of cutting the limit forever.
+
+OK = "ok"
+THROTTLED = "throttled"
+ERROR = "error"
+
+
+class AdaptiveLimiter:
+    def __init__(self,
+                 name: str,
+                 initial: int = 8,
+                 min_limit: int = 1,
+                 max_limit: int = 64,
+                 latency_tolerance: float = 3.0):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.baseline_sec: float | None = None
+        self.paused_until = 0.0
+        self.last_cut = 0.0
+        self.slow_start = True
+        self.window_start = time.monotonic()
+        self.window_completed = 0
+        self.condition = threading.Condition()
+        self.publish()
+
+    def acquire(self) -> None:
+        with self.condition:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self.condition.wait(wait if wait > 0 else None)
+
+    def release(self, latency_sec: float, outcome: str = OK, retry_after_sec: float = None) -> None:
+        now = time.monotonic()
+        with self.condition:
+            self.in_flight -= 1
+            baseline = self.baseline_sec
+            if outcome == OK:
+                if baseline is None or latency_sec < baseline:
+                    self.baseline_sec = latency_sec
+                else:
+                    self.baseline_sec = baseline + 0.01 * (latency_sec - baseline)
+            if retry_after_sec:
+                self.paused_until = max(self.paused_until, now + retry_after_sec)
+            spike = outcome == OK and baseline is not None and latency_sec > self.latency_tolerance * baseline
+            if outcome != OK or spike:
+                if now - self.last_cut >= (baseline or 0):
+                    self.limit = max(self.min_limit, self.limit * (0.8 if spike else 0.5))
+                    self.last_cut = now
+                    self.slow_start = False
+                    registry.inc("supra_rpc_limit_cuts_total", budget=self.name, reason="latency" if spike else outcome)
+            elif self.in_flight + 1 >= int(self.limit):
+                # Only grow while the limit is actually used, else an idle budget would climb to the maximum.
+                self.limit = min(self.max_limit, self.limit + (1 if self.slow_start else 1 / self.limit))
+            self.window_completed += 1
+            self.condition.notify_all()
+            self.publish(now)
+
+    def publish(self, now: float = None) -> None:
+        registry.set("supra_rpc_concurrency_limit", int(self.limit), budget=self.name)
+        registry.set("supra_rpc_in_flight", self.in_flight, budget=self.name)
+        if now is not None and now - self.window_start >= 1.0:
+            registry.set("supra_rpc_throughput_per_second", self.window_completed / (now - self.window_start),
+                         budget=self.name)
+            self.window_start, self.window_completed = now, 0
@@ -0,0 +1,248 @@
+import argparse
+import csv
+from array import array
+from itertools import chain
+from dataclasses import dataclass, field
+from typing import Iterable
+
+import numpy as np
+
+from account_state import AccountStateLoader
+from check_block import get_latest_block_height
+from check_transaction import get_tx_events, get_event_account
+from query import normalize_addr, read_blocks
+
+# SUPRA balance history of a set of accounts over a height range, rebuilt from the transactions of every block: coin
+# deposit and withdraw events, and the gas fee (gas_used * gas_unit_price) charged to each transaction's sender,
+# failed ones included. Blocks come from a local block file (query.save_blocks or the chain follower's NDJSON sink)
+# and/or the node through decode_pool, whose worker processes reduce each block to (account, delta) pairs.
+#
+# Deltas are collected into flat arrays and accumulated in NumPy only at the end: sorted by account and height,
+# summed per block, and turned into balances backwards from each account's current on-chain balance, e.g.
+#   builder = BalanceHistoryBuilder(addrs)
+#   for height, txs in query.read_blocks("blocks.jsonl.gz"): builder.add_block(height, txs)
+#   histories = builder.build(current_balances)
+# Since the anchor is the current balance, the scan must reach the head. The history holds one point per block that
+# changed the balance; a negative balance anywhere means the blocks missed some of the account's changes.
+#
+# Handle-based coin events do not name their coin; deposits and withdrawals of other coins through CoinStore event
+# handles are counted as SUPRA.
+
+WITHDRAW_EVENTS = ("::WithdrawEvent", "::CoinWithdraw")
+DEPOSIT_EVENTS = ("::DepositEvent", "::CoinDeposit")
+SUPRA_COIN = "0x1::supra_coin::SupraCoin"
+
+
+@dataclass
+class BlockDeltas:
+    height: int
+    timestamp_us: int
+    accounts: list[str] = field(default_factory=list)
+    amounts: array = field(default_factory=lambda: array("q"))
+
+
+@dataclass
+class BalanceHistory:
+    address: str
+    # Balance before the first scanned height.
+    opening: int
+    heights: np.ndarray
+    timestamps_us: np.ndarray
+    deltas: np.ndarray
+    # Balance at the end of each block in `heights`.
+    balances: np.ndarray
+
+    @property
+    def consistent(self) -> bool:
+        return self.opening >= 0 and not (self.balances < 0).any()
+
+
+def tx_deltas(height: int, txs: list[dict]) -> BlockDeltas:
+    deltas = BlockDeltas(height, 0)
+    for tx in txs or []:
+        if not deltas.timestamp_us:
+            timestamp = (tx.get("block_header") or {}).get("timestamp") or {}
+            deltas.timestamp_us = int(timestamp.get("microseconds_since_unix_epoch", 0))
+        header = tx.get("header") or {}
+        output = (tx.get("output") or {}).get("Move") or {}
+        fee = int(output.get("gas_used", 0)) * int(header.get("gas_unit_price", 0))
+        if fee:
+            deltas.accounts.append(normalize_addr(header["sender"]["Move"]))
+            deltas.amounts.append(-fee)
+        for event in get_tx_events(tx):
+            event_type = event.get("type", "")
+            sign = -1 if event_type.endswith(WITHDRAW_EVENTS) else 1 if event_type.endswith(DEPOSIT_EVENTS) else 0
+            data = event.get("data") or {}
+            if not sign or data.get("coin_type", SUPRA_COIN) != SUPRA_COIN:
+                continue
+            deltas.accounts.append(normalize_addr(get_event_account(event)))
+            deltas.amounts.append(sign * int(data.get("amount", 0)))
+    return deltas
+
+
+def block_deltas(height: int, block: dict) -> BlockDeltas:
+    # decode_pool converter (runs in a worker process).
+    return tx_deltas(height, block.get("transactions"))
+
+
+class BalanceHistoryBuilder:
+    def __init__(self, addrs: Iterable[str]):
+        self.tracked = np.array(sorted({normalize_addr(a) for a in addrs}))
+        self.account_chunks: list[np.ndarray] = []
+        self.height_chunks: list[np.ndarray] = []
+        self.amount_chunks: list[np.ndarray] = []
+        self.pending: list[BlockDeltas] = []
+        self.pending_size = 0
+        self.block_heights = array("q")
+        self.block_timestamps = array("q")
+
+    def add_block(self, height: int, txs: list[dict]) -> None:
+        self.add(tx_deltas(height, txs))
+
+    def add(self, deltas: BlockDeltas) -> None:
+        if not deltas.accounts:
+            return
+        self.block_heights.append(deltas.height)
+        self.block_timestamps.append(deltas.timestamp_us)
+        self.pending.append(deltas)
+        self.pending_size += len(deltas.accounts)
+        if self.pending_size >= 100_000:
+            self.flush()
+
+    def flush(self) -> None:
+        # Keeps only the deltas of tracked accounts, as account indexes into `tracked`.
+        if not self.pending:
+            return
+        accounts = np.array([a for d in self.pending for a in d.accounts])
+        heights = np.repeat(np.array([d.height for d in self.pending], dtype=np.int64),
+                            [len(d.accounts) for d in self.pending])
+        amounts = np.concatenate([np.frombuffer(d.amounts, dtype=np.int64) for d in self.pending])
+        self.pending, self.pending_size = [], 0
+        if not len(self.tracked):
+            return
+        idx = np.searchsorted(self.tracked, accounts).clip(max=len(self.tracked) - 1)
+        mask = self.tracked[idx] == accounts
+        self.account_chunks.append(idx[mask])
+        self.height_chunks.append(heights[mask])
+        self.amount_chunks.append(amounts[mask])
+
+    def build(self, anchors: dict[str, int]) -> dict[str, BalanceHistory]:
+        # `anchors` are the balances at the end of the last added block, by address.
+        self.flush()
+        empty = np.zeros(0, dtype=np.int64)
+        idx = np.concatenate(self.account_chunks) if self.account_chunks else empty
+        heights = np.concatenate(self.height_chunks) if self.height_chunks else empty
+        amounts = np.concatenate(self.amount_chunks) if self.amount_chunks else empty
+
+        order = np.lexsort((heights, idx))
+        idx, heights, amounts = idx[order], heights[order], amounts[order]
+        # One point per (account, block).
+        starts = np.flatnonzero(np.r_[True, (idx[1:] != idx[:-1]) | (heights[1:] != heights[:-1])]) \
+            if len(idx) else empty
+        idx, heights, amounts = idx[starts], heights[starts], np.add.reduceat(amounts, starts) if len(idx) else empty
+
+        # Balance after a point = anchor - the sum of the account's later deltas, from integer prefix sums (amounts
+        # can exceed the exact range of floats).
+        anchor = np.array([int(anchors.get(a, 0)) for a in self.tracked], dtype=np.int64)
+        bounds = np.searchsorted(idx, np.arange(len(self.tracked) + 1))
+        prefix = np.r_[0, np.cumsum(amounts)].astype(np.int64)
+        totals = prefix[bounds[1:]] - prefix[bounds[:-1]]
+        balances = anchor[idx] - (prefix[bounds[1:]][idx] - prefix[1:])
+
+        block_heights = np.frombuffer(self.block_heights, dtype=np.int64)
+        block_order = np.argsort(block_heights)
+        timestamps = np.frombuffer(self.block_timestamps, dtype=np.int64)[block_order][
+            np.searchsorted(block_heights[block_order], heights)] if len(heights) else empty
+
+        return {
+            str(addr): BalanceHistory(str(addr), int(anchor[i] - totals[i]), heights[lo:hi], timestamps[lo:hi], amounts[lo:hi],
+                                 balances[lo:hi])
+            for i, (addr, lo, hi) in enumerate(zip(self.tracked, bounds[:-1], bounds[1:]))
+        }
+
+
+def missing_ranges(covered: bytearray, start: int) -> list[tuple[int, int]]:
+    # [(first, last)] runs of heights from `start` whose flag in `covered` is not set.
+    ranges = []
+    i = covered.find(0)
+    while i != -1:
+        j = covered.find(1, i)
+        j = len(covered) if j == -1 else j
+        ranges.append((start + i, start + j - 1))
+        i = covered.find(0, j)
+    return ranges
+
+
+def reconstruct(base_url: str,
+                addrs: list[str],
+                start: int,
+                blocks_file: str = None,
+                fetch_workers: int = 8,
+                decode_workers: int = None) -> tuple[dict[str, BalanceHistory], set[str]]:
+    # Rebuilds the history from `start` to the head: blocks from `blocks_file` first, the rest from the node.
+    # Also returns the accounts that changed while their current balance was read, whose anchor is uncertain.
+    builder = BalanceHistoryBuilder(addrs)
+    before = get_latest_block_height(base_url)
+    anchors = {addr: state.balance for addr, state in AccountStateLoader(base_url).load_many(addrs).items()}
+    head = get_latest_block_height(base_url)
+
+    # Every height in [start, head] is added exactly once: a block file may start late, have holes, or repeat blocks
+    # (the chain follower's sink is at-least-once), so the heights it lacks are fetched and its repeats skipped.
+    covered = bytearray(head - start + 1) if head >= start else bytearray()
+    if blocks_file:
+        for height, txs in read_blocks(blocks_file):
+            if start <= height <= head and not covered[height - start]:
+                covered[height - start] = 1
+                builder.add_block(height, txs)
+    missing = missing_ranges(covered, start)
+    if missing:
+        from decode_pool import decode_ordered
+        from scan_blocks import get_block_bytes, iter_ordered
+
+        fetched = chain.from_iterable(iter_ordered(lambda h: get_block_bytes(base_url, h), lo, hi, fetch_workers)
+                                      for lo, hi in missing)
+        for _, deltas in decode_ordered(fetched, block_deltas, decode_workers):
+            builder.add(deltas)
+
+    histories = builder.build(anchors)
+    uncertain = {addr for addr, h in histories.items() if len(h.heights) and h.heights[-1] > before}
+    return histories, uncertain
+
+
+def write_histories(file_path: str, histories: dict[str, BalanceHistory], start: int) -> None:
+    # One opening row per account (the balance at the end of block start - 1), then one row per change.
+    with open(file_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["address", "height", "timestamp_us", "delta", "balance"])
+        for addr, h in histories.items():
+            writer.writerow([addr, start - 1, "", 0, h.opening])
+            writer.writerows(zip([addr] * len(h.heights), h.heights.tolist(), h.timestamps_us.tolist(),
+                                 h.deltas.tolist(), h.balances.tolist()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the SUPRA balance history of accounts from block data.")
+    parser.add_argument("addresses", nargs="*", help="account addresses")
+    parser.add_argument("--addresses-file", help="file with one address per line")
+    parser.add_argument("--url", default="https://rpc-testnet.supra.com")
+    parser.add_argument("--start", type=int, required=True, help="first height of the history")
+    parser.add_argument("--blocks-file", help="local block file (query.save_blocks format) covering the range")
+    parser.add_argument("--workers", type=int, default=8, help="block fetch threads")
+    parser.add_argument("--decode-workers", type=int, help="block decode processes (default: one per core)")
+    parser.add_argument("--output", default="balance_history.csv")
+    args = parser.parse_args()
+
+    addrs = list(args.addresses)
+    if args.addresses_file:
+        with open(args.addresses_file) as f:
+            addrs += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    histories, uncertain = reconstruct(args.url.rstrip("/"), addrs, args.start, args.blocks_file, args.workers,
+                                       args.decode_workers)
+    write_histories(args.output, histories, args.start)
+    points = sum(len(h.heights) for h in histories.values())
+    print(f"{len(histories)} accounts, {points} balance changes written to {args.output}")
+    inconsistent = [addr for addr, h in histories.items() if not h.consistent]
+    if inconsistent:
+        print(f"{len(inconsistent)} accounts go negative, the blocks miss some of their changes:", *inconsistent[:10])
+    if uncertain:
+        print(f"{len(uncertain)} accounts changed while their balance was read, rerun to confirm:", *sorted(uncertain))
@@ -0,0 +1,185 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from aptos_sdk.account import Account
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.transactions import EntryFunction
+
+from check_transaction import wait_for_txs
+from derive_keys import load_multiple_private_keys
+from dry_run import dry_run, print_dry_run_summary
+from gas_estimator import GasEstimator, gas_key
+from execute_multisig_tx import create_multisig, create_remove_multisig_tx_entry_func
+from multisig_snapshot import MultisigSnapshot, ViewCallPool, get_multisig_snapshot
+from transfer_supra import SequenceAllocator, create_transfer_supra_entry_func, send_tx
+from vote_multisig_tx import create_vote_multisig_tx_entry_func
+
+
+@dataclass(frozen=True)
+class VoteDecision:
+    multisig_addr: str
+    seq: int
+    approve: bool
+    # The proposed entry function. Required to execute proposals created with `create_transaction_with_hash`; an
+    # approved head proposal without it is reported in `failed_submissions` and blocks the queue behind it.
+    payload: EntryFunction | None = None
+
+
+@dataclass
+class BatchResult:
+    vote_statuses: dict[str, str] = field(default_factory=dict)
+    execution_statuses: dict[str, str] = field(default_factory=dict)
+    failed_submissions: list[str] = field(default_factory=list)
+
+
+def normalize_addr(addr: str | AccountAddress) -> str:
+    return str(AccountAddress.from_str_relaxed(str(addr)))
+
+
+def get_snapshots(base_url: str, multisig_addrs: set[str], max_workers: int) -> dict[str, MultisigSnapshot]:
+    with ViewCallPool(base_url, max_workers) as pool, ThreadPoolExecutor(max_workers) as executor:
+        addrs = sorted(multisig_addrs)
+        snapshots = executor.map(
+            lambda addr: get_multisig_snapshot(base_url, AccountAddress.from_str_relaxed(addr), pool), addrs)
+        return dict(zip(addrs, snapshots))
+
+
+def submit_all(base_url: str,
+               allocator: SequenceAllocator,
+               txs: list[tuple[Account, object]],
+               max_workers: int,
+               result: BatchResult,
+               simulate_first: bool = False,
+               estimator: GasEstimator = None) -> list[str]:
+    # With simulate_first, the whole stage is simulated concurrently up front: failing rows are not submitted and
+    # the others get a max_gas derived from their simulated gas use. Otherwise max_gas comes from the estimator,
+    # if one is given and knows the kind of transaction.
+    max_gases = [500_000] * len(txs)
+    keys = [None] * len(txs)
+    if estimator is not None and not simulate_first:
+        with ThreadPoolExecutor(max_workers) as executor:
+            exists_cache = {}
+            keys = list(executor.map(lambda tx: gas_key(base_url, tx[1], exists_cache), txs))
+        max_gases = [estimator.estimate_key(key) or 500_000 for key in keys]
+    if simulate_first and txs:
+        simulations = dry_run(base_url, txs, max_workers, estimator=estimator)
+        print_dry_run_summary(simulations)
+        for r in simulations:
+            if not r.success:
+                result.failed_submissions.append(f"{r.sender}: simulation failed with {r.vm_status}")
+        txs = [tx for tx, r in zip(txs, simulations) if r.success]
+        max_gases = [r.max_gas for r in simulations if r.success]
+        keys = [None] * len(txs)
+
+    def submit_one(tx: tuple[Account, object], max_gas: int, key: str) -> str:
+        sender_account, payload = tx
+        sender_addr = str(sender_account.address())
+        seq = allocator.allocate(sender_addr)
+        tx_hash = send_tx(base_url, sender_account, payload, max_gas, sequence_number=seq, simulate=False)
+        if not tx_hash.startswith("0x"):
+            # The sequence number was not consumed; give it back rather than re-reading the chain, which would
+            # hand out again the numbers of this sender's transactions still in flight.
+            allocator.release(sender_addr, seq)
+            result.failed_submissions.append(f"{sender_addr}: {tx_hash}")
+            return ""
+        if estimator is not None and key is not None:
+            estimator.track(tx_hash, key)
+        return tx_hash
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        return [tx_hash for tx_hash in executor.map(submit_one, txs, max_gases, keys) if tx_hash]
+
+
+def vote_and_execute(base_url: str,
+                     decisions: list[VoteDecision],
+                     owner_accounts: list[Account],
+                     max_workers: int = 16,
+                     wait_repeat: int = 10,
+                     wait_interval_sec: int = 3,
+                     max_execution_rounds: int = 10,
+                     simulate_first: bool = False,
+                     estimator: GasEstimator = None) -> BatchResult:
+    result = BatchResult()
+    allocator = SequenceAllocator(base_url)
+    accounts_by_addr = {normalize_addr(account.address()): account for account in owner_accounts}
+    decisions = [VoteDecision(normalize_addr(d.multisig_addr), d.seq, d.approve, d.payload) for d in decisions]
+    multisig_addrs = {d.multisig_addr for d in decisions}
+
+    # Step 1: every owner we hold a key for votes on every decision it has not voted on yet.
+    snapshots = get_snapshots(base_url, multisig_addrs, max_workers)
+    votes = []
+    for d in decisions:
+        snapshot = snapshots[d.multisig_addr]
+        if d.seq not in snapshot.pending_seqs:
+            print(f"Multisig {d.multisig_addr} seq {d.seq} is not pending, skipping.")
+            continue
+        for owner_addr in snapshot.owners:
+            if owner_addr in accounts_by_addr and not snapshot.has_voted(d.seq, owner_addr):
+                entry_func = create_vote_multisig_tx_entry_func(
+                    AccountAddress.from_str_relaxed(d.multisig_addr), d.seq, d.approve)
+                votes.append((accounts_by_addr[owner_addr], entry_func))
+    print(f"Submitting {len(votes)} votes.")
+    vote_hashes = submit_all(base_url, allocator, votes, max_workers, result, simulate_first, estimator)
+    result.vote_statuses = wait_for_txs(base_url, vote_hashes, wait_repeat, wait_interval_sec, max_workers)
+    if estimator is not None:
+        estimator.learn_from_confirmed(base_url, vote_hashes)
+
+    # Step 2: resolve proposals in queue order. Each round resolves at most the head proposal of every
+    # multisig account, since the next one can only be resolved once the head is.
+    decisions_by_seq = {(d.multisig_addr, d.seq): d for d in decisions}
+    missing_payloads = set()
+    for _ in range(max_execution_rounds):
+        snapshots = get_snapshots(base_url, multisig_addrs, max_workers)
+        executions = []
+        for addr, snapshot in snapshots.items():
+            head = snapshot.last_resolved_seq + 1
+            d = decisions_by_seq.get((addr, head))
+            if d is None:
+                continue
+            executor_account = next((accounts_by_addr[o] for o in snapshot.owners if o in accounts_by_addr), None)
+            if executor_account is None:
+                continue
+            multisig_addr = AccountAddress.from_str_relaxed(addr)
+            if d.approve and d.payload is None:
+                if (addr, head) not in missing_payloads:
+                    missing_payloads.add((addr, head))
+                    result.failed_submissions.append(
+                        f"{addr} seq {head}: approved without a payload, not executed; later proposals stay queued")
+            elif d.approve and snapshot.can_be_executed(head):
+                executions.append((executor_account, create_multisig(multisig_addr, d.payload)))
+            elif not d.approve and snapshot.rejections(head) >= snapshot.threshold:
+                executions.append((executor_account, create_remove_multisig_tx_entry_func(multisig_addr)))
+        if not executions:
+            break
+        print(f"Submitting {len(executions)} executions.")
+        execution_hashes = submit_all(base_url, allocator, executions, max_workers, result, simulate_first,
+                                      estimator)
+        result.execution_statuses.update(
+            wait_for_txs(base_url, execution_hashes, wait_repeat, wait_interval_sec, max_workers))
+        if estimator is not None:
+            estimator.learn_from_confirmed(base_url, execution_hashes)
+    if estimator is not None:
+        estimator.save()
+    return result
+
+
+if __name__ == "__main__":
+    is_testnet = True
+    base_url = "https://rpc-testnet1.supra.com/" if is_testnet else "https://rpc-mainnet.supra.com"
+    mnemonic_file = "mnemonic_multisig.enc" if is_testnet else "mnemonic_multisig_mainnet.enc"
+
+    private_keys = load_multiple_private_keys(mnemonic_file, 5)
+    owners = [Account.load_key(private_key.hex()) for private_key in private_keys]
+
+    multisig_addr = "0xadf39402c164a372a788358b7c8e695ae794d8f787ad36464708c8eb1f3a64a9"
+    # The transfer proposed as seq 2, needed to execute it.
+    recipient_addr = "0xb8922417130785087f9c7926e76542531b703693fdc74c9386b65cf4427f4e80"
+    entry_func, _ = create_transfer_supra_entry_func(base_url, recipient_addr, 20)
+    decisions = [
+        VoteDecision(multisig_addr, 2, True, entry_func),
+        VoteDecision(multisig_addr, 3, False),
+    ]
+    result = vote_and_execute(base_url, decisions, owners)
+    print("Votes:", result.vote_statuses)
+    print("Executions:", result.execution_statuses)
+    print("Failed submissions:", result.failed_submissions)
@@ -0,0 +1,210 @@
+import argparse
+import csv
+import math
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from aptos_sdk.account import Account
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.bcs import Serializer
+from aptos_sdk.transactions import EntryFunction
+
+from check_balance import account_exists
+from check_transaction import get_transaction_info, get_tx_events, get_event_account, wait_for_txs
+from dry_run import simulate_row
+from query import normalize_addr
+from transfer_supra import SequenceAllocator, create_entry_func, get_account_seq_num, get_chain_id, send_tx
+
+# Payouts packed into as few transactions as possible: each transaction calls 0x1::supra_account::batch_transfer with
+# vectors of recipients and amounts, so K payouts cost one sequence number, one signature and one base fee. Chunks
+# are sized to a max_gas budget from a gas model fitted by three simulations (one and PROBE_SIZE transfers to an
+# existing account, PROBE_SIZE to new accounts), since creating a recipient's account costs far more than a deposit.
+# After inclusion, every payout is checked against the DepositEvents of its transaction.
+#
+# A batch transaction is atomic: if one transfer aborts (e.g. the balance runs out), none of its chunk is paid.
+
+PROBE_SIZE = 8
+# Upper bound of recipients per transaction, to keep transactions well under the size limit.
+MAX_CHUNK = 500
+DEPOSIT_EVENTS = ("::DepositEvent", "::CoinDeposit")
+
+
+@dataclass
+class GasModel:
+    base: int
+    per_existing: int
+    per_new: int
+
+    def cost(self, existing: int, new: int) -> int:
+        return self.base + self.per_existing * existing + self.per_new * new
+
+
+@dataclass
+class PayoutResult:
+    recipient: str
+    amount: int
+    tx_hash: str
+    # deposited, failed (the transaction failed), missing (succeeded without a matching deposit), pending (not yet
+    # included), unknown (the node does not know the transaction, or answered with an error), not_submitted
+    status: str
+    detail: str = ""
+
+
+def create_batch_transfer_entry_func(recipients: list[str], amounts: list[int]) -> EntryFunction:
+    return create_entry_func(
+        "supra_account",
+        "batch_transfer",
+        [[AccountAddress.from_str_relaxed(r) for r in recipients], amounts],
+        [Serializer.sequence_serializer(Serializer.struct), Serializer.sequence_serializer(Serializer.u64)])
+
+
+def fit_gas_model(base_url: str, sender_account: Account, gas_price: int = 100) -> GasModel:
+    # Payouts to the sender itself stand in for existing recipients, fresh addresses for new ones; simulations are
+    # not committed, so neither costs anything.
+    sender = str(sender_account.address())
+    new = [str(Account.generate().address()) for _ in range(PROBE_SIZE)]
+    probes = [[sender], [sender] * PROBE_SIZE, new]
+    seq, chain_id = get_account_seq_num(base_url, sender), get_chain_id(base_url)
+    with ThreadPoolExecutor(len(probes)) as executor:
+        outcomes = list(executor.map(
+            lambda recipients: simulate_row(base_url, sender_account,
+                                            create_batch_transfer_entry_func(recipients, [1] * len(recipients)),
+                                            seq, chain_id, gas_price),
+            probes))
+    for success, vm_status, _ in outcomes:
+        if not success:
+            raise Exception(f"batch_transfer probe simulation failed: {vm_status}")
+    one, many, many_new = (gas_used for _, _, gas_used in outcomes)
+    per_existing = math.ceil((many - one) / (PROBE_SIZE - 1))
+    base = max(0, one - per_existing)
+    return GasModel(base, per_existing, math.ceil((many_new - base) / PROBE_SIZE))
+
+
+def plan_chunks(exists: list[bool], model: GasModel, max_gas: int, margin: float = 0.2,
+                max_chunk: int = MAX_CHUNK) -> list[tuple[list[int], int]]:
+    # Greedy, in payout order: [(row indexes, max_gas)] with every chunk's estimated gas plus margin within max_gas.
+    chunks = []
+    rows, existing, new = [], 0, 0
+    for i, recipient_exists in enumerate(exists):
+        next_existing, next_new = existing + recipient_exists, new + (not recipient_exists)
+        if rows and (len(rows) >= max_chunk or model.cost(next_existing, next_new) * (1 + margin) > max_gas):
+            chunks.append((rows, math.ceil(model.cost(existing, new) * (1 + margin))))
+            rows, next_existing, next_new = [], int(recipient_exists), int(not recipient_exists)
+        rows.append(i)
+        existing, new = next_existing, next_new
+    if rows:
+        chunks.append((rows, math.ceil(model.cost(existing, new) * (1 + margin))))
+    for rows, chunk_gas in chunks:
+        if chunk_gas > max_gas:
+            raise Exception(f"a single payout needs {chunk_gas} gas, over the budget of {max_gas}")
+    return chunks
+
+
+def deposits_of(tx_info: dict) -> Counter:
+    deposits = Counter()
+    for event in get_tx_events(tx_info):
+        if event.get("type", "").endswith(DEPOSIT_EVENTS):
+            deposits[(normalize_addr(get_event_account(event)), int(event.get("data", {}).get("amount", 0)))] += 1
+    return deposits
+
+
+def check_payouts(base_url: str, payouts: list[tuple[str, int]], chunks: list[list[int]], tx_hashes: list[str],
+                  max_workers: int = 16) -> list[PayoutResult]:
+    results = [None] * len(payouts)
+    with ThreadPoolExecutor(max_workers) as executor:
+        infos = list(executor.map(lambda h: get_transaction_info(base_url, h) if h.startswith("0x") else None,
+                                  tx_hashes))
+    for rows, tx_hash, info in zip(chunks, tx_hashes, infos):
+        if info is None:
+            for i in rows:
+                results[i] = PayoutResult(*payouts[i], "", "not_submitted", tx_hash)
+            continue
+        status = info.get("status")
+        if status != "Success":
+            # Only a failed transaction is final; a pending or unknown one may still pay out, so re-sending its
+            # payouts could pay them twice.
+            if status == "Fail":
+                result, detail = "failed", (info.get("output") or {}).get("Move", {}).get("vm_status", status)
+            elif status == "Pending":
+                result, detail = "pending", status
+            else:
+                result, detail = "unknown", status or info.get("message", str(info))
+            for i in rows:
+                results[i] = PayoutResult(*payouts[i], tx_hash, result, detail)
+            continue
+        deposits = deposits_of(info)
+        for i in rows:
+            key = (normalize_addr(payouts[i][0]), payouts[i][1])
+            if deposits[key]:
+                deposits[key] -= 1
+                results[i] = PayoutResult(*payouts[i], tx_hash, "deposited")
+            else:
+                results[i] = PayoutResult(*payouts[i], tx_hash, "missing", "no matching DepositEvent")
+    return results
+
+
+def send_payouts(base_url: str,
+                 sender_account: Account,
+                 payouts: list[tuple[str, int]],
+                 max_gas: int = 500_000,
+                 margin: float = 0.2,
+                 gas_price: int = 100,
+                 max_workers: int = 16,
+                 wait_repeat: int = 60,
+                 wait_interval_sec: float = 1.0) -> list[PayoutResult]:
+    with ThreadPoolExecutor(max_workers) as executor:
+        exists = list(executor.map(lambda payout: account_exists(base_url, payout[0]), payouts))
+    model = fit_gas_model(base_url, sender_account, gas_price)
+    chunks = plan_chunks(exists, model, max_gas, margin)
+    print(f"{len(payouts)} payouts ({exists.count(False)} to new accounts) in {len(chunks)} transactions, "
+          f"gas model {model}")
+
+    sender = str(sender_account.address())
+    allocator = SequenceAllocator(base_url)
+
+    def submit_chunk(chunk: tuple[list[int], int]) -> str:
+        rows, chunk_gas = chunk
+        payload = create_batch_transfer_entry_func([payouts[i][0] for i in rows], [payouts[i][1] for i in rows])
+        seq = allocator.allocate(sender)
+        tx_hash = send_tx(base_url, sender_account, payload, chunk_gas, gas_price, seq, simulate=False)
+        if not tx_hash.startswith("0x"):
+            allocator.release(sender, seq)
+        return tx_hash
+
+    # Submitted in order, so the sequence number of a rejected chunk is always the last one handed out, and the next
+    # chunk reuses it instead of leaving a gap.
+    tx_hashes = [submit_chunk(chunk) for chunk in chunks]
+    wait_for_txs(base_url, [h for h in tx_hashes if h.startswith("0x")], wait_repeat, wait_interval_sec, max_workers)
+    return check_payouts(base_url, payouts, [rows for rows, _ in chunks], tx_hashes, max_workers)
+
+
+def write_payout_results(file_path: str, results: list[PayoutResult]) -> None:
+    with open(file_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["recipient", "amount", "tx_hash", "status", "detail"])
+        for r in results:
+            writer.writerow([r.recipient, r.amount, r.tx_hash, r.status, r.detail])
+
+
+if __name__ == "__main__":
+    from derive_keys import generate_bip44_account
+    from gen_mnemonic import load_mnemonic
+
+    parser = argparse.ArgumentParser(description="Send a payout CSV (recipient,amount) as batch_transfer transactions.")
+    parser.add_argument("payouts", help="CSV file with recipient,amount rows")
+    parser.add_argument("--url", default="https://rpc-testnet.supra.com")
+    parser.add_argument("--mnemonic", required=True, help="encrypted mnemonic file of the sender")
+    parser.add_argument("--account", type=int, default=0)
+    parser.add_argument("--max-gas", type=int, default=500_000, help="gas budget per transaction")
+    parser.add_argument("--margin", type=float, default=0.2, help="headroom over the estimated gas of a chunk")
+    parser.add_argument("--output", help="write per-payout results to this CSV file")
+    args = parser.parse_args()
+
+    sender_account = Account.load_key(generate_bip44_account(load_mnemonic(args.mnemonic), args.account).hex())
+    with open(args.payouts, "r", newline="") as f:
+        payouts = [(row[0].strip(), int(row[1])) for row in csv.reader(f) if row and not row[0].startswith("#")]
+    results = send_payouts(args.url.rstrip("/"), sender_account, payouts, args.max_gas, args.margin)
+    print("Payouts:", dict(Counter(r.status for r in results)))
+    if args.output:
+        write_payout_results(args.output, results)
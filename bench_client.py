@@ -0,0 +1,122 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+
+from aptos_sdk.account import Account
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.authenticator import Authenticator, Ed25519Authenticator
+from aptos_sdk.bcs import Deserializer, Serializer
+
+from derive_keys import generate_bip44_account
+from propose_multisig_tx import compute_multisig_tx_payload_hash
+from transaction_payload import TransactionPayload, payload_to_dict
+from transfer_supra import create_entry_func, create_raw_tx, auth_to_dict, create_send_tx_dict
+
+# Offline micro-benchmarks of the client's CPU hot paths. Results are written as JSON and can be compared against
+# a saved baseline, e.g.
+#   python bench_client.py --save-baseline bench_client_baseline.json
+#   python bench_client.py --baseline bench_client_baseline.json
+# Each case reports the best per-call time over several timing runs.
+
+RECIPIENT = "0xb8922417130785087f9c7926e76542531b703693fdc74c9386b65cf4427f4e80"
+MNEMONIC = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+CHAIN_ID = 6
+
+
+def transfer_entry_func():
+    return create_entry_func(
+        "supra_account",
+        "transfer",
+        [AccountAddress.from_str_relaxed(RECIPIENT), 1_000_000_000],
+        [Serializer.struct, Serializer.u64])
+
+
+def build_cases() -> dict:
+    sender = Account.load_key(generate_bip44_account(MNEMONIC, 0).hex())
+    entry_func = transfer_entry_func()
+    raw_tx = create_raw_tx(sender.address(), 7, entry_func, 10, chain_id=CHAIN_ID)
+    keyed = raw_tx.keyed()
+    signature = sender.sign(keyed)
+    auth = Authenticator(Ed25519Authenticator(sender.public_key(), signature))
+    send_tx_dict = create_send_tx_dict(sender, raw_tx)
+    payload_serializer = Serializer()
+    TransactionPayload(entry_func).serialize(payload_serializer)
+    payload_bytes = payload_serializer.output()
+
+    return {
+        "create_entry_func": (transfer_entry_func, None),
+        "create_raw_tx": (lambda: create_raw_tx(sender.address(), 7, entry_func, 10, chain_id=CHAIN_ID), None),
+        "raw_tx_keyed": (raw_tx.keyed, None),
+        "ed25519_sign": (lambda: sender.sign(keyed), None),
+        "payload_to_dict": (lambda: payload_to_dict(raw_tx), None),
+        "auth_to_dict": (lambda: auth_to_dict(auth), None),
+        "submit_body_json": (lambda: json.dumps(send_tx_dict), None),
+        "compute_multisig_tx_payload_hash": (lambda: compute_multisig_tx_payload_hash(entry_func), None),
+        "transaction_payload_deserialize": (lambda: TransactionPayload.deserialize(Deserializer(payload_bytes)), None),
+        # Seed derivation runs 2048 PBKDF2 rounds, so it gets a fixed, small number of calls.
+        "generate_bip44_account": (lambda: generate_bip44_account(MNEMONIC, 0), 5),
+    }
+
+
+def run_benchmarks(repeat: int, only: [str] = None) -> dict[str, float]:
+    results = {}
+    for name, (func, number) in build_cases().items():
+        if only and name not in only:
+            continue
+        timer = timeit.Timer(func)
+        if number is None:
+            number, _ = timer.autorange()
+        best = min(timer.repeat(repeat, number)) / number
+        results[name] = best * 1e6
+        print(f"{name:<36} {best * 1e6:12.3f} us/call")
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    regressions = []
+    print(f"\n{'case':<36} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        change = current / baseline[name] - 1
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"{name:<36} {baseline[name]:12.3f} {current:12.3f} {change:+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def load_results(file_path: str) -> dict[str, float]:
+    with open(file_path, "r") as f:
+        return json.load(f)["results_us"]
+
+
+def save_results(file_path: str, results: dict[str, float]) -> None:
+    with open(file_path, "w") as f:
+        json.dump({
+            "timestamp": int(time.time()),
+            "python": sys.version.split()[0],
+            "machine": platform.machine(),
+            "results_us": results,
+        }, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the client's CPU hot paths.")
+    parser.add_argument("--output", default="bench_client_results.json")
+    parser.add_argument("--baseline", help="compare against this saved result file")
+    parser.add_argument("--save-baseline", help="also save the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging, 0.2 = 20%%")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("cases", nargs="*", help="run only these cases")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat, args.cases)
+    save_results(args.output, results)
+    if args.save_baseline:
+        save_results(args.save_baseline, results)
+    if args.baseline and compare(results, load_results(args.baseline), args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,56 @@
+import argparse
+import json
+import os
+import time
+
+from decode_pool import decode_block, decode_ordered, transaction_records
+
+# Block decoding throughput in the scanning process versus decode_pool worker processes, on synthetic busy blocks
+# (no network), e.g.
+#   python bench_decode.py --blocks 200 --txs 2000 --workers 1 2 4 8
+
+
+def synthetic_tx(height: int, i: int) -> dict:
+    addr = "0x%064x" % (height * 100_000 + i)
+    return {
+        "hash": "0x%064x" % (height << 32 | i),
+        "status": "Success",
+        "header": {"sender": {"Move": addr}, "sequence_number": i, "max_gas_amount": 500_000, "gas_unit_price": 100,
+                   "expiration_timestamp": {"microseconds_since_unix_epoch": 1_700_000_000_000_000}, "chain_id": 6},
+        "payload": {"Move": {"type": "entry_function_payload", "function": "0x1::supra_account::transfer",
+                             "type_arguments": [], "arguments": [addr, "0x0100000000000000"]}},
+        "output": {"Move": {"events": [
+            {"type": f"0x1::coin::{kind}", "guid": {"creation_number": "3", "account_address": addr},
+             "sequence_number": str(i), "data": {"amount": "1"}} for kind in ("WithdrawEvent", "DepositEvent")],
+            "gas_used": 9, "vm_status": "Executed successfully"}},
+        "authenticator": {"Move": {"Ed25519": {"public_key": "0x" + "ab" * 32, "signature": "0x" + "cd" * 64}}},
+        "block_header": {"hash": "0x" + "ee" * 32, "height": height,
+                         "timestamp": {"microseconds_since_unix_epoch": 1_700_000_000_000_000 + height}},
+    }
+
+
+def synthetic_blocks(count: int, txs: int) -> list[tuple[int, bytes]]:
+    return [(h, json.dumps({"header": {"height": h}, "transactions": [synthetic_tx(h, i) for i in range(txs)]})
+             .encode()) for h in range(count)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Block decode throughput, in process versus a process pool.")
+    parser.add_argument("--blocks", type=int, default=100)
+    parser.add_argument("--txs", type=int, default=2000, help="transactions per block")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4, os.cpu_count()])
+    args = parser.parse_args()
+
+    blocks = synthetic_blocks(args.blocks, args.txs)
+    size = sum(len(content) for _, content in blocks)
+    print(f"{args.blocks} blocks of {args.txs} transactions, {size / 1e6:.1f} MB, {os.cpu_count()} cores")
+
+    start = time.perf_counter()
+    n = sum(len(decode_block(h, content, transaction_records)) for h, content in blocks)
+    elapsed = time.perf_counter() - start
+    print(f"{'in process':<16} {args.blocks / elapsed:10,.1f} blocks/s {n / elapsed:12,.0f} txs/s")
+    for workers in sorted(set(args.workers)):
+        start = time.perf_counter()
+        n = sum(len(records) for _, records in decode_ordered(blocks, transaction_records, workers))
+        elapsed = time.perf_counter() - start
+        print(f"{f'{workers} processes':<16} {args.blocks / elapsed:10,.1f} blocks/s {n / elapsed:12,.0f} txs/s")
@@ -0,0 +1,104 @@
+import argparse
+import gc
+import time
+import tracemalloc
+
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.bcs import Deserializer, Serializer
+
+from execute_multisig_tx import create_multisig
+from payload_views import PayloadBatch, iter_payload_views
+from transaction_payload import TransactionPayload
+from transfer_supra import create_entry_func
+from vote_multisig_tx import create_vote_multisig_tx_entry_func
+
+# Decode throughput and retained memory per payload of a concatenated buffer of BCS payloads, decoded into
+# TransactionPayload objects versus walked as payload_views.PayloadView / PayloadBatch, e.g.
+#   python bench_payloads.py --count 200000
+
+RECIPIENT = AccountAddress.from_str_relaxed("0xb8922417130785087f9c7926e76542531b703693fdc74c9386b65cf4427f4e80")
+MULTISIG = AccountAddress.from_str_relaxed("0xadf39402c164a372a788358b7c8e695ae794d8f787ad36464708c8eb1f3a64a9")
+
+
+def build_buffer(count: int) -> bytes:
+    # 70% transfers, 20% votes, 10% multisig-wrapped transfers.
+    transfer = create_entry_func("supra_account", "transfer", [RECIPIENT, 1_000], [Serializer.struct, Serializer.u64])
+    payloads = [
+        TransactionPayload(transfer),
+        TransactionPayload(create_vote_multisig_tx_entry_func(MULTISIG, 7, True)),
+        TransactionPayload(create_multisig(MULTISIG, transfer)),
+    ]
+    encoded = []
+    for payload in payloads:
+        serializer = Serializer()
+        payload.serialize(serializer)
+        encoded.append(serializer.output())
+    mix = [0] * 7 + [1] * 2 + [2]
+    return b"".join(encoded[mix[i % len(mix)]] for i in range(count))
+
+
+def decode_all(buf: bytes) -> list:
+    deserializer = Deserializer(buf)
+    payloads = []
+    while deserializer.remaining():
+        payloads.append(TransactionPayload.deserialize(deserializer))
+    return payloads
+
+
+def view_all(buf: bytes) -> list:
+    return list(iter_payload_views(buf))
+
+
+def index_all(buf: bytes) -> PayloadBatch:
+    return PayloadBatch(buf)
+
+
+def count_transfers_decoded(buf: bytes) -> int:
+    n = 0
+    deserializer = Deserializer(buf)
+    while deserializer.remaining():
+        value = TransactionPayload.deserialize(deserializer).value
+        if getattr(value, "function", None) == "transfer" and value.module.name == "supra_account":
+            n += 1
+    return n
+
+
+def count_transfers_viewed(buf: bytes) -> int:
+    return sum(1 for view in iter_payload_views(buf) if view.function_is("supra_account", "transfer"))
+
+
+def measure(func, buf: bytes, retain: bool) -> tuple[float, int]:
+    # Seconds for one pass, and bytes still allocated afterwards when the result is kept alive.
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(buf)
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, retained if retain else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch payload decoding benchmark.")
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    buf = build_buffer(args.count)
+    print(f"{args.count} payloads, {len(buf)} bytes")
+    cases = {
+        "decode all (TransactionPayload)": (decode_all, True),
+        "view all (PayloadView)": (view_all, True),
+        "index all (PayloadBatch)": (index_all, True),
+        "count transfers, decoded": (count_transfers_decoded, False),
+        "count transfers, viewed": (count_transfers_viewed, False),
+    }
+    for name, (func, retain) in cases.items():
+        # Throughput without tracemalloc overhead, memory from a separate traced pass.
+        start = time.perf_counter()
+        func(buf)
+        elapsed = time.perf_counter() - start
+        _, retained = measure(func, buf, retain)
+        memory = f", {retained / args.count:7.1f} bytes/payload retained" if retain else ""
+        print(f"{name:<34} {args.count / elapsed:12,.0f} payloads/s{memory}")
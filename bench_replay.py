@@ -0,0 +1,56 @@
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+
+import rpc_client
+import supra
+
+# Replays a recorded CLI run from a cassette to benchmark the client code in isolation from the node, e.g.
+#   python supra.py --url https://rpc-testnet.supra.com --record scan.ndjson.gz scan 1000 1200
+#   python bench_replay.py scan.ndjson.gz -- scan 1000 1200
+#   python bench_replay.py scan.ndjson.gz --realtime -- multisig view <multisig address>
+# With --realtime every call takes its recorded latency, otherwise responses are served as fast as possible and
+# only client-side time is left.
+
+
+def bench_replay(cassette_file: str, argv: [str], repeat: int, realtime: bool) -> list[float]:
+    player = rpc_client.start_replay(cassette_file, realtime)
+    timings = []
+    try:
+        for _ in range(repeat):
+            player.rewind()
+            # Each run starts cold, as a one-shot CLI run would: no unlocked keys, gas estimates, sequence numbers or
+            # chain ids from the previous run.
+            supra.state = supra.SessionState()
+            if "transfer_supra" in sys.modules:
+                sys.modules["transfer_supra"].get_chain_id.cache_clear()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                supra.main(argv)
+            timings.append(time.perf_counter() - start)
+    finally:
+        rpc_client.stop_replay()
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark a supra CLI command against a recorded cassette.")
+    parser.add_argument("cassette")
+    parser.add_argument("argv", nargs="+", help="supra.py arguments, after --")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--realtime", action="store_true", help="replay at the recorded latencies")
+    parser.add_argument("--json", help="write the timings to this JSON file")
+    args = parser.parse_args()
+
+    timings = bench_replay(args.cassette, args.argv, args.repeat, args.realtime)
+    ms = [t * 1000 for t in timings]
+    print(f"{' '.join(args.argv)}: median {statistics.median(ms):.2f} ms, min {min(ms):.2f} ms, "
+          f"max {max(ms):.2f} ms over {len(ms)} runs")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"timestamp": int(time.time()), "argv": args.argv, "realtime": args.realtime,
+                       "timings_ms": ms}, f, indent=2)
@@ -0,0 +1,50 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from supra import STARTUP_PROBE_ENV
+
+# Read-only commands must start within this budget, measured from process spawn until the subcommand's imports
+# are resolved and it is about to issue its first RPC call.
+READ_ONLY_BUDGET_MS = 100
+COMMANDS = {
+    "balance": (["balance", "0x1"], True),
+    "block": (["block", "1"], True),
+    "tx": (["tx", "0x0"], True),
+    "scan": (["scan", "1", "2"], True),
+    "multisig view": (["multisig", "view", "0x1"], True),
+    "transfer": (["transfer", "0x1", "1", "--mnemonic", "x"], False),
+}
+
+
+def time_command(argv: [str], repeat: int) -> tuple[list[float], str]:
+    env = dict(os.environ, **{STARTUP_PROBE_ENV: "1"})
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "supra.py")
+    timings, loaded = [], ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, script, *argv], env=env, capture_output=True, text=True, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+        loaded = out.stdout.strip()
+    return timings, loaded
+
+
+if __name__ == "__main__":
+    repeat = 20
+
+    interpreter, _ = time_command(["--help"], repeat)
+    print(f"{'interpreter + argparse':<24} median {statistics.median(interpreter):7.1f} ms")
+
+    over_budget = []
+    for name, (argv, read_only) in COMMANDS.items():
+        timings, loaded = time_command(argv, repeat)
+        median = statistics.median(timings)
+        print(f"{name:<24} median {median:7.1f} ms, max {max(timings):7.1f} ms, heavy modules: {loaded or '-'}")
+        if read_only and median > READ_ONLY_BUDGET_MS:
+            over_budget.append(name)
+
+    if over_budget:
+        print(f"Over the {READ_ONLY_BUDGET_MS} ms budget:", ", ".join(over_budget))
+        sys.exit(1)
@@ -0,0 +1,79 @@
+import gzip
+import json
+import threading
+import time
+
+# Record/replay of RPC traffic for offline benchmarks. A cassette is a gzip-compressed file of JSON lines, one per
+# call:
+#   {"method": "GET", "url": "...", "body": null, "status": 200, "response": "...", "request_bytes": 0,
+#    "latency_ms": 12.3}
+# Replay matches a call on method, URL and request body. Bodies that never repeat between runs (simulate and submit
+# requests carry expiry times and signatures) fall back to the next recording of the same method and URL. When a
+# call was recorded several times, e.g. status polls, the recordings are served in order and the last one repeats.
+
+
+def canonical_body(d: dict | None) -> str | None:
+    return None if d is None else json.dumps(d, sort_keys=True, separators=(",", ":"))
+
+
+class CassetteRecorder:
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        self.file = gzip.open(file_path, "wt")
+
+    def record(self, method: str, url: str, d: dict | None, status: int, content: bytes, request_bytes: int,
+               latency_sec: float) -> None:
+        line = json.dumps({
+            "method": method,
+            "url": url,
+            "body": canonical_body(d),
+            "status": status,
+            "response": content.decode(errors="replace"),
+            "request_bytes": request_bytes,
+            "latency_ms": round(latency_sec * 1000, 3),
+        })
+        with self.lock:
+            self.file.write(line + "\n")
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
+
+
+class CassettePlayer:
+    def __init__(self, file_path: str, realtime: bool = False):
+        # With realtime, every call sleeps for its recorded latency; otherwise responses come back at full speed.
+        self.realtime = realtime
+        self.lock = threading.Lock()
+        self.exact: dict[tuple, list[dict]] = {}
+        self.by_url: dict[tuple, list[dict]] = {}
+        with gzip.open(file_path, "rt") as f:
+            for line in f:
+                entry = json.loads(line)
+                entry["content"] = entry.pop("response").encode()
+                self.exact.setdefault((entry["method"], entry["url"], entry["body"]), []).append(entry)
+                self.by_url.setdefault((entry["method"], entry["url"]), []).append(entry)
+        self.positions: dict[tuple, int] = {}
+
+    def next_entry(self, key: tuple, entries: list[dict]) -> dict:
+        with self.lock:
+            i = self.positions.get(key, 0)
+            self.positions[key] = i + 1
+        return entries[min(i, len(entries) - 1)]
+
+    def play(self, method: str, url: str, d: dict | None) -> tuple[int, bytes, int]:
+        key = (method, url, canonical_body(d))
+        if key in self.exact:
+            entry = self.next_entry(key, self.exact[key])
+        elif (method, url) in self.by_url:
+            entry = self.next_entry((method, url), self.by_url[(method, url)])
+        else:
+            raise KeyError(f"No recording of {method} {url} in the cassette")
+        if self.realtime:
+            time.sleep(entry["latency_ms"] / 1000)
+        return entry["status"], entry["content"], entry["request_bytes"]
+
+    def rewind(self) -> None:
+        with self.lock:
+            self.positions.clear()
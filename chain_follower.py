@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable
+
+from check_block import get_latest_block_height
+from metrics import registry
+from scan_blocks import iter_block_txs
+
+# One long-running follower of finalized blocks, fanning every block out to its sinks in height order, e.g.
+#   follower = ChainFollower(base_url, "follower.json")
+#   follower.add_sink(lambda height, txs: ...)
+#   follower.add_sink(NdjsonSink("blocks.jsonl", follower.checkpoint))
+#   follower.add_sink(event_index.EventIndex("events.sqlite3").add_block)
+#   follower.run()
+# A sink is a callable taking (height, txs); it may also have `flush()`, called before each checkpoint, and
+# `close()`. The checkpoint is the last height every sink has handled and flushed, so after a crash blocks since
+# then are delivered again (at least once) and sinks should tolerate repeats.
+#
+# Behind the head, blocks are fetched `max_workers` at a time with scan_blocks.iter_block_txs and checkpointed
+# every `batch_size` blocks, so a restart catches up at full scan speed. At the head, the poll interval follows the
+# observed block interval: it is half the running average, between `min_interval_sec` and `max_interval_sec`.
+
+
+def reverse_lines(f, end: int, chunk_size: int = 1 << 20):
+    # (offset, line) of the lines of f[:end], last first, reading backwards in chunks.
+    pos, tail = end, b""
+    while pos > 0:
+        size = min(chunk_size, pos)
+        pos -= size
+        f.seek(pos)
+        lines = (f.read(size) + tail).split(b"\n")
+        offsets = [pos]
+        for line in lines[:-1]:
+            offsets.append(offsets[-1] + len(line) + 1)
+        for offset, line in zip(reversed(offsets[1:]), reversed(lines[1:])):
+            yield offset, line
+        tail = lines[0]
+    yield 0, tail
+
+
+def truncate_blocks_file(file_path: str, after_height: int | None) -> None:
+    # Cuts a partly written last line (left by a crash) and, with `after_height`, the blocks above it.
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        f.seek(max(0, end - 1))
+        cut = end if end == 0 or f.read(1) == b"\n" else None
+        for offset, line in reverse_lines(f, end):
+            if cut is None:
+                cut = offset
+                continue
+            if not line.strip():
+                continue
+            try:
+                height = json.loads(line)["height"]
+            except (ValueError, KeyError):
+                height = None
+            if height is not None and (after_height is None or height <= after_height):
+                break
+            cut = offset
+        f.truncate(cut)
+
+
+class NdjsonSink:
+    # Blocks as JSON lines, in the local block file format of query.py. Opening the sink with the follower's
+    # checkpoint first truncates the file back to it: a crash may leave a partial line and blocks after the
+    # checkpoint, which the follower delivers again. Not gzip-compressed, since a crash in the middle of a gzip
+    # member makes the whole file unreadable; compress finished files instead.
+    def __init__(self, file_path: str, checkpoint: int = None):
+        if file_path.endswith(".gz"):
+            raise ValueError(f"{file_path}: the NDJSON sink cannot append to a gzip file, use a plain .jsonl file")
+        truncate_blocks_file(file_path, checkpoint)
+        self.f = open(file_path, "a")
+
+    def __call__(self, height: int, txs: list[dict]) -> None:
+        self.f.write(json.dumps({"height": height, "transactions": txs}) + "\n")
+
+    def flush(self) -> None:
+        self.f.flush()
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class SqliteSink:
+    # One row per transaction. Repeats of a block after a restart replace its rows.
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS transactions (
+        hash TEXT PRIMARY KEY,
+        height INTEGER NOT NULL,
+        tx_index INTEGER NOT NULL,
+        sender TEXT,
+        status TEXT,
+        tx TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS transactions_height ON transactions (height);
+    CREATE INDEX IF NOT EXISTS transactions_sender ON transactions (sender, height);
+    """
+
+    def __init__(self, db_file: str = "transactions.sqlite3"):
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+
+    def __call__(self, height: int, txs: list[dict]) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?, ?)",
+            [(tx["hash"], height, i, tx["header"]["sender"]["Move"] if "header" in tx else None, tx.get("status"),
+              json.dumps(tx)) for i, tx in enumerate(txs)])
+
+    def flush(self) -> None:
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+
+class ChainFollower:
+    def __init__(self,
+                 base_url: str,
+                 checkpoint_file: str = "follower_checkpoint.json",
+                 start: int = None,
+                 fields: list[str] = None,
+                 max_workers: int = 8,
+                 batch_size: int = 100,
+                 min_interval_sec: float = 0.2,
+                 max_interval_sec: float = 5.0):
+        # Without a checkpoint, following starts at `start`, by default at the current head. `fields` limits the
+        # decoded transaction fields for all sinks, see scan_blocks.get_block_txs.
+        self.base_url = base_url
+        self.checkpoint_file = checkpoint_file
+        self.start = start
+        self.fields = fields
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.min_interval_sec = min_interval_sec
+        self.max_interval_sec = max_interval_sec
+        self.sinks: list[Callable[[int, list[dict]], None]] = []
+        self.stopped = threading.Event()
+        self.block_interval_sec: float | None = None
+        self.checkpoint = self.load_checkpoint()
+
+    def add_sink(self, sink: Callable[[int, list[dict]], None]) -> None:
+        self.sinks.append(sink)
+
+    def load_checkpoint(self) -> int | None:
+        if not os.path.exists(self.checkpoint_file):
+            return None
+        with open(self.checkpoint_file, "r") as f:
+            return json.load(f)["height"]
+
+    def save_checkpoint(self, height: int) -> None:
+        for sink in self.sinks:
+            if hasattr(sink, "flush"):
+                sink.flush()
+        tmp_file = self.checkpoint_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"height": height}, f)
+        os.replace(tmp_file, self.checkpoint_file)
+        self.checkpoint = height
+
+    def deliver(self, start: int, end: int) -> None:
+        delivered = 0
+        for height, txs in iter_block_txs(self.base_url, start, end, self.max_workers, self.fields):
+            for sink in self.sinks:
+                sink(height, txs)
+            delivered += 1
+            registry.inc("supra_follower_blocks_total")
+            if delivered % self.batch_size == 0 or height == end:
+                self.save_checkpoint(height)
+            if self.stopped.is_set():
+                self.save_checkpoint(height)
+                return
+
+    def observe_head(self, head: int, previous_head: int | None, previous_at: float | None, now: float) -> None:
+        if previous_head is None or head <= previous_head:
+            return
+        interval = (now - previous_at) / (head - previous_head)
+        self.block_interval_sec = interval if self.block_interval_sec is None \
+            else 0.8 * self.block_interval_sec + 0.2 * interval
+
+    def poll_interval(self, idle_polls: int) -> float:
+        # Half the block interval, doubling for every poll that found nothing new beyond the first.
+        base = self.block_interval_sec / 2 if self.block_interval_sec is not None else self.min_interval_sec
+        interval = base * 2 ** max(0, idle_polls - 1)
+        return min(self.max_interval_sec, max(self.min_interval_sec, interval))
+
+    def run(self, until_height: int = None) -> int | None:
+        # Follows until `stop()` is called or `until_height` was delivered; returns the last checkpointed height.
+        head = get_latest_block_height(self.base_url)
+        if self.checkpoint is None:
+            self.save_checkpoint((self.start if self.start is not None else head) - 1)
+        previous_head, previous_at, idle_polls = head, time.monotonic(), 0
+        while not self.stopped.is_set():
+            next_height = self.checkpoint + 1
+            if until_height is not None and next_height > until_height:
+                break
+            if next_height <= head:
+                end = head if until_height is None else min(head, until_height)
+                self.deliver(next_height, end)
+                idle_polls = 0
+            else:
+                idle_polls += 1
+                self.stopped.wait(self.poll_interval(idle_polls))
+            head = get_latest_block_height(self.base_url)
+            now = time.monotonic()
+            self.observe_head(head, previous_head, previous_at, now)
+            if head > previous_head:
+                previous_head, previous_at = head, now
+        return self.checkpoint
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follow finalized blocks into NDJSON / SQLite sinks.")
+    parser.add_argument("--url", default="https://rpc-testnet.supra.com")
+    parser.add_argument("--checkpoint", default="follower_checkpoint.json")
+    parser.add_argument("--start", type=int, help="first height when there is no checkpoint yet, default the head")
+    parser.add_argument("--until", type=int, help="stop after this height")
+    parser.add_argument("--ndjson", help="append blocks to this (uncompressed) file")
+    parser.add_argument("--sqlite", help="store transactions in this database")
+    parser.add_argument("--events", help="index events in this event_index database")
+    parser.add_argument("--print", action="store_true", help="print each height and its number of transactions")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    follower = ChainFollower(args.url.rstrip("/"), args.checkpoint, args.start, max_workers=args.workers)
+    if args.ndjson:
+        follower.add_sink(NdjsonSink(args.ndjson, follower.checkpoint))
+    if args.sqlite:
+        follower.add_sink(SqliteSink(args.sqlite))
+    if args.events:
+        from event_index import EventIndex
+
+        follower.add_sink(EventIndex(args.events).add_block)
+    if args.print:
+        follower.add_sink(lambda height, txs: print(f"Block height: {height}, transactions: {len(txs or [])}"))
+    try:
+        print("Checkpoint:", follower.run(args.until))
+    except KeyboardInterrupt:
+        print("Checkpoint:", follower.checkpoint)
+    finally:
+        follower.close()
@@ -1,13 +1,4 @@
-import requests
-
-
-def get_json(url: str) -> dict:
-    resp = requests.get(url)
-    try:
-        return resp.json()
-    except:
-        print(f"get_json: error decoding JSON {resp}, with error text: {resp.text}")
-        return {}
+from rpc_client import get_json
 
 
 def account_exists(base_url: str, account_addr: str) -> bool:
@@ -23,6 +14,36 @@ def get_resource_data(base_url: str, account_addr: str, resource_type: str) -> d
     return res_data["result"][0]
 
 
+RESOURCES_PAGE_SIZE = 100
+
+
+def resource_pairs(res_data) -> tuple[list, str | None]:
+    # ([(type, data)], cursor) from one page: {"Resources": {"resource": [[type, data], ...], "cursor": ...}}, or a
+    # plain list of {"type": ..., "data": ...}.
+    if isinstance(res_data, list):
+        return [(r["type"], r["data"]) for r in res_data], None
+    page = res_data.get("Resources") or {}
+    return [(r[0], r[1]) if isinstance(r, list) else (r["type"], r["data"]) for r in page.get("resource") or []], \
+        page.get("cursor")
+
+
+def get_account_resources(base_url: str, account_addr: str) -> dict[str, dict] | None:
+    # All resources of the account by type, or None when it does not exist.
+    resources = {}
+    cursor = None
+    while True:
+        url = f"{base_url}/rpc/v1/accounts/{account_addr}/resources?count={RESOURCES_PAGE_SIZE}"
+        res_data = get_json(url + (f"&start={cursor}" if cursor is not None else ""))
+        if isinstance(res_data, dict) and "message" in res_data:
+            if "not found" in res_data["message"]:
+                return None
+            raise Exception(f"resources of {account_addr}: {res_data['message']}")
+        pairs, cursor = resource_pairs(res_data)
+        resources.update(pairs)
+        if not cursor or not pairs:
+            return resources
+
+
 def get_account_supra_coin_balance(base_url: str, account_addr: str) -> int:
     if not account_exists(base_url, account_addr):
         return 0
@@ -1,9 +1,15 @@
 from check_balance import get_json
 
 
-def get_block_by_height(base_url: str, height: int, with_txs: bool = False) -> dict:
+def get_block_by_height(base_url: str, height: int, with_txs: bool = False, fields: list[str] = None) -> dict:
+    # `fields` limits decoding to those paths of the block, e.g. ["transactions.item.hash"], see json_stream.py.
     with_txs = "true" if with_txs else "false"
-    return get_json(f"{base_url}/rpc/v1/block/height/{height}?with_finalized_transactions={with_txs}")
+    return get_json(f"{base_url}/rpc/v1/block/height/{height}?with_finalized_transactions={with_txs}", fields)
+
+
+def get_latest_block_height(base_url: str) -> int:
+    d = get_json(f"{base_url}/rpc/v1/block")
+    return int(d["height"])
 
 
 def get_block_round_by_height(base_url: str, height: int) -> int:
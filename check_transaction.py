@@ -1,8 +1,10 @@
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 from check_balance import get_json
 from check_block import get_block_round_by_height
+from metrics import span
 
 
 def get_transaction_info(base_url: str, tx_hash: str) -> dict:
@@ -10,7 +12,10 @@ def get_transaction_info(base_url: str, tx_hash: str) -> dict:
 
 
 def get_transaction_status(base_url: str, tx_hash: str) -> str:
-    res_data = get_transaction_info(base_url, tx_hash)
+    return get_tx_status(get_transaction_info(base_url, tx_hash), tx_hash)
+
+
+def get_tx_status(res_data: dict, tx_hash: str) -> str:
     try:
         return res_data["output"]["Move"]["vm_status"] if res_data["status"] == "Fail" else res_data["status"]
     except:
@@ -27,18 +32,57 @@ def get_transaction_block_height(base_url: str, tx_hash: str) -> int:
     return int(d["block_header"]["height"])
 
 
+def get_tx_events(tx: dict) -> list[dict]:
+    try:
+        return tx["output"]["Move"]["events"]
+    except (KeyError, TypeError):
+        return []
+
+
+def get_event_account(event: dict) -> str:
+    # Handle-based events carry the emitting account in the GUID, module events in their data.
+    guid = event.get("guid") or {}
+    addr = guid.get("account_address") or event.get("data", {}).get("multisig_account") \
+        or event.get("data", {}).get("account")
+    return addr or ""
+
+
 def wait_for_tx(base_url: str, tx_hash: str, repeat: int, interval_sec: int, check_first=False) -> None:
-    if check_first:
-        status = get_transaction_status(base_url, tx_hash)
-        print("Transaction status:", status)
-        if status == "Success":
-            return
-    for i in range(repeat):
-        time.sleep(interval_sec)
-        status = get_transaction_status(base_url, tx_hash)
-        print(f"Transaction status after {(i + 1) * interval_sec} seconds:", status)
-        if status == "Success":
-            break
+    with span("wait_for_tx"):
+        if check_first:
+            status = get_transaction_status(base_url, tx_hash)
+            print("Transaction status:", status)
+            if status == "Success":
+                return
+        for i in range(repeat):
+            time.sleep(interval_sec)
+            with span("wait_for_tx.poll"):
+                status = get_transaction_status(base_url, tx_hash)
+            print(f"Transaction status after {(i + 1) * interval_sec} seconds:", status)
+            if status == "Success":
+                break
+
+
+def wait_for_txs(base_url: str, tx_hashes: [str], repeat: int, interval_sec: int, max_workers: int = 16) -> dict[str, str]:
+    # Polls all still-pending transactions concurrently once per interval, and returns the last status
+    # seen for every hash.
+    statuses = {tx_hash: "Pending" for tx_hash in tx_hashes}
+    pending = list(tx_hashes)
+    with ThreadPoolExecutor(max_workers) as executor:
+        for i in range(repeat):
+            if not pending:
+                break
+            time.sleep(interval_sec)
+            infos = list(executor.map(lambda h: get_transaction_info(base_url, h), pending))
+            still_pending = []
+            for tx_hash, info in zip(pending, infos):
+                statuses[tx_hash] = get_tx_status(info, tx_hash)
+                if not isinstance(info, dict) or info.get("status") not in ("Success", "Fail", "Invalid"):
+                    still_pending.append(tx_hash)
+            pending = still_pending
+            print(f"Transactions confirmed after {(i + 1) * interval_sec} seconds: "
+                  f"{len(tx_hashes) - len(pending)}/{len(tx_hashes)}")
+    return statuses
 
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+import json
+import os
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+
+from scan_blocks import get_block_bytes, iter_ordered
+
+# Decoding stage of a scan in worker processes. Threads fetch the raw block bodies, worker processes parse them and
+# convert the transactions into compact column records, and blocks come back in height order, e.g.
+#   for height, records in iter_block_records(base_url, 1_000_000, 1_100_000, decode_workers=8):
+#       for tx_hash, sender, seq, function, status, gas_used, timestamp_us in records.rows(): ...
+# Only raw bytes go to the workers and only the records come back, both pickled: a record costs a few dozen bytes
+# per transaction instead of the whole transaction JSON, so the main process spends its time consuming results
+# rather than parsing. `convert` may be any module-level function taking (height, block JSON), to build other
+# records.
+
+
+@dataclass
+class BlockRecords:
+    height: int
+    hashes: list[str] = field(default_factory=list)
+    senders: list[str] = field(default_factory=list)
+    sequence_numbers: array = field(default_factory=lambda: array("q"))
+    functions: list[str] = field(default_factory=list)
+    statuses: list[str] = field(default_factory=list)
+    gas_used: array = field(default_factory=lambda: array("q"))
+    timestamps_us: array = field(default_factory=lambda: array("q"))
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def rows(self) -> Iterator[tuple]:
+        return zip(self.hashes, self.senders, self.sequence_numbers, self.functions, self.statuses, self.gas_used,
+                   self.timestamps_us)
+
+
+def transaction_records(height: int, block: dict) -> BlockRecords:
+    records = BlockRecords(height)
+    for tx in block.get("transactions") or []:
+        header = tx.get("header") or {}
+        payload = (tx.get("payload") or {}).get("Move") or {}
+        if payload.get("type") == "multisig_payload":
+            payload = payload.get("transaction_payload") or {}
+        output = (tx.get("output") or {}).get("Move") or {}
+        timestamp = (tx.get("block_header") or {}).get("timestamp") or {}
+        records.hashes.append(tx["hash"])
+        records.senders.append((header.get("sender") or {}).get("Move", ""))
+        records.sequence_numbers.append(int(header.get("sequence_number", -1)))
+        records.functions.append(payload.get("function", ""))
+        records.statuses.append(tx.get("status", ""))
+        records.gas_used.append(int(output.get("gas_used", 0)))
+        records.timestamps_us.append(int(timestamp.get("microseconds_since_unix_epoch", 0)))
+    return records
+
+
+def loads(content: bytes):
+    try:
+        import orjson
+
+        return orjson.loads(content)
+    except ImportError:
+        return json.loads(content)
+
+
+def decode_block(height: int, content: bytes, convert: Callable[[int, dict], object]):
+    # Runs in a worker process.
+    block = loads(content)
+    if isinstance(block, dict) and "message" in block:
+        raise Exception(f"block {height}: {block['message']}")
+    return convert(height, block)
+
+
+def decode_ordered(blocks: Iterable[tuple[int, bytes]],
+                   convert: Callable[[int, dict], object] = transaction_records,
+                   max_workers: int = None) -> Iterator[tuple[int, object]]:
+    # Decodes (height, body) pairs in `max_workers` processes (default: one per core), yielding (height, records)
+    # in input order with a bounded number of blocks in flight.
+    max_workers = max_workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers) as executor:
+        window = max_workers * 4
+        in_flight = deque()
+        for height, content in blocks:
+            in_flight.append((height, executor.submit(decode_block, height, content, convert)))
+            if len(in_flight) >= window:
+                height, future = in_flight.popleft()
+                yield height, future.result()
+        while in_flight:
+            height, future = in_flight.popleft()
+            yield height, future.result()
+
+
+def iter_block_records(base_url: str,
+                       start: int,
+                       end: int,
+                       fetch_workers: int = 8,
+                       decode_workers: int = None,
+                       convert: Callable[[int, dict], object] = transaction_records) -> Iterator[tuple[int, object]]:
+    fetched = iter_ordered(lambda h: get_block_bytes(base_url, h), start, end, fetch_workers)
+    return decode_ordered(fetched, convert, decode_workers)
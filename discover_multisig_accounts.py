@@ -0,0 +1,76 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from aptos_sdk.account_address import AccountAddress
+
+from check_balance import get_account
+from propose_multisig_tx import compute_multisig_account_addrs
+from transfer_supra import get_account_seq_num
+
+
+def load_discovery_cache(cache_file: str) -> dict:
+    if not os.path.exists(cache_file):
+        return {}
+    with open(cache_file, "r") as f:
+        return json.load(f)
+
+
+def save_discovery_cache(cache_file: str, cache: dict) -> None:
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_file, cache_file)
+
+
+def lookup_account_exists(base_url: str, addr: str) -> bool | None:
+    # True for an account, False when the node answers null, None when the lookup failed (an error reply such as a
+    # rate limit, an undecodable body, or no reply at all), so the candidate is checked again on the next run.
+    try:
+        res = get_account(base_url, addr)
+    except Exception:
+        return None
+    if res is None:
+        return False
+    return True if isinstance(res, dict) and "sequence_number" in res else None
+
+
+def discover_multisig_accounts(base_url: str,
+                               account_owner_addr: str,
+                               cache_file: str = "multisig_accounts_cache.json",
+                               refresh: bool = True,
+                               max_workers: int = 16) -> dict[int, str]:
+    # Returns {creation sequence number: multisig address} for every multisig account created by the owner.
+    # Sequence numbers already checked are never queried again, and with `refresh=False` no network is used.
+    owner = str(AccountAddress.from_str_relaxed(account_owner_addr))
+    cache = load_discovery_cache(cache_file)
+    entry = cache.setdefault(owner, {"scanned_up_to": 0, "accounts": {}})
+    if refresh:
+        # A multisig account is created at the owner's sequence number of the creating transaction,
+        # so every candidate lies below the owner's current sequence number.
+        seqs = range(entry["scanned_up_to"], get_account_seq_num(base_url, owner))
+        candidates = compute_multisig_account_addrs(owner, seqs)
+        with ThreadPoolExecutor(max_workers) as executor:
+            exists = list(executor.map(lambda addr: lookup_account_exists(base_url, str(addr)), candidates))
+        failed = next((seq for seq, found in zip(seqs, exists) if found is None), None)
+        for seq, addr, found in zip(seqs, candidates, exists):
+            if found:
+                entry["accounts"][str(seq)] = str(addr)
+        # Only the sequence numbers below the first failed lookup count as scanned.
+        entry["scanned_up_to"] = seqs.stop if failed is None else failed
+        save_discovery_cache(cache_file, cache)
+        if failed is not None:
+            raise Exception(f"Failed to look up {exists.count(None)} candidate multisig accounts of {owner}, "
+                            f"scanned up to sequence number {failed}")
+    return {int(seq): addr for seq, addr in entry["accounts"].items()}
+
+
+if __name__ == "__main__":
+    is_testnet = True
+    base_url = "https://rpc-testnet1.supra.com" if is_testnet else "https://rpc-mainnet.supra.com"
+
+    owner_addr = "0xb8922417130785087f9c7926e76542531b703693fdc74c9386b65cf4427f4e80"
+    multisig_accounts = discover_multisig_accounts(base_url, owner_addr)
+    print(f"Multisig accounts created by {owner_addr}:")
+    for seq, addr in sorted(multisig_accounts.items()):
+        print(f"  seq {seq}: {addr}")
@@ -0,0 +1,201 @@
+import argparse
+import csv
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from aptos_sdk.account import Account
+from aptos_sdk.transactions import EntryFunction, Script
+
+from gas_estimator import gas_key
+from transaction_payload import Multisig
+from transfer_supra import get_account_seq_num, get_chain_id, create_raw_tx, create_simulate_tx_dict, simulate_tx
+
+# Dry run of a whole batch of prepared transactions before anything is submitted. Every row (or a sample of rows)
+# is simulated concurrently, and each row gets a max_gas derived from the gas it actually used.
+#
+# Rows are simulated independently against the current chain state, with the sender's current sequence number:
+# the effects of earlier rows of the same batch (spent balance, accounts they create) are not visible to later
+# rows.
+
+SUCCESS = "Executed successfully"
+# Gas ceiling for the simulations themselves, the same default as send_tx.
+SIMULATION_MAX_GAS = 500_000
+
+
+@dataclass
+class SimulationResult:
+    index: int
+    sender: str
+    function: str
+    simulated: bool
+    success: bool
+    vm_status: str
+    gas_used: int
+    max_gas: int
+
+
+def payload_function(payload: EntryFunction | Multisig | Script) -> str:
+    if isinstance(payload, EntryFunction):
+        return f"{payload.module.name}::{payload.function}"
+    if isinstance(payload, Multisig):
+        return "multisig"
+    return "script"
+
+
+def derive_max_gas(gas_used: int, margin: float) -> int:
+    # Never below gas_used + 1, so that tiny transactions keep some headroom too.
+    return max(gas_used + 1, math.ceil(gas_used * (1 + margin)))
+
+
+def simulate_row(base_url: str, sender_account: Account, payload, seq: int, chain_id: int,
+                 gas_price: int) -> tuple[bool, str, int]:
+    raw_tx = create_raw_tx(sender_account.address(), seq, payload, SIMULATION_MAX_GAS, gas_price, chain_id=chain_id)
+    res_data = simulate_tx(base_url, create_simulate_tx_dict(sender_account.public_key(), raw_tx))
+    try:
+        output = res_data["output"]["Move"]
+        vm_status = output["vm_status"]
+        return vm_status == SUCCESS, vm_status, int(output["gas_used"])
+    except (KeyError, TypeError):
+        return False, f"Error: {res_data}", 0
+
+
+def dry_run(base_url: str,
+            txs: list[tuple[Account, object]],
+            max_workers: int = 16,
+            sample: float = None,
+            margin: float = 0.2,
+            gas_price: int = 100,
+            fallback_max_gas: int = SIMULATION_MAX_GAS,
+            seed: int = None,
+            estimator=None) -> list[SimulationResult]:
+    # `sample` below 1 simulates that fraction of rows, at least one per entry function; rows that were not
+    # simulated get the largest gas used by a simulated row of the same function, or `fallback_max_gas`.
+    # With a gas_estimator.GasEstimator, successful simulations are fed to it, and unsimulated rows are estimated
+    # from their own kind (e.g. transfers to new vs existing accounts) when it has seen that kind before.
+    chain_id = get_chain_id(base_url)
+    functions = [payload_function(payload) for _, payload in txs]
+    indexes = list(range(len(txs)))
+    if sample is not None and sample < 1:
+        rng = random.Random(seed)
+        picked = set(rng.sample(indexes, math.ceil(len(indexes) * sample)))
+        for function in set(functions):
+            if not any(functions[i] == function for i in picked):
+                picked.add(next(i for i in indexes if functions[i] == function))
+        indexes = sorted(picked)
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        senders = sorted({str(txs[i][0].address()) for i in indexes})
+        seqs = dict(zip(senders, executor.map(lambda addr: get_account_seq_num(base_url, addr), senders)))
+        outcomes = dict(zip(indexes, executor.map(
+            lambda i: simulate_row(base_url, txs[i][0], txs[i][1], seqs[str(txs[i][0].address())], chain_id,
+                                   gas_price),
+            indexes)))
+        # Keys only for the rows the estimator is used for: successful simulations it learns from, and rows that
+        # were not simulated. Each recipient is looked up once.
+        keyed = [i for i in range(len(txs)) if i not in outcomes or outcomes[i][0]] if estimator is not None else []
+        exists_cache = {}
+        keys = dict(zip(keyed, executor.map(lambda i: gas_key(base_url, txs[i][1], exists_cache), keyed)))
+
+    if estimator is not None:
+        for i, (success, _, gas_used) in outcomes.items():
+            if success:
+                estimator.observe(keys[i], gas_used)
+
+    gas_by_function = {}
+    for i, (success, _, gas_used) in outcomes.items():
+        if success:
+            gas_by_function[functions[i]] = max(gas_by_function.get(functions[i], 0), gas_used)
+
+    results = []
+    for i, (sender_account, _) in enumerate(txs):
+        sender = str(sender_account.address())
+        if i in outcomes:
+            success, vm_status, gas_used = outcomes[i]
+            max_gas = derive_max_gas(gas_used, margin) if success else 0
+            results.append(SimulationResult(i, sender, functions[i], True, success, vm_status, gas_used, max_gas))
+        else:
+            gas_used = gas_by_function.get(functions[i])
+            max_gas = derive_max_gas(gas_used, margin) if gas_used is not None else fallback_max_gas
+            if estimator is not None:
+                max_gas = estimator.estimate_key(keys[i]) or max_gas
+            results.append(SimulationResult(i, sender, functions[i], False, True, "", 0, max_gas))
+    return results
+
+
+def print_dry_run_summary(results: list[SimulationResult], gas_price: int = 100) -> None:
+    simulated = [r for r in results if r.simulated]
+    failed = [r for r in simulated if not r.success]
+    print(f"Rows: {len(results)}, simulated: {len(simulated)}, failed: {len(failed)}")
+
+    statuses = {}
+    for r in failed:
+        statuses[r.vm_status] = statuses.get(r.vm_status, 0) + 1
+    for vm_status, n in sorted(statuses.items(), key=lambda item: -item[1]):
+        print(f"  {n:>6}  {vm_status}")
+
+    by_function = {}
+    for r in simulated:
+        if r.success:
+            by_function.setdefault(r.function, []).append(r.gas_used)
+    for function, gas in sorted(by_function.items()):
+        print(f"{function}: gas used min {min(gas)}, max {max(gas)}, mean {sum(gas) / len(gas):.1f}")
+
+    reserve_by_sender = {}
+    for r in results:
+        if r.success:
+            reserve_by_sender[r.sender] = reserve_by_sender.get(r.sender, 0) + r.max_gas * gas_price
+    print(f"Gas used by simulated rows: {sum(r.gas_used for r in simulated)}")
+    print(f"Fee reserve of the batch: {sum(reserve_by_sender.values())} quants")
+    for sender, reserve in sorted(reserve_by_sender.items()):
+        print(f"  {sender}: {reserve} quants")
+
+
+def write_dry_run_results(file_path: str, results: list[SimulationResult]) -> None:
+    with open(file_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["row", "sender", "function", "simulated", "success", "vm_status", "gas_used", "max_gas"])
+        for r in results:
+            writer.writerow([r.index, r.sender, r.function, r.simulated, r.success, r.vm_status, r.gas_used,
+                             r.max_gas])
+
+
+if __name__ == "__main__":
+    from aptos_sdk.account_address import AccountAddress
+    from aptos_sdk.bcs import Serializer
+
+    from derive_keys import generate_bip44_account
+    from gen_mnemonic import load_mnemonic
+    from transfer_supra import create_entry_func
+
+    parser = argparse.ArgumentParser(description="Simulate a payout batch (CSV of recipient,amount) before sending.")
+    parser.add_argument("payouts", help="CSV file with recipient,amount rows")
+    parser.add_argument("--url", default="https://rpc-testnet.supra.com")
+    parser.add_argument("--mnemonic", required=True, help="encrypted mnemonic file of the sender")
+    parser.add_argument("--account", type=int, default=0)
+    parser.add_argument("--sample", type=float, help="simulate only this fraction of rows, e.g. 0.05")
+    parser.add_argument("--margin", type=float, default=0.2, help="max_gas headroom over the simulated gas used")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--output", help="write per-row results to this CSV file")
+    parser.add_argument("--gas-estimates", help="gas estimator file to learn from and estimate unsampled rows with")
+    args = parser.parse_args()
+
+    sender_account = Account.load_key(generate_bip44_account(load_mnemonic(args.mnemonic), args.account).hex())
+    with open(args.payouts, "r", newline="") as f:
+        rows = [row for row in csv.reader(f) if row and not row[0].startswith("#")]
+    txs = [(sender_account, create_entry_func(
+        "supra_account", "transfer", [AccountAddress.from_str_relaxed(recipient.strip()), int(amount)],
+        [Serializer.struct, Serializer.u64])) for recipient, amount in rows]
+
+    estimator = None
+    if args.gas_estimates:
+        from gas_estimator import GasEstimator
+
+        estimator = GasEstimator(args.gas_estimates, args.margin)
+    results = dry_run(args.url.rstrip("/"), txs, args.workers, args.sample, args.margin, estimator=estimator)
+    if estimator is not None:
+        estimator.save()
+    print_dry_run_summary(results)
+    if args.output:
+        write_dry_run_results(args.output, results)
@@ -0,0 +1,189 @@
+import argparse
+import json
+import sqlite3
+import threading
+from typing import Iterable
+
+from check_block import get_latest_block_height
+from check_transaction import get_tx_events, get_event_account
+from query import normalize_addr, normalize_function
+from scan_blocks import iter_block_txs
+
+# Local SQLite index of Move events, fed by the block scanner, e.g.
+#   index = EventIndex("events.sqlite3")
+#   index.sync(base_url, start=1_000_000)
+#   index.query(type=CREATE_TRANSACTION_EVENT, account=multisig_addr)
+#   index.query(type=VOTE_EVENT, actor=owner_addr, latest_first=True, limit=10)
+# Each event row keeps:
+#   account  the emitting account (the GUID address of handle events, `account` / `multisig_account` of module events),
+#   seq      the `sequence_number` in the event data, e.g. the multisig transaction of a vote, else the event's own,
+#   actor    the owner / creator / executor in the event data, else the transaction sender.
+# Addresses and type addresses are stored short (0x1::...), like query.py compares them. Re-indexing a block is a
+# no-op, so feeding the index at least once per block is enough.
+
+MULTISIG_EVENT_PREFIX = "0x1::multisig_account::"
+CREATE_TRANSACTION_EVENT = MULTISIG_EVENT_PREFIX + "CreateTransactionEvent"
+VOTE_EVENT = MULTISIG_EVENT_PREFIX + "VoteEvent"
+EXECUTION_SUCCEEDED_EVENT = MULTISIG_EVENT_PREFIX + "TransactionExecutionSucceededEvent"
+# Transaction fields the indexer reads, see scan_blocks.get_block_txs.
+TX_FIELDS = ["hash", "header.sender", "output.Move.events"]
+ACTOR_FIELDS = ("owner", "creator", "executor")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    tx_hash TEXT NOT NULL,
+    event_index INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    tx_index INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    account TEXT NOT NULL,
+    seq INTEGER,
+    actor TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (tx_hash, event_index)
+);
+CREATE INDEX IF NOT EXISTS events_type_account_seq ON events (type, account, seq, height);
+CREATE INDEX IF NOT EXISTS events_type_actor ON events (type, actor, height);
+CREATE INDEX IF NOT EXISTS events_height ON events (height);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def event_row(tx: dict, event_index: int, event: dict, height: int, tx_index: int) -> tuple:
+    data = event.get("data") or {}
+    seq = data.get("sequence_number", event.get("sequence_number"))
+    actor = next((data[field] for field in ACTOR_FIELDS if isinstance(data.get(field), str)), None)
+    if actor is None and "header" in tx:
+        actor = tx["header"]["sender"]["Move"]
+    account = get_event_account(event)
+    return (tx["hash"], event_index, height, tx_index, normalize_function(event.get("type", "")),
+            normalize_addr(account) if account else "", int(seq) if seq is not None else None,
+            normalize_addr(actor) if actor else None, json.dumps(data))
+
+
+class EventIndex:
+    def __init__(self, db_file: str = "events.sqlite3"):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    @property
+    def last_height(self) -> int | None:
+        # Highest height indexed so far; heights below it may have been skipped by `start` of `sync`.
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'last_height'").fetchone()
+        return int(row["value"]) if row else None
+
+    def add_blocks(self, blocks: Iterable[tuple[int, list[dict]]], commit_every: int = 100) -> int:
+        # Indexes (height, txs) pairs, as yielded by scan_blocks.iter_block_txs, committing every `commit_every`
+        # blocks. Returns the number of events added.
+        added = 0
+        rows, last_height, pending = [], None, 0
+        for height, txs in blocks:
+            for tx_index, tx in enumerate(txs or []):
+                rows.extend(event_row(tx, i, event, height, tx_index) for i, event in enumerate(get_tx_events(tx)))
+            last_height = height if last_height is None else max(last_height, height)
+            pending += 1
+            if pending >= commit_every:
+                added += self.commit(rows, last_height)
+                rows, pending = [], 0
+        if pending:
+            added += self.commit(rows, last_height)
+        return added
+
+    def add_block(self, height: int, txs: list[dict]) -> int:
+        return self.add_blocks([(height, txs)])
+
+    def commit(self, rows: list[tuple], last_height: int) -> int:
+        with self.lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            added = self.conn.total_changes - before
+            self.conn.execute(
+                "INSERT INTO meta VALUES ('last_height', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = MAX(CAST(value AS INTEGER), excluded.value)",
+                (last_height,))
+        return added
+
+    def sync(self, base_url: str, start: int = None, end: int = None, max_workers: int = 8) -> int:
+        # Indexes from after the last indexed height (or `start`) up to `end`, by default the chain head.
+        last_height = self.last_height
+        if last_height is not None and (start is None or start <= last_height):
+            start = last_height + 1
+        elif start is None:
+            start = 0
+        end = get_latest_block_height(base_url) if end is None else end
+        if start > end:
+            return 0
+        return self.add_blocks(iter_block_txs(base_url, start, end, max_workers, TX_FIELDS))
+
+    def query(self,
+              type: str = None,
+              account: str = None,
+              seq: int = None,
+              actor: str = None,
+              tx_hash: str = None,
+              from_height: int = None,
+              to_height: int = None,
+              latest_first: bool = False,
+              limit: int = None) -> list[dict]:
+        conditions, params = [], []
+        for column, value in (("type", type and normalize_function(type)),
+                              ("account", account and normalize_addr(account)),
+                              ("seq", seq),
+                              ("actor", actor and normalize_addr(actor)),
+                              ("tx_hash", tx_hash)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if from_height is not None:
+            conditions.append("height >= ?")
+            params.append(from_height)
+        if to_height is not None:
+            conditions.append("height <= ?")
+            params.append(to_height)
+        sql = "SELECT * FROM events"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        order = "DESC" if latest_first else "ASC"
+        sql += f" ORDER BY height {order}, tx_index {order}, event_index {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [dict(row, data=json.loads(row["data"])) for row in rows]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index Move events of finalized blocks in SQLite and query them.")
+    parser.add_argument("--db", default="events.sqlite3")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sync_parser = subparsers.add_parser("sync", help="index new blocks up to the chain head")
+    sync_parser.add_argument("--url", default="https://rpc-testnet.supra.com")
+    sync_parser.add_argument("--start", type=int, help="first height, when the index is empty")
+    sync_parser.add_argument("--end", type=int)
+    sync_parser.add_argument("--workers", type=int, default=8)
+    query_parser = subparsers.add_parser("query", help="print matching events as JSON lines")
+    query_parser.add_argument("--type", help="e.g. 0x1::multisig_account::VoteEvent")
+    query_parser.add_argument("--account")
+    query_parser.add_argument("--seq", type=int)
+    query_parser.add_argument("--actor")
+    query_parser.add_argument("--tx-hash")
+    query_parser.add_argument("--latest-first", action="store_true")
+    query_parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    index = EventIndex(args.db)
+    if args.command == "sync":
+        added = index.sync(args.url.rstrip("/"), args.start, args.end, args.workers)
+        print(f"Events added: {added}, indexed up to height {index.last_height}")
+    else:
+        for event in index.query(args.type, args.account, args.seq, args.actor, args.tx_hash,
+                                 latest_first=args.latest_first, limit=args.limit):
+            print(json.dumps(event))
+    index.close()
@@ -6,12 +6,10 @@ from aptos_sdk.transactions import EntryFunction
 from check_balance import get_account_supra_coin_balance
 from check_transaction import wait_for_tx
 from derive_keys import load_multiple_private_keys
+from multisig_snapshot import get_multisig_snapshot, print_multisig_snapshot
 from propose_multisig_tx import compute_multisig_account_addr
 from transaction_payload import Multisig, MultiSigTransactionPayload
 from transfer_supra import create_transfer_supra_entry_func, send_tx, create_entry_func
-from view_multisig_tx import invoke_module_view_function, get_multisig_account_owners, \
-    get_multisig_account_last_resolved_seq, get_multisig_account_next_sequence_number, \
-    get_multisig_num_signatures_required, get_multisig_tx_can_be_executed, get_multisig_tx_vote
 
 
 def create_multisig(multisig_addr: AccountAddress, entry_func: EntryFunction) -> Multisig:
@@ -43,26 +41,9 @@ if __name__ == "__main__":
     sender_account, sender_addr = owners[0], owner_addrs[0]
 
     multisig_addr = compute_multisig_account_addr(sender_addr, 1)
-    print("Multisig address:", str(multisig_addr))
-    multisig_owners = get_multisig_account_owners(base_url, multisig_addr)
-    print("Multisig account owners:", multisig_owners)
     print("Owners:", owner_addrs)
-
-    last_resolved_seq = get_multisig_account_last_resolved_seq(base_url, multisig_addr)
-    print("Multisig last resolved seq:", last_resolved_seq)
-    multisig_seq = get_multisig_account_next_sequence_number(base_url, multisig_addr) - 1
-    print("Multisig current sequence number:", multisig_seq)
-
-    threshold = get_multisig_num_signatures_required(base_url, multisig_addr)
-    print("Multisig threshold:", threshold)
-
-    print("Multisig tx can be executed:",
-          get_multisig_tx_can_be_executed(base_url, multisig_addr, last_resolved_seq + 1))
-
-    for addr in multisig_owners:
-        voted, vote = get_multisig_tx_vote(base_url, multisig_addr, last_resolved_seq + 1,
-                                           AccountAddress.from_str_relaxed(addr))
-        print(f"Voted: {voted}, vote: {vote}")
+    snapshot = get_multisig_snapshot(base_url, multisig_addr)
+    print_multisig_snapshot(snapshot)
 
     # entry_func = create_remove_multisig_tx_entry_func(multisig_addr)
     # tx_hash = send_tx(base_url, owners[0], entry_func)
@@ -0,0 +1,798 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from urllib.parse import urlsplit, parse_qs, unquote
+
+# A local stand-in for a Supra RPC node, for reproducible load tests of the client on one machine. It implements
+# every endpoint the client uses with in-memory state and simulated block production:
+#   GET  /rpc/v1/transactions/chain_id
+#   GET  /rpc/v1/accounts/{addr}
+#   GET  /rpc/v1/accounts/{addr}/resources?count=&start=
+#   GET  /rpc/v1/accounts/{addr}/resources/{type}
+#   GET  /rpc/v1/block
+#   GET  /rpc/v1/block/height/{height}?with_finalized_transactions=true
+#   GET  /rpc/v1/transactions/{hash}
+#   GET  /rpc/v1/wallet/faucet/{addr}
+#   POST /rpc/v1/view                     (0x1::multisig_account::*)
+#   POST /rpc/v1/transactions/simulate
+#   POST /rpc/v1/transactions/submit
+# Supported payloads are supra_account::transfer / batch_transfer, the multisig_account entry functions used by
+# the scripts in this repo, and Multisig payloads wrapping those. Signatures are not verified.
+
+MULTISIG_SEED = b"supra_framework::multisig_account"
+RESOURCE_ACCOUNT_SCHEME = b"\xff"
+COIN_STORE = "0x1::coin::CoinStore<0x1::supra_coin::SupraCoin>"
+MULTISIG_RESOURCE = "0x1::multisig_account::MultisigAccount"
+ACCOUNT_RESOURCE = "0x1::account::Account"
+
+# Gas used per entry function, chosen so the client's fixed max_gas guesses (10 / 1020) fit.
+GAS_SCHEDULE = {
+    "supra_account::transfer": 9,
+    "supra_account::transfer_new_account": 510,
+    "supra_account::batch_transfer": 5,
+    "supra_account::batch_transfer_per_recipient": 6,
+    "multisig_account::create_with_owners": 1500,
+    "multisig_account::create_transaction_with_hash": 12,
+    "multisig_account::vote_transanction": 6,
+    "multisig_account::execute_rejected_transaction": 8,
+    "multisig": 10,
+}
+ABORT_GAS = 5
+SUCCESS = "Executed successfully"
+
+
+@dataclass
+class FakeNodeConfig:
+    host: str = "127.0.0.1"
+    port: int = 8080
+    chain_id: int = 255
+    seed: int = 0
+    block_interval_sec: float = 1.0
+    max_block_txs: int = 10_000
+    # Probability that a round times out before a block is produced, for "timeout rounds" statistics.
+    timeout_round_rate: float = 0.0
+    # Per-request latency: (distribution, a, b) in milliseconds. Distributions: fixed (a), uniform (a..b),
+    # normal (mean a, stddev b), lognormal (median a, sigma b), exponential (mean a).
+    latency: tuple[str, float, float] = ("fixed", 0.0, 0.0)
+    # Fraction of requests answered with HTTP 500.
+    error_rate: float = 0.0
+    # Token bucket over all requests; 0 disables rate limiting. Limited requests get HTTP 429 with Retry-After.
+    rate_limit_rps: float = 0.0
+    rate_limit_burst: int = 100
+    faucet_amount: int = 500_000_000
+    genesis_balances: dict[str, int] = field(default_factory=dict)
+
+
+def normalize_addr(addr: str) -> str:
+    addr = addr.lower()
+    addr = addr[2:] if addr.startswith("0x") else addr
+    return "0x" + addr.zfill(64)
+
+
+def sha3_hex(data: bytes) -> str:
+    return "0x" + hashlib.sha3_256(data).hexdigest()
+
+
+class MoveAbort(Exception):
+    pass
+
+
+class BcsReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def read(self, n: int) -> bytes:
+        if self.pos + n > len(self.data):
+            raise MoveAbort("NUMBER_OF_ARGUMENTS_MISMATCH")
+        out = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return out
+
+    def uleb128(self) -> int:
+        value, shift = 0, 0
+        while True:
+            byte = self.read(1)[0]
+            value |= (byte & 0x7F) << shift
+            if byte & 0x80 == 0:
+                return value
+            shift += 7
+
+    def address(self) -> str:
+        return "0x" + self.read(32).hex()
+
+    def u64(self) -> int:
+        return int.from_bytes(self.read(8), "little")
+
+    def bool(self) -> bool:
+        return self.read(1) == b"\x01"
+
+    def bytes(self) -> bytes:
+        return self.read(self.uleb128())
+
+    def vector(self, read_item: Callable[[], Any]) -> list:
+        return [read_item() for _ in range(self.uleb128())]
+
+
+def uleb128(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def entry_function_bcs(entry_func: dict) -> bytes:
+    # BCS encoding of an EntryFunction given in the client's payload_to_dict form, used for payload hashes.
+    module = entry_func["module"]
+    name = module["name"].encode()
+    function = entry_func["function"].encode()
+    out = bytearray(bytes.fromhex(normalize_addr(module["address"])[2:]))
+    out += uleb128(len(name)) + name + uleb128(len(function)) + function
+    if entry_func.get("ty_args"):
+        raise MoveAbort("type arguments are not supported by the fake node")
+    out += uleb128(0) + uleb128(len(entry_func["args"]))
+    for arg in entry_func["args"]:
+        out += uleb128(len(arg)) + bytes(arg)
+    return bytes(out)
+
+
+class Latency:
+    def __init__(self, spec: tuple[str, float, float], rng: random.Random):
+        self.kind, self.a, self.b = spec
+        self.rng = rng
+
+    def sample_sec(self) -> float:
+        if self.kind == "fixed":
+            ms = self.a
+        elif self.kind == "uniform":
+            ms = self.rng.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            ms = self.rng.gauss(self.a, self.b)
+        elif self.kind == "lognormal":
+            ms = self.rng.lognormvariate(math.log(max(self.a, 1e-9)), self.b)
+        elif self.kind == "exponential":
+            ms = self.rng.expovariate(1 / self.a) if self.a > 0 else 0.0
+        else:
+            raise ValueError(f"Unknown latency distribution {self.kind}")
+        return max(ms, 0.0) / 1000
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        # Returns 0 if a token was taken, otherwise the seconds until one is available.
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ChainState:
+    def __init__(self, config: FakeNodeConfig):
+        self.config = config
+        self.accounts: dict[str, dict] = {}
+        self.multisigs: dict[str, dict] = {}
+        self.txs: dict[str, dict] = {}
+        self.mempool: dict[str, dict] = {}
+        self.blocks: list[dict] = []
+        self.round = 0
+        self.rng = random.Random(config.seed)
+        for addr, balance in config.genesis_balances.items():
+            self.accounts[normalize_addr(addr)] = {"sequence_number": 0, "balance": balance}
+        self.produce_block()
+
+    # Execution. Every executor only reads state and returns (gas_used, events, writes); writes are closures that
+    # are applied on commit, so simulation is the same code path without the commit.
+
+    def execute(self, raw_txn: dict, now: float) -> tuple[str, int, list[dict], list[Callable[[], None]]]:
+        sender = normalize_addr(raw_txn["sender"])
+        max_gas = int(raw_txn["max_gas_amount"])
+        gas_price = int(raw_txn["gas_unit_price"])
+        if sender not in self.accounts:
+            return "SENDING_ACCOUNT_DOES_NOT_EXIST", 0, [], []
+        try:
+            gas_used, events, writes = self.execute_payload(sender, raw_txn["payload"], now)
+            vm_status = SUCCESS
+        except MoveAbort as e:
+            gas_used, events, writes = ABORT_GAS, [], []
+            vm_status = f"Move abort: {e}"
+        if gas_used > max_gas:
+            gas_used, events, writes = max_gas, [], []
+            vm_status = "OUT_OF_GAS"
+        fee = gas_used * gas_price
+
+        def charge():
+            self.accounts[sender]["balance"] -= fee
+            self.accounts[sender]["sequence_number"] += 1
+        return vm_status, gas_used, events, writes + [charge]
+
+    def execute_payload(self, sender: str, payload: dict, now: float) -> tuple[int, list[dict], list]:
+        if "EntryFunction" in payload:
+            return self.execute_entry_function(sender, payload["EntryFunction"], now)
+        if "Multisig" in payload:
+            return self.execute_multisig(sender, payload["Multisig"], now)
+        raise MoveAbort("FEATURE_UNDER_GATING")
+
+    def execute_entry_function(self, signer: str, entry_func: dict, now: float) -> tuple[int, list[dict], list]:
+        module = entry_func["module"]
+        if normalize_addr(module["address"]) != normalize_addr("0x1"):
+            raise MoveAbort("LINKER_ERROR")
+        name = f"{module['name']}::{entry_func['function']}"
+        args = [BcsReader(bytes(arg)) for arg in entry_func["args"]]
+        if name == "supra_account::transfer":
+            return self.transfer(signer, [args[0].address()], [args[1].u64()])
+        if name == "supra_account::batch_transfer":
+            recipients = args[0].vector(args[0].address)
+            amounts = args[1].vector(args[1].u64)
+            if len(recipients) != len(amounts):
+                raise MoveAbort("EMISMATCHING_RECIPIENTS_AND_AMOUNTS_LENGTH")
+            return self.transfer(signer, recipients, amounts, batch=True)
+        if name == "multisig_account::create_with_owners":
+            owners = args[0].vector(args[0].address)
+            threshold = args[1].u64()
+            timeout = args[4].u64()
+            return self.create_multisig(signer, owners, threshold, timeout)
+        if name == "multisig_account::create_transaction_with_hash":
+            return self.create_multisig_tx(signer, args[0].address(), args[1].bytes(), now)
+        if name == "multisig_account::vote_transanction":
+            return self.vote(signer, args[0].address(), args[1].u64(), args[2].bool())
+        if name == "multisig_account::execute_rejected_transaction":
+            return self.execute_rejected(signer, args[0].address(), now)
+        raise MoveAbort("FUNCTION_RESOLUTION_FAILURE")
+
+    def transfer(self, sender: str, recipients: list[str], amounts: list[int], batch: bool = False) -> tuple:
+        total = sum(amounts)
+        if self.accounts[sender]["balance"] < total:
+            raise MoveAbort("EINSUFFICIENT_BALANCE")
+        recipients = [normalize_addr(r) for r in recipients]
+        new_accounts = {r for r in recipients if r not in self.accounts}
+        if batch:
+            gas = GAS_SCHEDULE["supra_account::batch_transfer"] + \
+                  GAS_SCHEDULE["supra_account::batch_transfer_per_recipient"] * len(recipients)
+        else:
+            gas = GAS_SCHEDULE["supra_account::transfer"]
+        gas += GAS_SCHEDULE["supra_account::transfer_new_account"] * len(new_accounts)
+        events = [coin_event("WithdrawEvent", sender, total)]
+        events += [coin_event("DepositEvent", r, a) for r, a in zip(recipients, amounts)]
+
+        def write():
+            self.accounts[sender]["balance"] -= total
+            for r, a in zip(recipients, amounts):
+                self.accounts.setdefault(r, {"sequence_number": 0, "balance": 0})["balance"] += a
+        return gas, events, [write]
+
+    def create_multisig(self, creator: str, additional_owners: list[str], threshold: int, timeout: int) -> tuple:
+        seq = self.accounts[creator]["sequence_number"]
+        multisig_addr = sha3_hex(bytes.fromhex(creator[2:]) + MULTISIG_SEED + seq.to_bytes(8, "little") +
+                                 RESOURCE_ACCOUNT_SCHEME)
+        owners = [creator] + [normalize_addr(o) for o in additional_owners]
+        if not 1 <= threshold <= len(owners):
+            raise MoveAbort("EINVALID_SIGNATURES_REQUIRED")
+        if multisig_addr in self.multisigs:
+            raise MoveAbort("EACCOUNT_ALREADY_EXISTS")
+
+        def write():
+            self.accounts.setdefault(multisig_addr, {"sequence_number": 0, "balance": 0})
+            self.multisigs[multisig_addr] = {"owners": owners, "threshold": threshold, "timeout": timeout,
+                                             "last_resolved": 0, "next_seq": 1, "txs": {}}
+        return GAS_SCHEDULE["multisig_account::create_with_owners"], [], [write]
+
+    def get_multisig(self, multisig_addr: str) -> dict:
+        multisig = self.multisigs.get(normalize_addr(multisig_addr))
+        if multisig is None:
+            raise MoveAbort("EACCOUNT_NOT_MULTISIG")
+        return multisig
+
+    def create_multisig_tx(self, creator: str, multisig_addr: str, payload_hash: bytes, now: float) -> tuple:
+        multisig = self.get_multisig(multisig_addr)
+        if creator not in multisig["owners"]:
+            raise MoveAbort("ENOT_OWNER")
+        seq = multisig["next_seq"]
+
+        def write():
+            multisig["txs"][seq] = {"payload_hash": payload_hash, "votes": {creator: True}, "creator": creator,
+                                    "creation_time_secs": int(now)}
+            multisig["next_seq"] = seq + 1
+        event = multisig_event("CreateTransactionEvent", multisig_addr,
+                               {"creator": creator, "sequence_number": str(seq)})
+        return GAS_SCHEDULE["multisig_account::create_transaction_with_hash"], [event], [write]
+
+    def pending_multisig_tx(self, multisig: dict, seq: int) -> dict:
+        tx = multisig["txs"].get(seq)
+        if tx is None:
+            raise MoveAbort("ETRANSACTION_NOT_FOUND")
+        return tx
+
+    def vote(self, owner: str, multisig_addr: str, seq: int, approved: bool) -> tuple:
+        multisig = self.get_multisig(multisig_addr)
+        if owner not in multisig["owners"]:
+            raise MoveAbort("ENOT_OWNER")
+        tx = self.pending_multisig_tx(multisig, seq)
+
+        def write():
+            tx["votes"][owner] = approved
+        event = multisig_event("VoteEvent", multisig_addr,
+                               {"owner": owner, "sequence_number": str(seq), "approved": approved})
+        return GAS_SCHEDULE["multisig_account::vote_transanction"], [event], [write]
+
+    @staticmethod
+    def count_votes(multisig: dict, tx: dict) -> tuple[int, int]:
+        votes = [v for o, v in tx["votes"].items() if o in multisig["owners"]]
+        return sum(votes), len(votes) - sum(votes)
+
+    def is_expired(self, multisig: dict, tx: dict, now: float) -> bool:
+        return multisig["timeout"] > 0 and now > tx["creation_time_secs"] + multisig["timeout"]
+
+    def resolve_head(self, multisig_addr: str, multisig: dict, seq: int) -> Callable[[], None]:
+        def write():
+            del multisig["txs"][seq]
+            multisig["last_resolved"] = seq
+        return write
+
+    def execute_rejected(self, owner: str, multisig_addr: str, now: float) -> tuple:
+        multisig = self.get_multisig(multisig_addr)
+        if owner not in multisig["owners"]:
+            raise MoveAbort("ENOT_OWNER")
+        seq = multisig["last_resolved"] + 1
+        tx = self.pending_multisig_tx(multisig, seq)
+        _, rejections = self.count_votes(multisig, tx)
+        if rejections < multisig["threshold"] and not self.is_expired(multisig, tx, now):
+            raise MoveAbort("ENOT_ENOUGH_REJECTIONS")
+        event = multisig_event("ExecuteRejectedTransactionEvent", multisig_addr,
+                               {"sequence_number": str(seq), "num_rejections": str(rejections), "executor": owner})
+        return GAS_SCHEDULE["multisig_account::execute_rejected_transaction"], [event], \
+            [self.resolve_head(multisig_addr, multisig, seq)]
+
+    def execute_multisig(self, owner: str, payload: dict, now: float) -> tuple:
+        multisig_addr = normalize_addr(payload["multisig_address"])
+        multisig = self.get_multisig(multisig_addr)
+        if owner not in multisig["owners"]:
+            raise MoveAbort("ENOT_OWNER")
+        seq = multisig["last_resolved"] + 1
+        tx = self.pending_multisig_tx(multisig, seq)
+        approvals, _ = self.count_votes(multisig, tx)
+        if approvals < multisig["threshold"]:
+            raise MoveAbort("ENOT_ENOUGH_APPROVALS")
+        if self.is_expired(multisig, tx, now):
+            raise MoveAbort("ETRANSACTION_EXPIRED")
+        inner = (payload.get("transaction_payload") or {}).get("EntryFunction")
+        if inner is None:
+            raise MoveAbort("EPAYLOAD_DOES_NOT_EXIST")
+        if hashlib.sha3_256(uleb128(0) + entry_function_bcs(inner)).digest() != tx["payload_hash"]:
+            raise MoveAbort("EPAYLOAD_DOES_NOT_MATCH_HASH")
+        gas, events, writes = self.execute_entry_function(multisig_addr, inner, now)
+        events.append(multisig_event("TransactionExecutionSucceededEvent", multisig_addr,
+                                     {"sequence_number": str(seq), "executor": owner}))
+        return gas + GAS_SCHEDULE["multisig"], events, writes + [self.resolve_head(multisig_addr, multisig, seq)]
+
+    # Views.
+
+    def view(self, function: str, args: list[str]) -> list:
+        if not function.startswith("0x1::multisig_account::"):
+            raise MoveAbort("FUNCTION_RESOLUTION_FAILURE")
+        name = function.split("::")[-1]
+        multisig = self.get_multisig(args[0])
+        if name == "owners":
+            return [multisig["owners"]]
+        if name == "num_signatures_required":
+            return [str(multisig["threshold"])]
+        if name == "last_resolved_sequence_number":
+            return [str(multisig["last_resolved"])]
+        if name == "next_sequence_number":
+            return [str(multisig["next_seq"])]
+        seq = int(args[1])
+        is_head = seq == multisig["last_resolved"] + 1
+        if name == "can_be_executed":
+            tx = self.pending_multisig_tx(multisig, seq)
+            return [is_head and self.count_votes(multisig, tx)[0] >= multisig["threshold"]]
+        if name == "can_be_rejected":
+            tx = self.pending_multisig_tx(multisig, seq)
+            return [is_head and self.count_votes(multisig, tx)[1] >= multisig["threshold"]]
+        if name == "vote":
+            tx = self.pending_multisig_tx(multisig, seq)
+            owner = normalize_addr(args[2])
+            return [owner in tx["votes"], tx["votes"].get(owner, False)]
+        if name == "get_transaction":
+            tx = self.pending_multisig_tx(multisig, seq)
+            return [{
+                "payload": {"vec": []},
+                "payload_hash": {"vec": ["0x" + tx["payload_hash"].hex()]},
+                "votes": {"data": [{"key": k, "value": v} for k, v in tx["votes"].items()]},
+                "creator": tx["creator"],
+                "creation_time_secs": str(tx["creation_time_secs"]),
+            }]
+        raise MoveAbort("FUNCTION_RESOLUTION_FAILURE")
+
+    # Transactions and blocks.
+
+    def resources(self, addr: str) -> dict[str, dict]:
+        account = self.accounts[addr]
+        resources = {
+            ACCOUNT_RESOURCE: {"authentication_key": addr, "sequence_number": str(account["sequence_number"])},
+            COIN_STORE: {"coin": {"value": str(account["balance"])}, "frozen": False},
+        }
+        if addr in self.multisigs:
+            multisig = self.multisigs[addr]
+            resources[MULTISIG_RESOURCE] = {
+                "owners": multisig["owners"],
+                "num_signatures_required": str(multisig["threshold"]),
+                "last_executed_sequence_number": str(multisig["last_resolved"]),
+                "next_sequence_number": str(multisig["next_seq"]),
+            }
+        return resources
+
+    def validate(self, raw_txn: dict, now: float) -> str | None:
+        sender = normalize_addr(raw_txn["sender"])
+        account = self.accounts.get(sender)
+        if account is None:
+            return "SENDING_ACCOUNT_DOES_NOT_EXIST"
+        if int(raw_txn["chain_id"]) != self.config.chain_id:
+            return "BAD_CHAIN_ID"
+        if int(raw_txn["sequence_number"]) < account["sequence_number"]:
+            return "SEQUENCE_NUMBER_TOO_OLD"
+        if int(raw_txn["expiration_timestamp_secs"]) <= now:
+            return "TRANSACTION_EXPIRED"
+        if account["balance"] < int(raw_txn["max_gas_amount"]) * int(raw_txn["gas_unit_price"]):
+            return "INSUFFICIENT_BALANCE_FOR_TRANSACTION_FEE"
+        return None
+
+    def tx_info(self, tx_hash: str, raw_txn: dict, status: str, vm_status: str, gas_used: int,
+                events: list[dict], block_header: dict = None) -> dict:
+        info = {
+            "hash": tx_hash,
+            "header": {
+                "sender": {"Move": normalize_addr(raw_txn["sender"])},
+                "sequence_number": int(raw_txn["sequence_number"]),
+                "max_gas_amount": int(raw_txn["max_gas_amount"]),
+                "gas_unit_price": int(raw_txn["gas_unit_price"]),
+                "expiration_timestamp": {"microseconds_since_unix_epoch": int(raw_txn["expiration_timestamp_secs"]) * 1_000_000},
+                "chain_id": int(raw_txn["chain_id"]),
+            },
+            "payload": {"Move": payload_json(raw_txn["payload"])},
+            "output": {"Move": {"gas_used": gas_used, "vm_status": vm_status, "events": events}},
+            "status": status,
+        }
+        if block_header is not None:
+            info["block_header"] = {k: block_header[k] for k in ("hash", "height", "timestamp")}
+        return info
+
+    def simulate(self, body: dict, now: float) -> dict:
+        raw_txn = body["Move"]["raw_txn"]
+        vm_status, gas_used, events, _ = self.execute(raw_txn, now)
+        status = "Success" if vm_status == SUCCESS else "Fail"
+        return self.tx_info("", raw_txn, status, vm_status, gas_used, events)
+
+    def submit(self, body: dict, now: float) -> tuple[str | None, str | None]:
+        raw_txn = body["Move"]["raw_txn"]
+        error = self.validate(raw_txn, now)
+        if error is not None:
+            return None, error
+        tx_hash = sha3_hex(json.dumps(body, sort_keys=True).encode())
+        if tx_hash not in self.txs:
+            self.mempool[tx_hash] = raw_txn
+        return tx_hash, None
+
+    def include(self, tx_hash: str, info: dict, included: list[dict]) -> None:
+        del self.mempool[tx_hash]
+        self.txs[tx_hash] = info
+        included.append(info)
+
+    def faucet(self, addr: str, now: float) -> str:
+        addr = normalize_addr(addr)
+        tx_hash = sha3_hex(f"faucet:{addr}:{now}:{self.rng.random()}".encode())
+
+        def write():
+            self.accounts.setdefault(addr, {"sequence_number": 0, "balance": 0})["balance"] += self.config.faucet_amount
+        event = coin_event("DepositEvent", addr, self.config.faucet_amount)
+        self.mempool[tx_hash] = {"faucet": True, "writes": [write], "events": [event], "recipient": addr}
+        return tx_hash
+
+    def produce_block(self) -> None:
+        now = time.time()
+        self.round += 1
+        while self.rng.random() < self.config.timeout_round_rate:
+            self.round += 1
+        header = {
+            "hash": sha3_hex(f"block:{len(self.blocks)}:{self.round}".encode()),
+            "height": len(self.blocks),
+            "timestamp": {"microseconds_since_unix_epoch": int(now * 1_000_000)},
+            "view": {"epoch_id": 1, "round": self.round},
+            "author": normalize_addr("0x1"),
+        }
+        included = []
+        by_sender: dict[str, list[tuple[int, str, dict]]] = {}
+        for tx_hash, raw_txn in list(self.mempool.items()):
+            if raw_txn.get("faucet"):
+                if len(included) < self.config.max_block_txs:
+                    for write in raw_txn["writes"]:
+                        write()
+                    self.include(tx_hash, faucet_info(tx_hash, raw_txn, header), included)
+                continue
+            sender = normalize_addr(raw_txn["sender"])
+            by_sender.setdefault(sender, []).append((int(raw_txn["sequence_number"]), tx_hash, raw_txn))
+        for sender, pending in by_sender.items():
+            # Consecutive sequence numbers from one sender land in the same block; later ones wait for the gap.
+            for seq, tx_hash, raw_txn in sorted(pending, key=lambda p: p[0]):
+                account = self.accounts.get(sender)
+                if int(raw_txn["expiration_timestamp_secs"]) <= now or account is None or \
+                        seq < account["sequence_number"]:
+                    del self.mempool[tx_hash]
+                    continue
+                if seq != account["sequence_number"] or len(included) >= self.config.max_block_txs:
+                    break
+                vm_status, gas_used, events, writes = self.execute(raw_txn, now)
+                for write in writes:
+                    write()
+                status = "Success" if vm_status == SUCCESS else "Fail"
+                self.include(tx_hash, self.tx_info(tx_hash, raw_txn, status, vm_status, gas_used, events, header),
+                             included)
+        self.blocks.append({"header": header, "transactions": included})
+
+
+def coin_event(kind: str, account: str, amount: int) -> dict:
+    return {
+        "guid": {"creation_number": "0", "account_address": account},
+        "sequence_number": "0",
+        "type": f"0x1::coin::{kind}",
+        "data": {"amount": str(amount)},
+    }
+
+
+def multisig_event(kind: str, multisig_addr: str, data: dict) -> dict:
+    return {
+        "guid": {"creation_number": "0", "account_address": normalize_addr(multisig_addr)},
+        "sequence_number": "0",
+        "type": f"0x1::multisig_account::{kind}",
+        "data": data,
+    }
+
+
+def payload_json(payload: dict) -> dict:
+    if "Multisig" in payload:
+        multisig = payload["Multisig"]
+        inner = (multisig.get("transaction_payload") or {}).get("EntryFunction")
+        return {"type": "multisig_payload", "multisig_address": normalize_addr(multisig["multisig_address"]),
+                "transaction_payload": entry_function_json(inner) if inner else None}
+    if "EntryFunction" in payload:
+        return entry_function_json(payload["EntryFunction"])
+    return {"type": "script_payload"}
+
+
+def entry_function_json(entry_func: dict) -> dict:
+    module = entry_func["module"]
+    return {
+        "type": "entry_function_payload",
+        "function": f"{module['address']}::{module['name']}::{entry_func['function']}",
+        "type_arguments": [],
+        "arguments": ["0x" + bytes(arg).hex() for arg in entry_func["args"]],
+    }
+
+
+def faucet_info(tx_hash: str, faucet_tx: dict, header: dict) -> dict:
+    return {
+        "hash": tx_hash,
+        "header": {"sender": {"Move": normalize_addr("0x1")}, "sequence_number": 0},
+        "payload": {"Move": {"type": "entry_function_payload", "function": "0x1::supra_account::transfer",
+                             "type_arguments": [], "arguments": [faucet_tx["recipient"]]}},
+        "output": {"Move": {"gas_used": 0, "vm_status": SUCCESS, "events": faucet_tx["events"]}},
+        "status": "Success",
+        "block_header": {k: header[k] for k in ("hash", "height", "timestamp")},
+    }
+
+
+class FakeNode:
+    def __init__(self, config: FakeNodeConfig):
+        self.config = config
+        self.state = ChainState(config)
+        self.rng = random.Random(config.seed + 1)
+        self.latency = Latency(config.latency, self.rng)
+        self.bucket = TokenBucket(config.rate_limit_rps, config.rate_limit_burst) if config.rate_limit_rps else None
+        self.request_count = 0
+
+    def route(self, method: str, target: str, body: bytes) -> tuple[int, Any]:
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        query = parse_qs(url.query)
+        now = time.time()
+        state = self.state
+        if parts[:2] != ["rpc", "v1"]:
+            return 404, {"message": "not found"}
+        parts = parts[2:]
+
+        if method == "GET":
+            if parts == ["transactions", "chain_id"]:
+                return 200, self.config.chain_id
+            if len(parts) == 2 and parts[0] == "accounts":
+                account = state.accounts.get(normalize_addr(parts[1]))
+                if account is None:
+                    return 200, None
+                return 200, {"sequence_number": account["sequence_number"], "authentication_key": normalize_addr(parts[1])}
+            if len(parts) in (3, 4) and parts[0] == "accounts" and parts[2] == "resources":
+                addr = normalize_addr(parts[1])
+                if addr not in state.accounts:
+                    return 404, {"message": "account not found"}
+                resources = state.resources(addr)
+                if len(parts) == 3:
+                    # Paginated by position; the cursor is the position of the next page.
+                    start = int(query.get("start", ["0"])[0])
+                    count = int(query.get("count", ["20"])[0])
+                    page = list(resources.items())[start:start + count]
+                    cursor = str(start + count) if start + count < len(resources) else None
+                    return 200, {"Resources": {"resource": [list(item) for item in page], "cursor": cursor}}
+                if parts[3] in resources:
+                    return 200, {"result": [resources[parts[3]]]}
+                return 404, {"message": "resource not found"}
+            if parts == ["block"]:
+                return 200, state.blocks[-1]["header"]
+            if len(parts) == 3 and parts[:2] == ["block", "height"]:
+                height = int(parts[2])
+                if height >= len(state.blocks):
+                    return 404, {"message": "block not found"}
+                block = state.blocks[height]
+                with_txs = query.get("with_finalized_transactions", ["false"])[0] == "true"
+                return 200, {"header": block["header"], "transactions": block["transactions"] if with_txs else []}
+            if len(parts) == 2 and parts[0] == "transactions":
+                if parts[1] in state.mempool:
+                    return 200, {"hash": parts[1], "status": "Pending"}
+                return 200, state.txs.get(parts[1])
+            if len(parts) == 3 and parts[:2] == ["wallet", "faucet"]:
+                return 200, {"Accepted": state.faucet(parts[2], now)}
+
+        if method == "POST":
+            try:
+                d = json.loads(body)
+            except json.JSONDecodeError:
+                return 400, {"message": "invalid JSON body"}
+            if parts == ["view"]:
+                try:
+                    return 200, {"result": state.view(d["function"], d["arguments"])}
+                except MoveAbort as e:
+                    return 400, {"message": f"Move abort: {e}"}
+            if parts == ["transactions", "simulate"]:
+                return 200, state.simulate(d, now)
+            if parts == ["transactions", "submit"]:
+                tx_hash, error = state.submit(d, now)
+                if error is not None:
+                    return 400, {"message": f"Transaction validation failed. Reason: {error}"}
+                return 200, tx_hash
+
+        return 404, {"message": "not found"}
+
+    async def handle(self, method: str, target: str, body: bytes) -> tuple[int, Any, dict]:
+        self.request_count += 1
+        await asyncio.sleep(self.latency.sample_sec())
+        if self.bucket is not None:
+            wait = self.bucket.take()
+            if wait:
+                return 429, {"message": "rate limited"}, {"Retry-After": str(max(1, math.ceil(wait)))}
+        if self.config.error_rate and self.rng.random() < self.config.error_rate:
+            return 500, {"message": "injected error"}, {}
+        try:
+            status, payload = self.route(method, target, body)
+        except (KeyError, IndexError, ValueError, TypeError, AttributeError) as e:
+            # A malformed body, argument or path value gets an answer instead of a dropped connection.
+            return 400, {"message": f"invalid request: {type(e).__name__}: {e}"}, {}
+        return status, payload, {}
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode().partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload, extra_headers = await self.handle(method, target, body)
+                data = json.dumps(payload).encode()
+                head = [f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}",
+                        "Content-Type: application/json",
+                        f"Content-Length: {len(data)}"]
+                head += [f"{k}: {v}" for k, v in extra_headers.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def produce_blocks(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.block_interval_sec)
+            self.state.produce_block()
+
+    async def serve(self, ready: threading.Event = None) -> None:
+        server = await asyncio.start_server(self.serve_connection, self.config.host, self.config.port)
+        self.config.port = server.sockets[0].getsockname()[1]
+        producer = asyncio.create_task(self.produce_blocks())
+        if ready is not None:
+            ready.set()
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                producer.cancel()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.config.host}:{self.config.port}"
+
+
+def start_fake_node_in_thread(config: FakeNodeConfig) -> FakeNode:
+    # Runs the node on its own event loop in a daemon thread, e.g. for benchmarks driving it from the same process.
+    # Pass port=0 to pick a free port; the chosen port is in node.base_url once this returns.
+    node = FakeNode(config)
+    ready = threading.Event()
+    threading.Thread(target=lambda: asyncio.run(node.serve(ready)), daemon=True).start()
+    ready.wait()
+    return node
+
+
+def parse_latency(spec: str) -> tuple[str, float, float]:
+    kind, *params = spec.split(":")
+    params = [float(p) for p in params] + [0.0, 0.0]
+    return kind, params[0], params[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake Supra RPC node for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--chain-id", type=int, default=255)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--block-interval", type=float, default=1.0, help="seconds between blocks")
+    parser.add_argument("--max-block-txs", type=int, default=10_000)
+    parser.add_argument("--timeout-round-rate", type=float, default=0.0)
+    parser.add_argument("--latency", default="fixed:0", help="e.g. fixed:5, uniform:2:10, lognormal:20:0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests per second, 0 for unlimited")
+    parser.add_argument("--rate-limit-burst", type=int, default=100)
+    parser.add_argument("--fund", action="append", default=[], metavar="ADDR:AMOUNT",
+                        help="genesis balance, can be repeated")
+    args = parser.parse_args()
+
+    config = FakeNodeConfig(
+        host=args.host,
+        port=args.port,
+        chain_id=args.chain_id,
+        seed=args.seed,
+        block_interval_sec=args.block_interval,
+        max_block_txs=args.max_block_txs,
+        timeout_round_rate=args.timeout_round_rate,
+        latency=parse_latency(args.latency),
+        error_rate=args.error_rate,
+        rate_limit_rps=args.rate_limit,
+        rate_limit_burst=args.rate_limit_burst,
+        genesis_balances={addr: int(amount) for addr, amount in (f.rsplit(":", 1) for f in args.fund)},
+    )
+    node = FakeNode(config)
+    print(f"Fake Supra node on {node.base_url}, chain id {config.chain_id}")
+    asyncio.run(node.serve())
@@ -0,0 +1,155 @@
+import json
+import math
+import os
+import threading
+
+from aptos_sdk.account import Account
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.bcs import Deserializer
+from aptos_sdk.transactions import EntryFunction, Script
+
+from check_balance import account_exists
+from check_transaction import get_transaction_info
+from transaction_payload import Multisig
+
+# Learns the gas actually used by each kind of transaction, from simulations and confirmed transactions, and hands
+# out max_gas values with a safety margin instead of fixed guesses. Kinds are keyed on the entry function plus the
+# argument properties that change its cost, e.g.
+#   supra_account::transfer|recipient=new
+#   multisig_account::create_with_owners|owners=3
+#   multisig/supra_account::transfer|recipient=existing
+# Estimates are the largest of the recent samples plus the margin, so a rare expensive path is not forgotten after
+# one cheap run. Samples are persisted as JSON between runs.
+
+MAX_SAMPLES = 32
+
+
+def vector_length(arg: bytes) -> int:
+    return Deserializer(arg).uleb128()
+
+
+def size_bucket(n: int) -> int:
+    # Powers of two, so batches of similar size share an estimate.
+    return 1 << max(0, n - 1).bit_length()
+
+
+def transfer_properties(recipient_exists: bool) -> str:
+    return "recipient=existing" if recipient_exists else "recipient=new"
+
+
+def transfer_gas_key(recipient_exists: bool) -> str:
+    return "supra_account::transfer|" + transfer_properties(recipient_exists)
+
+
+def cached_account_exists(base_url: str, addr: str, exists_cache: dict[str, bool] = None) -> bool:
+    # With `exists_cache`, each account is looked up once, e.g. for many rows paying the same recipients.
+    if exists_cache is None:
+        return account_exists(base_url, addr)
+    if addr not in exists_cache:
+        exists_cache[addr] = account_exists(base_url, addr)
+    return exists_cache[addr]
+
+
+# Entry function -> argument properties that its gas use depends on. Functions not listed here are keyed on their
+# name alone.
+ARG_PROPERTIES = {
+    "supra_account::transfer": lambda base_url, args, exists_cache: transfer_properties(
+        cached_account_exists(base_url, str(AccountAddress(args[0])), exists_cache)),
+    "supra_account::batch_transfer":
+        lambda base_url, args, exists_cache: f"recipients={size_bucket(vector_length(args[0]))}",
+    "multisig_account::create_with_owners":
+        lambda base_url, args, exists_cache: f"owners={vector_length(args[0]) + 1}",
+}
+
+
+def gas_key(base_url: str, payload: EntryFunction | Multisig | Script, exists_cache: dict[str, bool] = None) -> str:
+    if isinstance(payload, Multisig):
+        inner = payload.transaction_payload
+        return "multisig/" + gas_key(base_url, inner.transaction_payload, exists_cache) if inner is not None \
+            else "multisig"
+    if isinstance(payload, EntryFunction):
+        function = f"{payload.module.name}::{payload.function}"
+        properties = ARG_PROPERTIES.get(function)
+        return f"{function}|{properties(base_url, payload.args, exists_cache)}" if properties is not None \
+            else function
+    return "script"
+
+
+class GasEstimator:
+    def __init__(self, cache_file: str = "gas_estimates.json", margin: float = 0.2):
+        self.cache_file = cache_file
+        self.margin = margin
+        self.lock = threading.Lock()
+        self.samples: dict[str, list[int]] = {}
+        # tx hash -> key, for transactions whose gas use is learned once they are confirmed
+        self.submitted: dict[str, str] = {}
+        self.load()
+
+    def load(self) -> None:
+        if self.cache_file and os.path.exists(self.cache_file):
+            with open(self.cache_file, "r") as f:
+                self.samples = json.load(f)
+
+    def save(self) -> None:
+        if not self.cache_file:
+            return
+        with self.lock:
+            samples = dict(self.samples)
+        with open(self.cache_file, "w") as f:
+            json.dump(samples, f, indent=2, sort_keys=True)
+
+    def observe(self, key: str, gas_used: int) -> None:
+        with self.lock:
+            samples = self.samples.setdefault(key, [])
+            samples.append(int(gas_used))
+            del samples[:-MAX_SAMPLES]
+
+    def estimate_key(self, key: str) -> int | None:
+        with self.lock:
+            samples = self.samples.get(key)
+            if not samples:
+                return None
+            gas_used = max(samples)
+        return max(gas_used + 1, math.ceil(gas_used * (1 + self.margin)))
+
+    def estimate(self, base_url: str, payload, default: int = None) -> int | None:
+        estimate = self.estimate_key(gas_key(base_url, payload))
+        return default if estimate is None else estimate
+
+    def max_gas_for(self, base_url: str, sender_account: Account, payload) -> tuple[int, str]:
+        # Returns the max_gas and the key it was estimated under. Known kinds cost no round trip; unknown ones are
+        # simulated once and remembered.
+        from dry_run import simulate_row, SIMULATION_MAX_GAS
+        from transfer_supra import get_account_seq_num, get_chain_id
+
+        key = gas_key(base_url, payload)
+        estimate = self.estimate_key(key)
+        if estimate is not None:
+            return estimate, key
+        seq = get_account_seq_num(base_url, str(sender_account.address()))
+        success, vm_status, gas_used = simulate_row(base_url, sender_account, payload, seq, get_chain_id(base_url),
+                                                    100)
+        print("Simulation result:", vm_status)
+        if not success:
+            return SIMULATION_MAX_GAS, key
+        self.observe(key, gas_used)
+        return self.estimate_key(key), key
+
+    def track(self, tx_hash: str, key: str) -> None:
+        with self.lock:
+            self.submitted[tx_hash] = key
+
+    def learn_from_confirmed(self, base_url: str, tx_hashes: [str]) -> None:
+        # Failed transactions are skipped: an abort says nothing about the cost of the successful path.
+        for tx_hash in tx_hashes:
+            with self.lock:
+                key = self.submitted.get(tx_hash)
+            if key is None:
+                continue
+            info = get_transaction_info(base_url, tx_hash) or {}
+            if info.get("status") == "Pending":
+                continue
+            with self.lock:
+                self.submitted.pop(tx_hash, None)
+            if info.get("status") == "Success":
+                self.observe(key, int(info["output"]["Move"]["gas_used"]))
@@ -0,0 +1,371 @@
+import argparse
+import csv
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from aptos_sdk.account import Account
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.bcs import Serializer
+
+from check_transaction import get_transaction_info
+from metrics import Histogram
+from rpc_client import READ, SUBMIT, configure_limiter
+from transfer_supra import SequenceAllocator, get_chain_id, create_entry_func, create_raw_tx, create_send_tx_dict, \
+    create_simulate_tx_dict, simulate_tx, submit_tx_json, submit_error_code
+
+# Drives SUPRA transfers against a node and records per-stage latencies in HDR histograms:
+#   queue      open-loop only: how late a transaction started against its schedule
+#   build      entry function and raw transaction
+#   sign       signature and submit body
+#   simulate   optional, with --simulate
+#   submit     submit request round trip
+#   inclusion  block timestamp minus the time the submit returned (mixes node and local clocks)
+#   finality   time the final status was first observed minus the time the submit returned
+# --rate sends at a fixed rate (open loop), --concurrency keeps that many transactions building or submitting at
+# once (closed loop). Both run until --count transactions are submitted or --duration seconds pass. E.g.
+#   python load_gen.py --fake-node --rate 200 --duration 30 --json run.json --csv run.csv
+#   python load_gen.py --network testnet --mnemonic mnemonic_multisig.enc --senders 4 --concurrency 8 --count 100
+
+NETWORKS = {
+    "testnet": "https://rpc-testnet.supra.com",
+    "mainnet": "https://rpc-mainnet.supra.com",
+}
+STAGES = ("queue", "build", "sign", "simulate", "submit", "inclusion", "finality")
+FINAL_STATUSES = ("Success", "Fail")
+DEFAULT_RECIPIENT = "0xe3948c9e3a24c51c4006ef2acc44606055117d021158f320062df099c4a94150"
+
+
+def categorize_error(response: str) -> str:
+    return submit_error_code(response) or "submit_rejected"
+
+
+@dataclass
+class LoadStats:
+    histograms: dict[str, Histogram] = field(default_factory=lambda: {stage: Histogram() for stage in STAGES})
+    errors: dict[str, int] = field(default_factory=dict)
+    submitted: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record_error(self, category: str) -> None:
+        with self.lock:
+            self.errors[category] = self.errors.get(category, 0) + 1
+
+
+class ConfirmationTracker:
+    # One thread polls every submitted, still unconfirmed transaction once per interval, so confirmation costs
+    # one request per pending hash per interval regardless of how many senders there are.
+    def __init__(self, base_url: str, stats: LoadStats, interval_sec: float, timeout_sec: float,
+                 max_workers: int = 16):
+        self.base_url = base_url
+        self.stats = stats
+        self.interval_sec = interval_sec
+        self.timeout_sec = timeout_sec
+        self.executor = ThreadPoolExecutor(max_workers)
+        self.lock = threading.Lock()
+        # tx hash -> (wall clock, monotonic clock) when the submit returned
+        self.pending: dict[str, tuple[float, float]] = {}
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def add(self, tx_hash: str, submitted_wall: float, submitted_mono: float) -> None:
+        with self.lock:
+            self.pending[tx_hash] = (submitted_wall, submitted_mono)
+
+    def poll_once(self) -> None:
+        with self.lock:
+            pending = list(self.pending.items())
+        infos = self.executor.map(lambda item: get_transaction_info(self.base_url, item[0]), pending)
+        now_mono = time.perf_counter()
+        for (tx_hash, (submitted_wall, submitted_mono)), info in zip(pending, infos):
+            status = (info or {}).get("status")
+            if status in FINAL_STATUSES:
+                block_time_us = int(info["block_header"]["timestamp"]["microseconds_since_unix_epoch"])
+                self.stats.histograms["inclusion"].record(block_time_us - submitted_wall * 1e6)
+                self.stats.histograms["finality"].record((now_mono - submitted_mono) * 1e6)
+                with self.stats.lock:
+                    if status == "Success":
+                        self.stats.succeeded += 1
+                    else:
+                        self.stats.failed += 1
+                        vm_status = info["output"]["Move"]["vm_status"]
+                        self.stats.errors[f"vm:{vm_status}"] = self.stats.errors.get(f"vm:{vm_status}", 0) + 1
+            elif now_mono - submitted_mono > self.timeout_sec:
+                self.stats.record_error("confirmation_timeout")
+            else:
+                continue
+            with self.lock:
+                del self.pending[tx_hash]
+
+    def run(self) -> None:
+        while not self.stopping.is_set():
+            started = time.perf_counter()
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.stats.record_error(f"poll:{type(e).__name__}")
+            self.stopping.wait(max(0.0, self.interval_sec - (time.perf_counter() - started)))
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def drain(self) -> None:
+        # Waits until every submitted transaction is final or timed out.
+        while True:
+            with self.lock:
+                if not self.pending:
+                    break
+            time.sleep(self.interval_sec / 2)
+        self.stopping.set()
+        self.thread.join()
+        self.executor.shutdown()
+
+
+class LoadGenerator:
+    def __init__(self, base_url: str, senders: [Account], recipient: str, amount: int, max_gas: int,
+                 simulate: bool, tracker: ConfirmationTracker, stats: LoadStats):
+        self.base_url = base_url
+        self.senders = senders
+        self.recipient = AccountAddress.from_str_relaxed(recipient)
+        self.amount = amount
+        self.max_gas = max_gas
+        self.simulate = simulate
+        self.tracker = tracker
+        self.stats = stats
+        self.chain_id = get_chain_id(base_url)
+        self.allocator = SequenceAllocator(base_url)
+        self.counter = 0
+        self.counter_lock = threading.Lock()
+
+    def next_sender(self) -> Account:
+        with self.counter_lock:
+            self.counter += 1
+            return self.senders[self.counter % len(self.senders)]
+
+    def send_one(self, scheduled: float = None) -> None:
+        histograms = self.stats.histograms
+        t0 = time.perf_counter()
+        if scheduled is not None:
+            histograms["queue"].record((t0 - scheduled) * 1e6)
+        sender = self.next_sender()
+        sender_addr = str(sender.address())
+        seq, sending = None, False
+        try:
+            seq = self.allocator.allocate(sender_addr)
+            entry_func = create_entry_func("supra_account", "transfer", [self.recipient, self.amount],
+                                           [Serializer.struct, Serializer.u64])
+            raw_tx = create_raw_tx(sender.address(), seq, entry_func, self.max_gas, chain_id=self.chain_id)
+            t1 = time.perf_counter()
+            histograms["build"].record((t1 - t0) * 1e6)
+
+            send_tx_dict = create_send_tx_dict(sender, raw_tx)
+            t2 = time.perf_counter()
+            histograms["sign"].record((t2 - t1) * 1e6)
+
+            if self.simulate:
+                res = simulate_tx(self.base_url, create_simulate_tx_dict(sender.public_key(), raw_tx))
+                t3 = time.perf_counter()
+                histograms["simulate"].record((t3 - t2) * 1e6)
+                if res.get("status") != "Success":
+                    self.allocator.release(sender_addr, seq)
+                    self.stats.record_error(f"simulate:{categorize_error(str(res))}")
+                    return
+                t2 = t3
+
+            sending = True
+            tx_hash = submit_tx_json(self.base_url, send_tx_dict)
+            t4 = time.perf_counter()
+            histograms["submit"].record((t4 - t2) * 1e6)
+        except Exception as e:
+            if sending:
+                # The node may or may not have taken the transaction; only the chain knows the next number.
+                self.allocator.reset(sender_addr)
+            elif seq is not None:
+                self.allocator.release(sender_addr, seq)
+            self.stats.record_error(type(e).__name__)
+            return
+
+        if not tx_hash.startswith("0x"):
+            self.allocator.release(sender_addr, seq)
+            self.stats.record_error(categorize_error(tx_hash))
+            return
+        with self.stats.lock:
+            self.stats.submitted += 1
+        self.tracker.add(tx_hash, time.time(), t4)
+
+    def run_open_loop(self, rate: float, count: int, duration_sec: float, max_workers: int) -> None:
+        # Start times are fixed up front, so a slow node shows up as queue latency instead of a lower send rate.
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers) as executor:
+            i = 0
+            while i < count:
+                scheduled = start + i / rate
+                if scheduled - start >= duration_sec:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.send_one, scheduled)
+                i += 1
+
+    def run_closed_loop(self, concurrency: int, count: int, duration_sec: float) -> None:
+        deadline = time.perf_counter() + duration_sec
+        remaining = [count]
+        remaining_lock = threading.Lock()
+
+        def worker():
+            while time.perf_counter() < deadline:
+                with remaining_lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                self.send_one()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+
+def fund_new_senders(base_url: str, n: int, interval_sec: float = 1.0, repeat: int = 60) -> [Account]:
+    # Faucet-funded throwaway senders, for the fake node or testnet.
+    from airdrop import fund_account_with_faucet
+    from check_balance import account_exists
+
+    senders = [Account.generate() for _ in range(n)]
+    for sender in senders:
+        fund_account_with_faucet(base_url, str(sender.address()))
+    for _ in range(repeat):
+        if all(account_exists(base_url, str(sender.address())) for sender in senders):
+            return senders
+        time.sleep(interval_sec)
+    raise RuntimeError("Faucet did not fund the load generator senders in time")
+
+
+def load_senders(mnemonic_file: str, n: int) -> [Account]:
+    from derive_keys import generate_bip44_account
+    from gen_mnemonic import load_mnemonic
+
+    mnemonic = load_mnemonic(mnemonic_file)
+    return [Account.load_key(generate_bip44_account(mnemonic, i).hex()) for i in range(n)]
+
+
+def build_report(stats: LoadStats, config: dict, send_elapsed_sec: float, total_elapsed_sec: float) -> dict:
+    return {
+        "timestamp": int(time.time()),
+        "config": config,
+        "submitted": stats.submitted,
+        "succeeded": stats.succeeded,
+        "failed": stats.failed,
+        "errors": dict(sorted(stats.errors.items())),
+        "submit_tps": stats.submitted / send_elapsed_sec if send_elapsed_sec else 0.0,
+        "confirmed_tps": stats.succeeded / total_elapsed_sec if total_elapsed_sec else 0.0,
+        "send_elapsed_sec": send_elapsed_sec,
+        "total_elapsed_sec": total_elapsed_sec,
+        # Latencies in milliseconds.
+        "latency_ms": {stage: h.summary(1000) for stage, h in stats.histograms.items() if h.count},
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\nSubmitted: {report['submitted']}, succeeded: {report['succeeded']}, failed: {report['failed']}")
+    print(f"Submit TPS: {report['submit_tps']:.1f}, confirmed TPS: {report['confirmed_tps']:.1f}")
+    print(f"\n{'stage':<10} {'count':>7} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  (ms)")
+    for stage, s in report["latency_ms"].items():
+        print(f"{stage:<10} {s['count']:>7} {s['mean']:9.2f} {s['p50']:9.2f} {s['p90']:9.2f} {s['p99']:9.2f} "
+              f"{s['max']:9.2f}")
+    if report["errors"]:
+        print("\nErrors:")
+        for category, n in report["errors"].items():
+            print(f"  {category}: {n}")
+
+
+def write_csv(file_path: str, report: dict) -> None:
+    # One row per stage, with the run's headline numbers repeated so rows from many runs can be concatenated.
+    with open(file_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "mode", "target", "stage", "count", "mean_ms", "p50_ms", "p90_ms", "p99_ms",
+                         "max_ms", "submit_tps", "confirmed_tps", "errors"])
+        config = report["config"]
+        for stage, s in report["latency_ms"].items():
+            writer.writerow([report["timestamp"], config["mode"], config["target"], stage, s["count"],
+                             round(s["mean"], 3), s["p50"], s["p90"], s["p99"], s["max"],
+                             round(report["submit_tps"], 2), round(report["confirmed_tps"], 2),
+                             sum(report["errors"].values())])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transfer load generator with per-stage latency histograms.")
+    parser.add_argument("--network", choices=NETWORKS, default="testnet")
+    parser.add_argument("--url", help="RPC base URL, overrides --network")
+    parser.add_argument("--fake-node", action="store_true", help="run against an in-process fake node")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--rate", type=float, help="target transactions per second (open loop)")
+    mode.add_argument("--concurrency", type=int, help="transactions in flight (closed loop)")
+    parser.add_argument("--count", type=int, default=sys.maxsize, help="stop after this many transactions")
+    parser.add_argument("--duration", type=float, default=10.0, help="stop after this many seconds")
+    parser.add_argument("--mnemonic", help="encrypted mnemonic file of the senders, else faucet-funded new accounts")
+    parser.add_argument("--senders", type=int, default=4)
+    parser.add_argument("--recipient", default=DEFAULT_RECIPIENT)
+    parser.add_argument("--amount", type=int, default=1)
+    parser.add_argument("--max-gas", type=int, default=1020)
+    parser.add_argument("--simulate", action="store_true", help="simulate every transaction before submitting")
+    parser.add_argument("--workers", type=int, default=64, help="open-loop sender threads")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for each confirmation")
+    parser.add_argument("--json", help="write the report to this JSON file")
+    parser.add_argument("--csv", help="write per-stage rows to this CSV file")
+    args = parser.parse_args()
+
+    # The offered load is the experiment: pin the adaptive RPC limits to it, so they do not throttle the run.
+    in_flight = args.concurrency or args.workers
+    for budget in (READ, SUBMIT):
+        configure_limiter(budget, initial=in_flight, min_limit=in_flight, max_limit=in_flight)
+
+    if args.fake_node:
+        from fake_node import FakeNodeConfig, start_fake_node_in_thread
+
+        base_url = start_fake_node_in_thread(FakeNodeConfig(port=0, block_interval_sec=0.5)).base_url
+    else:
+        base_url = (args.url or NETWORKS[args.network]).rstrip("/")
+
+    if args.mnemonic:
+        senders = load_senders(args.mnemonic, args.senders)
+    else:
+        senders = fund_new_senders(base_url, args.senders)
+
+    stats = LoadStats()
+    tracker = ConfirmationTracker(base_url, stats, args.poll_interval, args.timeout)
+    generator = LoadGenerator(base_url, senders, args.recipient, args.amount, args.max_gas, args.simulate,
+                              tracker, stats)
+    config = {
+        "base_url": base_url,
+        "mode": "rate" if args.rate else "concurrency",
+        "target": args.rate or args.concurrency,
+        "senders": len(senders),
+        "simulate": args.simulate,
+    }
+
+    print(f"Sending to {base_url} from {len(senders)} senders, {config['mode']} {config['target']}.")
+    tracker.start()
+    start = time.perf_counter()
+    if args.rate:
+        generator.run_open_loop(args.rate, args.count, args.duration, args.workers)
+    else:
+        generator.run_closed_loop(args.concurrency, args.count, args.duration)
+    send_elapsed = time.perf_counter() - start
+    tracker.drain()
+    report = build_report(stats, config, send_elapsed, time.perf_counter() - start)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.csv:
+        write_csv(args.csv, report)
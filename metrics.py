@@ -0,0 +1,208 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+
+class Histogram:
+    # HDR-style log-linear histogram over non-negative integers (e.g. microseconds). Values are kept in buckets of
+    # 2^significant_bits sub-buckets per power of two, which bounds the relative error of every reported value by
+    # 2^-(significant_bits - 1) (under 1.6% for the default) at any magnitude, in a small sparse table.
+    def __init__(self, significant_bits: int = 7):
+        self.significant_bits = significant_bits
+        self.lock = threading.Lock()
+        self.counts: dict[tuple[int, int], int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def bucket(self, value: int) -> tuple[int, int]:
+        shift = max(0, value.bit_length() - self.significant_bits)
+        return shift, value >> shift
+
+    def record(self, value: float) -> None:
+        value = max(0, int(value))
+        key = self.bucket(value)
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "Histogram") -> None:
+        with self.lock, other.lock:
+            for key, n in other.counts.items():
+                self.counts[key] = self.counts.get(key, 0) + n
+            self.count += other.count
+            self.total += other.total
+            if other.count:
+                self.min = other.min if self.min is None else min(self.min, other.min)
+                self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, p: float) -> int:
+        # Highest value equivalent to the bucket holding the p-th percentile, capped at the exact maximum.
+        with self.lock:
+            if not self.count:
+                return 0
+            rank = max(1, round(p / 100 * self.count))
+            seen = 0
+            for shift, mantissa in sorted(self.counts):
+                seen += self.counts[(shift, mantissa)]
+                if seen >= rank:
+                    return min(((mantissa + 1) << shift) - 1, self.max)
+            return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self, scale: float = 1.0) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean() / scale,
+            "p50": self.percentile(50) / scale,
+            "p90": self.percentile(90) / scale,
+            "p99": self.percentile(99) / scale,
+            "max": (self.max or 0) / scale,
+        }
+
+
+# Process-wide counters, gauges and histograms, labelled like Prometheus series. Recording takes one lock and a few
+# dict operations, so it stays on in production; exporting walks everything once.
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: dict[tuple[str, tuple], float] = {}
+        self.gauges: dict[tuple[str, tuple], float] = {}
+        self.histograms: dict[tuple[str, tuple], Histogram] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        h = self.histograms.get(key)
+        if h is None:
+            with self.lock:
+                h = self.histograms.setdefault(key, Histogram())
+        return h
+
+    def observe_us(self, name: str, value_us: float, **labels) -> None:
+        self.histogram(name, **labels).record(value_us)
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        # Histograms are recorded in microseconds and exported in seconds.
+        with self.lock:
+            counters = list(self.counters.items())
+            gauges = list(self.gauges.items())
+            histograms = list(self.histograms.items())
+        return {
+            "timestamp": time.time(),
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in counters],
+            "gauges": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in gauges],
+            "histograms": [{"name": name, "labels": dict(labels), **h.summary(1e6)}
+                           for (name, labels), h in histograms],
+        }
+
+    def prometheus_text(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+        for c in sorted(snapshot["counters"], key=lambda c: c["name"]):
+            if c["name"] not in typed:
+                lines.append(f"# TYPE {c['name']} counter")
+                typed.add(c["name"])
+            lines.append(f"{c['name']}{prometheus_labels(c['labels'])} {c['value']}")
+        for g in sorted(snapshot["gauges"], key=lambda g: g["name"]):
+            if g["name"] not in typed:
+                lines.append(f"# TYPE {g['name']} gauge")
+                typed.add(g["name"])
+            lines.append(f"{g['name']}{prometheus_labels(g['labels'])} {g['value']}")
+        for h in sorted(snapshot["histograms"], key=lambda h: h["name"]):
+            name = f"{h['name']}_seconds"
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            for q in ("p50", "p90", "p99"):
+                quantile = int(q[1:]) / 100
+                lines.append(f"{name}{prometheus_labels(h['labels'], quantile=quantile)} {h[q]}")
+            lines.append(f"{name}_sum{prometheus_labels(h['labels'])} {h['mean'] * h['count']}")
+            lines.append(f"{name}_count{prometheus_labels(h['labels'])} {h['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def prometheus_labels(labels: dict, **extra) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+registry = Registry()
+
+# Completed spans are also written as JSON lines to this file when it is set, e.g. SUPRA_TRACE=trace.jsonl.
+TRACE_ENV = "SUPRA_TRACE"
+trace_lock = threading.Lock()
+span_stack = threading.local()
+
+
+@contextlib.contextmanager
+def span(name: str, **labels):
+    # Times a stage of a larger operation, e.g. span("send_tx.submit"). Spans nest per thread; the trace line of a
+    # nested span names its parent.
+    stack = span_stack.__dict__.setdefault("names", [])
+    parent = stack[-1] if stack else None
+    stack.append(name)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        registry.observe_us("supra_span_duration", elapsed * 1e6, span=name)
+        if error is not None:
+            registry.inc("supra_span_errors_total", span=name, error=error)
+        trace_file = os.environ.get(TRACE_ENV)
+        if trace_file:
+            line = json.dumps({"span": name, "parent": parent, "start": time.time() - elapsed,
+                               "duration_ms": elapsed * 1000, "error": error, **labels})
+            with trace_lock, open(trace_file, "a") as f:
+                f.write(line + "\n")
+
+
+def start_json_log(file_path: str, interval_sec: float = 60.0) -> threading.Event:
+    # Appends a snapshot of the registry to the file every interval from a daemon thread. Set the returned event to
+    # stop; one last snapshot is written on the way out.
+    stop = threading.Event()
+
+    def run():
+        while True:
+            stopped = stop.wait(interval_sec)
+            with open(file_path, "a") as f:
+                f.write(json.dumps(registry.snapshot()) + "\n")
+            if stopped:
+                return
+
+    threading.Thread(target=run, daemon=True).start()
+    return stop
@@ -3,6 +3,7 @@ from types import MethodType
 from aptos_sdk.account import Account
 from aptos_sdk.account_address import AccountAddress
 from aptos_sdk.ed25519 import MultiPublicKey, MultiSignature
+from aptos_sdk.transactions import RawTransaction
 
 from airdrop import fund_account_with_faucet, watch_balance
 from check_balance import get_account_supra_coin_balance
@@ -28,6 +29,22 @@ def multisig_to_crypto_bytes(self: MultiSignature) -> bytes:
     return signature_bytes
 
 
+def create_multi_ed25519_tx_dict(raw_tx: RawTransaction,
+                                 multisig_public_key: MultiPublicKey,
+                                 multisig_signature: MultiSignature) -> dict:
+    return {
+        "Move": {
+            "raw_txn": payload_to_dict(raw_tx),
+            "authenticator": {
+                "MultiEd25519": {
+                    "public_key": multisig_public_key.to_crypto_bytes().hex(),
+                    "signature": multisig_to_crypto_bytes(multisig_signature).hex(),
+                },
+            },
+        }
+    }
+
+
 if __name__ == "__main__":
     is_testnet = True
     base_url = "https://rpc-testnet.supra.com/" if is_testnet else "https://rpc-mainnet.supra.com"
@@ -74,17 +91,7 @@ if __name__ == "__main__":
     multisig_signature.to_crypto_bytes = MethodType(multisig_to_crypto_bytes, multisig_signature)
     assert multisig_public_key.verify(raw_tx.keyed(), multisig_signature)
 
-    tx_hash = submit_tx_json(base_url, {
-        "Move": {
-            "raw_txn": payload_to_dict(raw_tx),
-            "authenticator": {
-                "MultiEd25519": {
-                    "public_key": multisig_public_key.to_crypto_bytes().hex(),
-                    "signature": multisig_signature.to_crypto_bytes().hex(),
-                },
-            },
-        }
-    })
+    tx_hash = submit_tx_json(base_url, create_multi_ed25519_tx_dict(raw_tx, multisig_public_key, multisig_signature))
 
     print("Transaction submitted with hash:", tx_hash)
     wait_for_tx(base_url, tx_hash, 3, 5)
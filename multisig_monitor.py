@@ -0,0 +1,184 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from aptos_sdk.account_address import AccountAddress
+
+from check_block import get_latest_block_height
+from check_transaction import get_tx_events, get_event_account
+from multisig_snapshot import MultisigSnapshot, ViewCallPool, get_multisig_snapshot
+from rpc_client import record_cache
+from scan_blocks import iter_block_txs
+from view_multisig_tx import get_multisig_tx_creation_time
+
+NEEDS_REMOVAL = "execute_rejected_transaction"
+EXECUTABLE = "execute"
+NEEDS_VOTE = "vote"
+ACTION_PRIORITY = {NEEDS_REMOVAL: 0, EXECUTABLE: 1, NEEDS_VOTE: 2}
+
+MULTISIG_EVENT_PREFIX = "0x1::multisig_account::"
+# Events after which cached owners / threshold can no longer be trusted.
+METADATA_EVENTS = {"AddOwnersEvent", "RemoveOwnersEvent", "UpdateSignaturesRequiredEvent",
+                   "AddOwners", "RemoveOwners", "UpdateSignaturesRequired"}
+
+
+@dataclass(frozen=True)
+class WorkItem:
+    action: str
+    multisig_addr: str
+    seq: int
+    owner_addr: str = ""
+    reason: str = ""
+
+
+def normalize_addr(addr: str | AccountAddress) -> str:
+    return str(AccountAddress.from_str_relaxed(str(addr)))
+
+
+class MultisigMonitor:
+    def __init__(self,
+                 base_url: str,
+                 multisig_addrs: [str],
+                 my_addrs: [str],
+                 cache_file: str = "multisig_monitor_cache.json",
+                 timeouts: dict[str, int] = None,
+                 max_workers: int = 16):
+        self.base_url = base_url
+        self.multisig_addrs = [normalize_addr(addr) for addr in multisig_addrs]
+        self.my_addrs = {normalize_addr(addr) for addr in my_addrs}
+        self.cache_file = cache_file
+        # Proposal timeout per multisig account in seconds, as passed to `create_with_owners`.
+        self.timeouts = {normalize_addr(addr): t for addr, t in (timeouts or {}).items()}
+        self.max_workers = max_workers
+
+        self.metadata: dict[str, dict] = {}
+        self.creation_times: dict[str, int] = {}
+        self.snapshots: dict[str, MultisigSnapshot] = {}
+        self.last_height: int | None = None
+        self.load_cache()
+
+    def load_cache(self) -> None:
+        if not os.path.exists(self.cache_file):
+            return
+        with open(self.cache_file, "r") as f:
+            cache = json.load(f)
+        # Cached owners / threshold are only trusted up to the height they were saved at; the first refresh scans
+        # the blocks since then. Caches without a height predate that and are dropped.
+        self.last_height = cache.get("last_height")
+        self.metadata = cache.get("metadata", {}) if self.last_height is not None else {}
+        self.creation_times = cache.get("creation_times", {})
+
+    def save_cache(self) -> None:
+        with open(self.cache_file, "w") as f:
+            json.dump({"last_height": self.last_height, "metadata": self.metadata,
+                       "creation_times": self.creation_times}, f)
+
+    def find_touched_accounts(self, start: int, end: int) -> set[str]:
+        watched = set(self.multisig_addrs)
+        touched = set()
+        for _, txs in iter_block_txs(self.base_url, start, end, self.max_workers, ["output.Move.events"]):
+            for tx in txs:
+                for event in get_tx_events(tx):
+                    if not event.get("type", "").startswith(MULTISIG_EVENT_PREFIX):
+                        continue
+                    account = get_event_account(event)
+                    if not account or normalize_addr(account) not in watched:
+                        continue
+                    account = normalize_addr(account)
+                    touched.add(account)
+                    if event["type"][len(MULTISIG_EVENT_PREFIX):] in METADATA_EVENTS:
+                        self.metadata.pop(account, None)
+        return touched
+
+    def snapshot_accounts(self, accounts: set[str]) -> None:
+        with ViewCallPool(self.base_url, self.max_workers) as pool, ThreadPoolExecutor(self.max_workers) as executor:
+            def snapshot_one(addr: str) -> MultisigSnapshot:
+                meta = self.metadata.get(addr, {})
+                record_cache("multisig_metadata", bool(meta))
+                snapshot = get_multisig_snapshot(self.base_url, AccountAddress.from_str_relaxed(addr), pool,
+                                                 meta.get("owners"), meta.get("threshold"))
+                head = snapshot.last_resolved_seq + 1
+                key = f"{addr}/{head}"
+                if addr in self.timeouts and head in snapshot.pending_seqs and key not in self.creation_times:
+                    self.creation_times[key] = pool.submit(
+                        get_multisig_tx_creation_time, AccountAddress.from_str_relaxed(addr), head).result()
+                return snapshot
+
+            for addr, snapshot in zip(accounts, executor.map(snapshot_one, accounts)):
+                self.snapshots[addr] = snapshot
+                self.metadata[addr] = {"owners": list(snapshot.owners), "threshold": snapshot.threshold}
+
+    def refresh(self) -> list[WorkItem]:
+        head_height = get_latest_block_height(self.base_url)
+        if not self.snapshots:
+            # First refresh: every account is snapshotted, with the cached metadata of those untouched since the
+            # cache was saved.
+            if self.last_height is not None and self.last_height > head_height:
+                self.metadata.clear()
+            elif self.last_height is not None and self.last_height < head_height:
+                self.find_touched_accounts(self.last_height + 1, head_height)
+            dirty = set(self.multisig_addrs)
+        else:
+            dirty = self.find_touched_accounts(self.last_height + 1, head_height)
+        if dirty:
+            self.snapshot_accounts(dirty)
+        self.last_height = head_height
+        self.save_cache()
+        return self.work_list()
+
+    def work_list(self, now: int = None) -> list[WorkItem]:
+        now = now or int(time.time())
+        items = []
+        for addr, snapshot in self.snapshots.items():
+            if not snapshot.pending_seqs:
+                continue
+            head = snapshot.last_resolved_seq + 1
+            creation_time = self.creation_times.get(f"{addr}/{head}")
+            blocked = False
+            if snapshot.rejections(head) >= snapshot.threshold:
+                items.append(WorkItem(NEEDS_REMOVAL, addr, head, reason="rejected"))
+                blocked = True
+            elif creation_time is not None and addr in self.timeouts and now > creation_time + self.timeouts[addr]:
+                items.append(WorkItem(NEEDS_REMOVAL, addr, head, reason="expired"))
+                blocked = True
+            elif snapshot.can_be_executed(head):
+                items.append(WorkItem(EXECUTABLE, addr, head))
+
+            for seq in snapshot.pending_seqs:
+                if blocked and seq == head:
+                    continue
+                for owner_addr in self.my_addrs.intersection(snapshot.owners):
+                    if not snapshot.has_voted(seq, owner_addr):
+                        items.append(WorkItem(NEEDS_VOTE, addr, seq, owner_addr))
+        items.sort(key=lambda item: (ACTION_PRIORITY[item.action], item.multisig_addr, item.seq, item.owner_addr))
+        return items
+
+
+def print_work_list(items: list[WorkItem]) -> None:
+    if not items:
+        print("Nothing to do.")
+    for item in items:
+        who = f" by {item.owner_addr}" if item.owner_addr else ""
+        why = f" ({item.reason})" if item.reason else ""
+        print(f"{item.action}{why}: multisig {item.multisig_addr} seq {item.seq}{who}")
+
+
+if __name__ == "__main__":
+    is_testnet = False
+    base_url = "https://rpc-testnet1.supra.com/" if is_testnet else "https://rpc-mainnet.supra.com"
+
+    multisig_addrs = [
+        "0xadf39402c164a372a788358b7c8e695ae794d8f787ad36464708c8eb1f3a64a9",
+    ]
+    my_addrs = [
+        "0xb8922417130785087f9c7926e76542531b703693fdc74c9386b65cf4427f4e80",
+    ]
+    monitor = MultisigMonitor(base_url, multisig_addrs, my_addrs, timeouts={multisig_addrs[0]: 600})
+
+    for i in range(10):
+        items = monitor.refresh()
+        print(f"Work list at block height {monitor.last_height}:")
+        print_work_list(items)
+        time.sleep(30)
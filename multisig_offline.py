@@ -0,0 +1,148 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from aptos_sdk.account import Account
+from aptos_sdk.ed25519 import MultiPublicKey, MultiSignature, Signature
+from aptos_sdk.transactions import RawTransaction
+from aptos_sdk.bcs import Serializer
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
+
+from derive_keys import load_multiple_private_keys
+from multisig_auth import create_multi_ed25519_tx_dict
+from transfer_supra import deserialize_raw_tx, submit_tx_json
+
+SIGNATURE_LENGTH = 64
+
+
+# Partial signature exchange format, one per signer per transaction:
+#   u32 little-endian raw tx length | BCS raw tx bytes | u8 signer index | 64 byte Ed25519 signature
+# Files hold one hex-encoded partial signature per line, so they can be moved between machines as text.
+@dataclass(frozen=True)
+class PartialSignature:
+    raw_tx_bytes: bytes
+    signer_index: int
+    signature: bytes
+
+    def encode(self) -> bytes:
+        return len(self.raw_tx_bytes).to_bytes(4, "little") + self.raw_tx_bytes + \
+            bytes([self.signer_index]) + self.signature
+
+    @staticmethod
+    def decode(data: bytes) -> "PartialSignature":
+        raw_tx_len = int.from_bytes(data[:4], "little")
+        if len(data) != 4 + raw_tx_len + 1 + SIGNATURE_LENGTH:
+            raise Exception("Invalid partial signature length")
+        raw_tx_bytes = data[4:4 + raw_tx_len]
+        return PartialSignature(raw_tx_bytes, data[4 + raw_tx_len], data[5 + raw_tx_len:])
+
+
+def raw_tx_to_bytes(raw_tx: RawTransaction) -> bytes:
+    serializer = Serializer()
+    raw_tx.serialize(serializer)
+    return serializer.output()
+
+
+def create_partial_signature(account: Account, signer_index: int, raw_tx: RawTransaction) -> PartialSignature:
+    signature = account.sign(raw_tx.keyed())
+    return PartialSignature(raw_tx_to_bytes(raw_tx), signer_index, signature.data())
+
+
+def write_partial_signatures(file_path: str, partials: list[PartialSignature]) -> None:
+    with open(file_path, "a") as f:
+        for partial in partials:
+            f.write(partial.encode().hex() + "\n")
+
+
+def read_partial_signatures(file_paths: [str]) -> list[PartialSignature]:
+    partials = []
+    for file_path in file_paths:
+        with open(file_path, "r") as f:
+            partials.extend(PartialSignature.decode(bytes.fromhex(line.strip())) for line in f if line.strip())
+    return partials
+
+
+def verify_signature_chunk(chunk: list[tuple[bytes, bytes, bytes]]) -> list[bool]:
+    results = []
+    for public_key, message, signature in chunk:
+        try:
+            VerifyKey(public_key).verify(message, signature)
+            results.append(True)
+        except BadSignatureError:
+            results.append(False)
+    return results
+
+
+def batch_verify(items: list[tuple[bytes, bytes, bytes]], max_workers: int = None, chunk_size: int = 256) -> list[bool]:
+    # libsodium has no batch Ed25519 verification, so the batch is split into chunks and verified on all cores.
+    if len(items) <= chunk_size:
+        return verify_signature_chunk(items)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    with ProcessPoolExecutor(max_workers) as executor:
+        return [ok for results in executor.map(verify_signature_chunk, chunks) for ok in results]
+
+
+def aggregate_partial_signatures(partials: list[PartialSignature],
+                                 multisig_public_key: MultiPublicKey,
+                                 max_workers: int = None) -> tuple[list[tuple[RawTransaction, MultiSignature]], list[PartialSignature]]:
+    # Verifies all partial signatures of all transactions in one pass, then merges the valid ones per
+    # transaction. Returns the transactions that reached the threshold, and the partials that failed to verify.
+    messages: dict[bytes, bytes] = {}
+    raw_txs: dict[bytes, RawTransaction] = {}
+    unique = list({(p.raw_tx_bytes, p.signer_index, p.signature): p for p in partials}.values())
+    items = []
+    invalid = []
+    candidates = []
+    for partial in unique:
+        if partial.signer_index >= len(multisig_public_key.keys):
+            invalid.append(partial)
+            continue
+        if partial.raw_tx_bytes not in raw_txs:
+            raw_tx = deserialize_raw_tx(partial.raw_tx_bytes)
+            raw_txs[partial.raw_tx_bytes] = raw_tx
+            messages[partial.raw_tx_bytes] = raw_tx.keyed()
+        public_key = multisig_public_key.keys[partial.signer_index].to_crypto_bytes()
+        items.append((public_key, messages[partial.raw_tx_bytes], partial.signature))
+        candidates.append(partial)
+
+    signatures_by_tx: dict[bytes, dict[int, bytes]] = {}
+    for partial, ok in zip(candidates, batch_verify(items, max_workers)):
+        if ok:
+            signatures_by_tx.setdefault(partial.raw_tx_bytes, {})[partial.signer_index] = partial.signature
+        else:
+            invalid.append(partial)
+
+    aggregated = []
+    for raw_tx_bytes, signatures in signatures_by_tx.items():
+        if len(signatures) < multisig_public_key.threshold:
+            continue
+        # Signatures must be ordered by signer index to match the bitmap.
+        chosen = sorted(signatures.items())[:multisig_public_key.threshold]
+        aggregated.append((raw_txs[raw_tx_bytes], MultiSignature([(i, Signature(sig)) for i, sig in chosen])))
+    return aggregated, invalid
+
+
+if __name__ == "__main__":
+    is_testnet = True
+    base_url = "https://rpc-testnet.supra.com/" if is_testnet else "https://rpc-mainnet.supra.com"
+    mnemonic_file = "mnemonic_multisig.enc"
+    num_signers, threshold = 3, 2
+    partials_file = "partial_signatures.txt"
+    raw_tx_file = "raw_tx.hex"
+
+    # Each key holder signs the shared raw transaction on their own machine and appends to the partials file.
+    private_keys = load_multiple_private_keys(mnemonic_file, num_signers)
+    accounts = [Account.load_key(key.hex()) for key in private_keys]
+    multisig_public_key = MultiPublicKey([account.public_key() for account in accounts], threshold)
+
+    with open(raw_tx_file, "r") as f:
+        raw_tx = deserialize_raw_tx(bytes.fromhex(f.read().strip()))
+    write_partial_signatures(partials_file, [create_partial_signature(accounts[0], 0, raw_tx)])
+
+    # The operator aggregates and verifies everything collected.
+    aggregated, invalid = aggregate_partial_signatures(read_partial_signatures([partials_file]), multisig_public_key)
+    print(f"Transactions ready: {len(aggregated)}, invalid partial signatures: {len(invalid)}")
+    for raw_tx, multisig_signature in aggregated:
+        assert multisig_public_key.verify(raw_tx.keyed(), multisig_signature)
+        tx_hash = submit_tx_json(base_url, create_multi_ed25519_tx_dict(raw_tx, multisig_public_key, multisig_signature))
+        print(f"Transaction with sequence number {raw_tx.sequence_number} submitted with hash:", tx_hash)
@@ -0,0 +1,155 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable
+
+from rpc_client import record_cache
+from view_multisig_tx import get_multisig_account_owners, get_multisig_account_last_resolved_seq, \
+    get_multisig_account_next_sequence_number, get_multisig_num_signatures_required, \
+    get_multisig_tx_can_be_executed, get_multisig_tx_vote
+
+if TYPE_CHECKING:
+    from aptos_sdk.account_address import AccountAddress
+
+# The Aptos SDK is not imported at run time, so `supra.py multisig view` stays within the read-only startup budget
+# (see bench_startup.py); addresses are formatted by `address_str`.
+
+
+def address_str(addr) -> str:
+    # Same as str(AccountAddress.from_str_relaxed(addr)): 0x0 to 0xf short, any other address as 64 hex digits.
+    value = int(str(addr), 16)
+    return f"0x{value:x}" if value < 16 else f"0x{value:064x}"
+
+
+class ViewCallPool:
+    # Runs view calls on a thread pool and deduplicates identical calls, so that every distinct
+    # (function, arguments) pair hits the node at most once during the lifetime of the pool.
+    def __init__(self, base_url: str, max_workers: int = 16):
+        self.base_url = base_url
+        self.executor = ThreadPoolExecutor(max_workers)
+        self.lock = threading.Lock()
+        self.calls: dict[tuple, Future] = {}
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        key = (func.__qualname__, *(str(arg) for arg in args))
+        with self.lock:
+            future = self.calls.get(key)
+            record_cache("view_call_pool", future is not None)
+            if future is None:
+                future = self.executor.submit(func, self.base_url, *args)
+                self.calls[key] = future
+        return future
+
+    def clear(self) -> None:
+        with self.lock:
+            self.calls.clear()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self) -> "ViewCallPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@dataclass(frozen=True)
+class MultisigSnapshot:
+    multisig_addr: str
+    owners: tuple[str, ...]
+    threshold: int
+    last_resolved_seq: int
+    next_seq: int
+    # Indexed by position in `pending_seqs`.
+    executable: tuple[bool, ...]
+    # Indexed by position in `pending_seqs`, then by position in `owners`: (voted, approved).
+    votes: tuple[tuple[tuple[bool, bool], ...], ...]
+
+    @property
+    def pending_seqs(self) -> range:
+        return range(self.last_resolved_seq + 1, self.next_seq)
+
+    def can_be_executed(self, seq: int) -> bool:
+        return self.executable[self.pending_seqs.index(seq)]
+
+    def votes_for(self, seq: int) -> dict[str, tuple[bool, bool]]:
+        return dict(zip(self.owners, self.votes[self.pending_seqs.index(seq)]))
+
+    def approvals(self, seq: int) -> int:
+        return sum(voted and vote for voted, vote in self.votes[self.pending_seqs.index(seq)])
+
+    def rejections(self, seq: int) -> int:
+        return sum(voted and not vote for voted, vote in self.votes[self.pending_seqs.index(seq)])
+
+    def has_voted(self, seq: int, owner_addr: str) -> bool:
+        owner_addr = address_str(owner_addr)
+        return self.votes_for(seq)[owner_addr][0]
+
+
+def get_multisig_snapshot(base_url: str,
+                          multisig_addr: "AccountAddress",
+                          pool: ViewCallPool = None,
+                          owners: [str] = None,
+                          threshold: int = None) -> MultisigSnapshot:
+    # Callers that cache account metadata can pass `owners` and `threshold` to skip those view calls.
+    own_pool = pool is None
+    pool = pool or ViewCallPool(base_url)
+    try:
+        # Wave 1: account metadata, all issued at once.
+        owners_f = pool.submit(get_multisig_account_owners, multisig_addr) if owners is None else None
+        threshold_f = pool.submit(get_multisig_num_signatures_required, multisig_addr) if threshold is None else None
+        last_resolved_f = pool.submit(get_multisig_account_last_resolved_seq, multisig_addr)
+        next_seq_f = pool.submit(get_multisig_account_next_sequence_number, multisig_addr)
+
+        owners = owners_f.result() if owners_f else owners
+        threshold = threshold_f.result() if threshold_f else threshold
+        owners = tuple(address_str(addr) for addr in owners)
+        last_resolved_seq = last_resolved_f.result()
+        next_seq = next_seq_f.result()
+        pending_seqs = range(last_resolved_seq + 1, next_seq)
+
+        # Wave 2: the whole (seq x owner) vote matrix plus executability, all issued at once.
+        executable_fs = [pool.submit(get_multisig_tx_can_be_executed, multisig_addr, seq) for seq in pending_seqs]
+        vote_fs = [
+            [pool.submit(get_multisig_tx_vote, multisig_addr, seq, address_str(owner))
+             for owner in owners]
+            for seq in pending_seqs
+        ]
+
+        return MultisigSnapshot(
+            multisig_addr=str(multisig_addr),
+            owners=owners,
+            threshold=threshold,
+            last_resolved_seq=last_resolved_seq,
+            next_seq=next_seq,
+            executable=tuple(f.result() for f in executable_fs),
+            votes=tuple(tuple((bool(f.result()[0]), bool(f.result()[1])) for f in row) for row in vote_fs),
+        )
+    finally:
+        if own_pool:
+            pool.close()
+
+
+def print_multisig_snapshot(snapshot: MultisigSnapshot) -> None:
+    print("Multisig address:", snapshot.multisig_addr)
+    print("Multisig account owners:", list(snapshot.owners))
+    print("Multisig last resolved seq:", snapshot.last_resolved_seq)
+    print("Multisig current sequence number:", snapshot.next_seq - 1)
+    print("Multisig threshold:", snapshot.threshold)
+    for seq in snapshot.pending_seqs:
+        print(f"Multisig tx {seq}: approvals {snapshot.approvals(seq)}, rejections {snapshot.rejections(seq)}, "
+              f"can be executed: {snapshot.can_be_executed(seq)}")
+        for addr, (voted, vote) in snapshot.votes_for(seq).items():
+            print(f"  {addr} voted: {voted}, vote: {vote}")
+
+
+if __name__ == "__main__":
+    from aptos_sdk.account_address import AccountAddress
+
+    is_testnet = False
+    base_url = "https://rpc-testnet1.supra.com/" if is_testnet else "https://rpc-mainnet.supra.com"
+
+    multisig_addr = AccountAddress.from_str_relaxed(
+        "0xadf39402c164a372a788358b7c8e695ae794d8f787ad36464708c8eb1f3a64a9")
+    print_multisig_snapshot(get_multisig_snapshot(base_url, multisig_addr))
@@ -0,0 +1,235 @@
+from array import array
+from typing import Iterator
+
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.bcs import Deserializer
+from aptos_sdk.transactions import ScriptArgument
+from aptos_sdk.type_tag import TypeTag
+
+from transaction_payload import TransactionPayload
+
+# Batch decoding of BCS-encoded transaction payloads laid end to end in one buffer, e.g. payloads exported from
+# historical blocks. `iter_payload_views` walks a memoryview over the buffer and records only where each field
+# starts; nothing is copied until a field is read, and arguments are sliced out on demand. Reading the function id
+# of a million payloads therefore costs a few small strings each instead of a full object tree. `PayloadBatch` keeps
+# the same offsets in flat arrays, for holding a whole buffer's index in memory.
+
+ADDRESS_LENGTH = 32
+SCRIPT_ARG_SIZES = {
+    ScriptArgument.U8: 1,
+    ScriptArgument.U16: 2,
+    ScriptArgument.U32: 4,
+    ScriptArgument.U64: 8,
+    ScriptArgument.U128: 16,
+    ScriptArgument.U256: 32,
+    ScriptArgument.ADDRESS: ADDRESS_LENGTH,
+    ScriptArgument.BOOL: 1,
+}
+
+
+def read_uleb128(buf: memoryview, pos: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def skip_bytes(buf: memoryview, pos: int) -> int:
+    n, pos = read_uleb128(buf, pos)
+    return pos + n
+
+
+def skip_type_tag(buf: memoryview, pos: int) -> int:
+    variant, pos = read_uleb128(buf, pos)
+    if variant == TypeTag.VECTOR:
+        return skip_type_tag(buf, pos)
+    if variant == TypeTag.STRUCT:
+        pos = skip_bytes(buf, skip_bytes(buf, pos + ADDRESS_LENGTH))
+        n, pos = read_uleb128(buf, pos)
+        for _ in range(n):
+            pos = skip_type_tag(buf, pos)
+    return pos
+
+
+def skip_type_tags(buf: memoryview, pos: int) -> int:
+    n, pos = read_uleb128(buf, pos)
+    for _ in range(n):
+        pos = skip_type_tag(buf, pos)
+    return pos
+
+
+def skip_script_args(buf: memoryview, pos: int) -> int:
+    n, pos = read_uleb128(buf, pos)
+    for _ in range(n):
+        variant = buf[pos]
+        pos = skip_bytes(buf, pos + 1) if variant == ScriptArgument.U8_VECTOR else pos + 1 + SCRIPT_ARG_SIZES[variant]
+    return pos
+
+
+def decode_str(buf: memoryview, pos: int) -> str:
+    n, pos = read_uleb128(buf, pos)
+    return str(buf[pos:pos + n], "utf-8")
+
+
+class PayloadView:
+    # One payload inside the shared buffer. For entry functions, including the one wrapped by a Multisig payload,
+    # `entry_at` is the offset of the module address and `args_at` that of the argument vector. Script payloads
+    # only expose `raw` and `decode`.
+    __slots__ = ("buf", "start", "end", "variant", "multisig_at", "entry_at", "args_at")
+
+    def __init__(self, buf: memoryview, start: int, end: int, variant: int, multisig_at: int, entry_at: int,
+                 args_at: int):
+        self.buf = buf
+        self.start = start
+        self.end = end
+        self.variant = variant
+        self.multisig_at = multisig_at
+        self.entry_at = entry_at
+        self.args_at = args_at
+
+    @property
+    def raw(self) -> memoryview:
+        return self.buf[self.start:self.end]
+
+    @property
+    def multisig_address(self) -> str | None:
+        if self.multisig_at < 0:
+            return None
+        return str(AccountAddress(bytes(self.buf[self.multisig_at:self.multisig_at + ADDRESS_LENGTH])))
+
+    @property
+    def module_address(self) -> str | None:
+        if self.entry_at < 0:
+            return None
+        return str(AccountAddress(bytes(self.buf[self.entry_at:self.entry_at + ADDRESS_LENGTH])))
+
+    @property
+    def module_name(self) -> str | None:
+        return decode_str(self.buf, self.entry_at + ADDRESS_LENGTH) if self.entry_at >= 0 else None
+
+    @property
+    def function_name(self) -> str | None:
+        if self.entry_at < 0:
+            return None
+        return decode_str(self.buf, skip_bytes(self.buf, self.entry_at + ADDRESS_LENGTH))
+
+    @property
+    def function_id(self) -> str | None:
+        # e.g. "0x1::supra_account::transfer"
+        if self.entry_at < 0:
+            return None
+        return f"{self.module_address}::{self.module_name}::{self.function_name}"
+
+    def function_is(self, module_name: str, function_name: str) -> bool:
+        # Compares the encoded names in place, without building any string.
+        if self.entry_at < 0:
+            return False
+        buf = self.buf
+        pos = self.entry_at + ADDRESS_LENGTH
+        for name in (module_name.encode(), function_name.encode()):
+            n, pos = read_uleb128(buf, pos)
+            if buf[pos:pos + n] != name:
+                return False
+            pos += n
+        return True
+
+    @property
+    def args(self) -> list[memoryview]:
+        # The BCS bytes of each argument, as slices of the shared buffer.
+        if self.args_at < 0:
+            return []
+        buf = self.buf
+        n, pos = read_uleb128(buf, self.args_at)
+        args = []
+        for _ in range(n):
+            length, pos = read_uleb128(buf, pos)
+            args.append(buf[pos:pos + length])
+            pos += length
+        return args
+
+    def arg(self, i: int) -> memoryview:
+        # Like args[i], without slicing the arguments before it.
+        if self.args_at < 0:
+            raise IndexError(f"argument {i} of a payload without entry function arguments")
+        buf = self.buf
+        n, pos = read_uleb128(buf, self.args_at)
+        if not 0 <= i < n:
+            raise IndexError(f"argument {i} of {n}")
+        for _ in range(i):
+            pos = skip_bytes(buf, pos)
+        length, pos = read_uleb128(buf, pos)
+        return buf[pos:pos + length]
+
+    def decode(self) -> TransactionPayload:
+        return TransactionPayload.deserialize(Deserializer(bytes(self.raw)))
+
+
+def walk_entry_function(buf: memoryview, pos: int) -> tuple[int, int]:
+    # Returns the offset of the argument vector and the end of the entry function.
+    pos = skip_bytes(buf, pos + ADDRESS_LENGTH)  # module address and name
+    pos = skip_type_tags(buf, skip_bytes(buf, pos))  # function name, type arguments
+    args_at = pos
+    n, pos = read_uleb128(buf, pos)
+    for _ in range(n):
+        pos = skip_bytes(buf, pos)
+    return args_at, pos
+
+
+def walk_payloads(buf: memoryview) -> Iterator[tuple[int, int, int, int, int, int]]:
+    # Yields (start, end, variant, multisig_at, entry_at, args_at) of every payload, see PayloadView.
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        start = pos
+        variant, pos = read_uleb128(buf, pos)
+        multisig_at = entry_at = args_at = -1
+        if variant == TransactionPayload.SCRIPT_FUNCTION:
+            entry_at = pos
+            args_at, pos = walk_entry_function(buf, pos)
+        elif variant == TransactionPayload.MULTISIG:
+            multisig_at = pos
+            pos += ADDRESS_LENGTH
+            has_payload = buf[pos]
+            pos += 1
+            if has_payload:
+                _, pos = read_uleb128(buf, pos)  # MultiSigTransactionPayload variant, always an entry function
+                entry_at = pos
+                args_at, pos = walk_entry_function(buf, pos)
+        elif variant == TransactionPayload.SCRIPT:
+            pos = skip_script_args(buf, skip_type_tags(buf, skip_bytes(buf, pos)))
+        else:
+            raise Exception(f"Invalid payload type {variant} at offset {start}")
+        yield start, pos, variant, multisig_at, entry_at, args_at
+
+
+def iter_payload_views(buffer: bytes | bytearray | memoryview) -> Iterator[PayloadView]:
+    buf = memoryview(buffer)
+    for fields in walk_payloads(buf):
+        yield PayloadView(buf, *fields)
+
+
+class PayloadBatch:
+    # An index of every payload in the buffer, kept in flat arrays (a few dozen bytes per payload) instead of one
+    # object per payload. Views are created on access.
+    def __init__(self, buffer: bytes | bytearray | memoryview):
+        self.buf = memoryview(buffer)
+        self.columns = tuple(array("q") for _ in range(6))
+        appends = [column.append for column in self.columns]
+        for fields in walk_payloads(self.buf):
+            for append, value in zip(appends, fields):
+                append(value)
+
+    def __len__(self) -> int:
+        return len(self.columns[0])
+
+    def __getitem__(self, i: int) -> PayloadView:
+        return PayloadView(self.buf, *(column[i] for column in self.columns))
+
+    def __iter__(self) -> Iterator[PayloadView]:
+        buf = self.buf
+        for fields in zip(*self.columns):
+            yield PayloadView(buf, *fields)
@@ -0,0 +1,286 @@
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aptos_sdk.account import Account
+from aptos_sdk.bcs import Serializer
+from aptos_sdk.transactions import EntryFunction, RawTransaction, Script
+
+from check_transaction import get_transaction_info
+from transaction_payload import Multisig
+from transfer_supra import SequenceAllocator, get_account_seq_num, get_chain_id, create_raw_tx, deserialize_raw_tx, \
+    create_entry_func, create_send_tx_dict, submit_tx_json, submit_error_code
+
+# Remembers every submitted transaction in SQLite until it is final, so nothing is lost when the node drops a
+# transaction or the process restarts. Each `tick`:
+#   - included transactions are marked success / failed;
+#   - transactions neither included nor expired are rebroadcast every `rebroadcast_interval_sec`, from the stored
+#     signed body;
+#   - expired ones are re-signed with a fresh expiry and resubmitted. The sequence number is kept while the chain
+#     has not used it yet, so the sender's later transactions stay valid; if it was used by another transaction,
+#     the payload gets a new one.
+# Re-signing needs the sender's key; without it an expired transaction is only marked expired.
+#
+# A sequence number must never be left unused while later ones are pending, or the sender's later transactions can
+# never be included. When a rebroadcast or a re-signed transaction is rejected, its payload is re-signed at the
+# same sequence number; if that is rejected too, a zero transfer to the sender itself fills the gap instead. Later
+# transactions are never moved to other sequence numbers, since their signed bodies may still sit in mempools.
+#
+# Row statuses: pending, success, failed, replaced (by `replaced_by`), expired, rejected, and unknown for a
+# transaction that was never acknowledged by the node but whose sequence number got used.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_txs (
+    id INTEGER PRIMARY KEY,
+    hash TEXT,
+    sender TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    expiry INTEGER NOT NULL,
+    raw_tx BLOB NOT NULL,
+    signed_body TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    submitted_at REAL NOT NULL,
+    broadcast_at REAL NOT NULL,
+    replaced_by INTEGER
+);
+CREATE INDEX IF NOT EXISTS pending_txs_status ON pending_txs (status);
+CREATE INDEX IF NOT EXISTS pending_txs_hash ON pending_txs (hash);
+"""
+PENDING = "pending"
+FINAL_STATUSES = {"Success": "success", "Fail": "failed"}
+# Transactions this close to expiry are re-signed rather than rebroadcast, which the node could reject as expired.
+EXPIRY_MARGIN_SEC = 10
+FILLER_MAX_GAS = 20
+
+
+def raw_tx_bytes(raw_tx: RawTransaction) -> bytes:
+    serializer = Serializer()
+    raw_tx.serialize(serializer)
+    return serializer.output()
+
+
+def lossy(func, *args):
+    # None when the call fails or the node answers with an error instead of the expected data.
+    try:
+        res = func(*args)
+    except Exception:
+        return None
+    if isinstance(res, dict) and "message" in res:
+        return None
+    return res if res is not None else {}
+
+
+class PendingTxStore:
+    def __init__(self, db_file: str = "pending_txs.sqlite3"):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def insert(self, sender: str, seq: int, expiry: int, raw_tx: bytes, signed_body: dict, now: float) -> int:
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO pending_txs (sender, seq, expiry, raw_tx, signed_body, status, submitted_at, broadcast_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (sender, seq, expiry, raw_tx, json.dumps(signed_body), PENDING, now, now))
+            return cur.lastrowid
+
+    def update(self, row_id: int, **fields) -> None:
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self.lock, self.conn:
+            self.conn.execute(f"UPDATE pending_txs SET {columns} WHERE id = ?", (*fields.values(), row_id))
+
+    def pending(self) -> list[sqlite3.Row]:
+        with self.lock:
+            return self.conn.execute("SELECT * FROM pending_txs WHERE status = ? ORDER BY sender, seq",
+                                     (PENDING,)).fetchall()
+
+    def get(self, row_id: int) -> sqlite3.Row:
+        with self.lock:
+            return self.conn.execute("SELECT * FROM pending_txs WHERE id = ?", (row_id,)).fetchone()
+
+    def final(self, row_id: int) -> sqlite3.Row:
+        # Follows replacements to the row that stands for the original submission now.
+        row = self.get(row_id)
+        while row["replaced_by"] is not None:
+            row = self.get(row["replaced_by"])
+        return row
+
+    def counts(self) -> dict[str, int]:
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM pending_txs GROUP BY status").fetchall())
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class PendingTxManager:
+    def __init__(self,
+                 base_url: str,
+                 store: PendingTxStore,
+                 accounts: [Account] = (),
+                 allocator: SequenceAllocator = None,
+                 rebroadcast_interval_sec: float = 10.0,
+                 tx_expiry_timespan: int = 300,
+                 max_workers: int = 16):
+        self.base_url = base_url
+        self.store = store
+        self.accounts = {str(account.address()): account for account in accounts}
+        self.allocator = allocator or SequenceAllocator(base_url)
+        self.rebroadcast_interval_sec = rebroadcast_interval_sec
+        self.tx_expiry_timespan = tx_expiry_timespan
+        self.max_workers = max_workers
+
+    def sign(self, sender_account: Account, seq: int, payload, max_gas: int, gas_price: int,
+             chain_id: int) -> tuple[RawTransaction, dict]:
+        raw_tx = create_raw_tx(sender_account.address(), seq, payload, max_gas, gas_price, self.tx_expiry_timespan,
+                               chain_id=chain_id)
+        return raw_tx, create_send_tx_dict(sender_account, raw_tx)
+
+    def broadcast(self, row_id: int, signed_body: dict, attempts: int, now: float) -> str:
+        # Returns the row status after the attempt. Transient failures (HTTP errors, rate limits) leave the row
+        # pending for the next tick; a rejection by the node is final.
+        response = submit_tx_json(self.base_url, signed_body)
+        if response.startswith("0x"):
+            self.store.update(row_id, hash=response, attempts=attempts + 1, broadcast_at=now)
+            return PENDING
+        code = submit_error_code(response)
+        if code is None or code == "SEQUENCE_NUMBER_TOO_OLD" and attempts:
+            # Transient, or a rebroadcast of a transaction that may have been included meanwhile; the next tick
+            # finds out which.
+            self.store.update(row_id, attempts=attempts + 1, broadcast_at=now, error=response)
+            return PENDING
+        self.store.update(row_id, status="rejected", attempts=attempts + 1, broadcast_at=now, error=code)
+        return "rejected"
+
+    def submit(self,
+               sender_account: Account,
+               payload: EntryFunction | Multisig | Script,
+               max_gas: int = 500_000,
+               gas_price: int = 100) -> int:
+        # Returns the row id; the transaction hash is in the row once a broadcast was accepted.
+        sender = str(sender_account.address())
+        self.accounts.setdefault(sender, sender_account)
+        seq = self.allocator.allocate(sender)
+        raw_tx, signed_body = self.sign(sender_account, seq, payload, max_gas, gas_price, get_chain_id(self.base_url))
+        now = time.time()
+        row_id = self.store.insert(sender, seq, raw_tx.expiration_timestamps_secs, raw_tx_bytes(raw_tx), signed_body,
+                                   now)
+        if self.broadcast(row_id, signed_body, 0, now) == "rejected":
+            self.allocator.release(sender, seq)
+        return row_id
+
+    def replace(self, row: sqlite3.Row, chain_seq: int, now: float) -> None:
+        sender_account = self.accounts.get(row["sender"])
+        if sender_account is None:
+            self.store.update(row["id"], status="expired")
+            return
+        raw_tx = deserialize_raw_tx(row["raw_tx"])
+        if chain_seq <= row["seq"]:
+            seq = row["seq"]
+        else:
+            # Another transaction used this sequence number, so the payload needs a fresh one.
+            seq = self.allocator.allocate(row["sender"])
+        new_raw_tx, signed_body = self.sign(sender_account, seq, raw_tx.payload.value, raw_tx.max_gas_amount,
+                                            raw_tx.gas_unit_price, raw_tx.chain_id)
+        new_id = self.store.insert(row["sender"], seq, new_raw_tx.expiration_timestamps_secs,
+                                   raw_tx_bytes(new_raw_tx), signed_body, now)
+        self.store.update(row["id"], status="replaced", replaced_by=new_id)
+        if self.broadcast(new_id, signed_body, 0, now) == "rejected":
+            if seq != row["seq"]:
+                self.allocator.release(row["sender"], seq)
+            else:
+                self.fill(self.store.get(new_id), now)
+
+    def refill(self, row: sqlite3.Row, now: float) -> None:
+        # A rebroadcast was rejected, so row["seq"] is still unused; the payload is re-signed at it.
+        self.replace(row, row["seq"], now)
+
+    def fill(self, row: sqlite3.Row, now: float) -> None:
+        # The payload itself is rejected at row["seq"]; a zero transfer to the sender takes the sequence number, so
+        # the sender's later transactions can still be included. The rejected row stays final.
+        sender_account = self.accounts[row["sender"]]
+        raw_tx = deserialize_raw_tx(row["raw_tx"])
+        payload = create_entry_func("supra_account", "transfer", [sender_account.address(), 0],
+                                    [Serializer.struct, Serializer.u64])
+        filler_tx, signed_body = self.sign(sender_account, row["seq"], payload, FILLER_MAX_GAS,
+                                           raw_tx.gas_unit_price, raw_tx.chain_id)
+        filler_id = self.store.insert(row["sender"], row["seq"], filler_tx.expiration_timestamps_secs,
+                                      raw_tx_bytes(filler_tx), signed_body, now)
+        self.broadcast(filler_id, signed_body, 0, now)
+
+    def tick(self) -> dict[str, int]:
+        rows = self.store.pending()
+        if not rows:
+            return {}
+        senders = sorted({row["sender"] for row in rows})
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            chain_seqs = dict(zip(senders, executor.map(
+                lambda sender: lossy(get_account_seq_num, self.base_url, sender), senders)))
+            infos = list(executor.map(
+                lambda row: lossy(get_transaction_info, self.base_url, row["hash"]) if row["hash"] else {}, rows))
+
+        for row, info in zip(rows, infos):
+            # Read per row: the loop makes network calls, and a stale time would rebroadcast expired transactions.
+            now = time.time()
+            if info is None or chain_seqs[row["sender"]] is None:
+                # The node could not be asked this time; try again next tick.
+                continue
+            status = info.get("status")
+            if status in FINAL_STATUSES:
+                self.store.update(row["id"], status=FINAL_STATUSES[status])
+            elif status == "Pending" and row["expiry"] > now:
+                continue
+            elif row["hash"] is None and chain_seqs[row["sender"]] > row["seq"]:
+                # No broadcast was acknowledged, yet the sequence number is used: one of them may have landed
+                # without an answer, so resubmitting the payload could execute it twice.
+                self.store.update(row["id"], status="unknown")
+            elif row["expiry"] <= now + EXPIRY_MARGIN_SEC or chain_seqs[row["sender"]] > row["seq"]:
+                # (About to be) expired, or its sequence number was used by another transaction: it can never be
+                # included.
+                self.replace(row, chain_seqs[row["sender"]], now)
+            elif now - row["broadcast_at"] >= self.rebroadcast_interval_sec:
+                if self.broadcast(row["id"], json.loads(row["signed_body"]), row["attempts"], now) == "rejected" \
+                        and row["sender"] in self.accounts:
+                    self.refill(self.store.get(row["id"]), now)
+        return self.store.counts()
+
+    def run(self, interval_sec: float = 2.0, timeout_sec: float = None) -> dict[str, int]:
+        # Ticks until nothing is pending, or the timeout passes.
+        deadline = None if timeout_sec is None else time.time() + timeout_sec
+        counts = self.tick()
+        while counts.get(PENDING) and (deadline is None or time.time() < deadline):
+            time.sleep(interval_sec)
+            counts = self.tick()
+        return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebroadcast and replace the pending transactions of a database.")
+    parser.add_argument("--url", default="https://rpc-testnet.supra.com")
+    parser.add_argument("--db", default="pending_txs.sqlite3")
+    parser.add_argument("--mnemonic", help="encrypted mnemonic file, to re-sign expired transactions")
+    parser.add_argument("--accounts", type=int, nargs="*", default=[0], help="account numbers of the senders")
+    parser.add_argument("--interval", type=float, default=2.0)
+    parser.add_argument("--rebroadcast-interval", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, help="give up after this many seconds")
+    args = parser.parse_args()
+
+    accounts = []
+    if args.mnemonic:
+        from derive_keys import generate_bip44_account
+        from gen_mnemonic import load_mnemonic
+
+        mnemonic = load_mnemonic(args.mnemonic)
+        accounts = [Account.load_key(generate_bip44_account(mnemonic, i).hex()) for i in args.accounts]
+
+    store = PendingTxStore(args.db)
+    manager = PendingTxManager(args.url.rstrip("/"), store, accounts,
+                               rebroadcast_interval_sec=args.rebroadcast_interval)
+    print("Statuses:", manager.run(args.interval, args.timeout))
+    store.close()
@@ -2,7 +2,7 @@ import hashlib
 import time
 
 import requests
-from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.account_address import AccountAddress, AuthKeyScheme
 from aptos_sdk.bcs import Serializer
 from aptos_sdk.transactions import EntryFunction
 
@@ -21,6 +21,23 @@ def compute_multisig_account_addr(account_owner_addr: str, sequence_number: int)
     return AccountAddress.for_resource_account(owner_account, multisig_account_seed)
 
 
+def compute_multisig_account_addrs(account_owner_addr: str, sequence_numbers: range) -> list[AccountAddress]:
+    # Same derivation as compute_multisig_account_addr, but the hash state over the constant prefix
+    # (owner address and seed domain) is computed once and cloned for every sequence number.
+    owner_account = AccountAddress.from_str_relaxed(account_owner_addr)
+    prefix_hasher = hashlib.sha3_256()
+    prefix_hasher.update(owner_account.address)
+    prefix_hasher.update(str.encode("supra_framework::multisig_account"))
+    scheme = AuthKeyScheme.DeriveResourceAccountAddress
+    addrs = []
+    for sequence_number in sequence_numbers:
+        hasher = prefix_hasher.copy()
+        hasher.update(sequence_number.to_bytes(8, "little"))
+        hasher.update(scheme)
+        addrs.append(AccountAddress(hasher.digest()))
+    return addrs
+
+
 def compute_multisig_tx_payload_hash(entry_func: EntryFunction) -> bytes:
     payload = MultiSigTransactionPayload(entry_func)
     struct_serializer = Serializer()
@@ -46,7 +63,14 @@ def create_propose_multisig_tx_entry_func(
         ])
 
 
-def get_multisig_tx_sequence_from_tx_hash(tx_hash: str) -> int:
+def get_multisig_tx_sequence_from_tx_hash(base_url: str, tx_hash: str, index=None) -> int:
+    # With an event_index.EventIndex that has indexed the transaction's block, no request is made.
+    if index is not None:
+        from event_index import CREATE_TRANSACTION_EVENT
+
+        events = index.query(type=CREATE_TRANSACTION_EVENT, tx_hash=tx_hash, limit=1)
+        if events:
+            return events[0]["seq"]
     tx_data = get_json(f"{base_url}/rpc/v1/transactions/{tx_hash}")
     if tx_data["status"] != "Success":
         raise Exception("transaction is not successfully executed")
@@ -82,4 +106,4 @@ if __name__ == "__main__":
 
     wait_for_tx(base_url, tx_hash, 3, 5)
     time.sleep(5)
-    print("Multisig sequence number:", get_multisig_tx_sequence_from_tx_hash(tx_hash))
+    print("Multisig sequence number:", get_multisig_tx_sequence_from_tx_hash(base_url, tx_hash))
@@ -0,0 +1,281 @@
+import gzip
+import json
+import operator
+from typing import Any, Callable, Iterable, Iterator
+
+from scan_blocks import iter_block_txs
+
+# Composable, streaming queries over a block height range, e.g.
+#   blocks(base_url, range(1000, 2000)).transactions() \
+#       .where(function="0x1::multisig_account::vote_transanction", arg0=multisig_addr) \
+#       .select("hash", "sender", "arg1", "arg2")
+#   blocks(base_url, range(1000, 2000)).transactions() \
+#       .where(function="0x1::supra_account::transfer", arg0=recipient, arg1__gt=10 ** 9)
+# Blocks come from the concurrent scanner or from a local block file written by `save_blocks`, and are consumed
+# one at a time, so a query never holds the whole range in memory.
+#
+# `where` takes field names (see FIELDS), argN for the Nth entry function argument, an optional __op suffix
+# (eq, ne, gt, gte, lt, lte, in) and plain callables taking the transaction JSON. Predicates are evaluated
+# cheapest first: top-level fields such as sender and function are read straight from the JSON, arguments are
+# only coerced for transactions that passed those, and callables run last.
+#
+# Arguments are matched against the type of the expected value: addresses are compared normalized, integers and
+# booleans are decoded from JSON numbers, decimal strings or BCS hex.
+
+
+def normalize_addr(addr: str) -> str:
+    # Cheaper than AccountAddress for the hot path: 0x-prefixed lower-case hex without leading zeros.
+    return "0x" + ((addr[2:] if addr.startswith("0x") else addr).lower().lstrip("0") or "0")
+
+
+def normalize_function(function_id: str) -> str:
+    addr, sep, rest = function_id.partition("::")
+    return normalize_addr(addr) + sep + rest
+
+
+def entry_function(tx: dict) -> dict:
+    # The entry function of the transaction, or of the multisig transaction it executes.
+    payload = (tx.get("payload") or {}).get("Move") or {}
+    if payload.get("type") == "multisig_payload":
+        return payload.get("transaction_payload") or {}
+    return payload
+
+
+FIELDS: dict[str, Callable[[dict], Any]] = {
+    "hash": lambda tx: tx.get("hash"),
+    "sender": lambda tx: normalize_addr(tx["header"]["sender"]["Move"]) if "header" in tx else None,
+    "sequence_number": lambda tx: int(tx["header"]["sequence_number"]) if "header" in tx else None,
+    "function": lambda tx: normalize_function(entry_function(tx).get("function") or ""),
+    "multisig_address": lambda tx: normalize_addr(tx["payload"]["Move"].get("multisig_address") or "")
+    if "payload" in tx else None,
+    "status": lambda tx: tx.get("status"),
+    "vm_status": lambda tx: (tx.get("output") or {}).get("Move", {}).get("vm_status"),
+    "gas_used": lambda tx: int((tx.get("output") or {}).get("Move", {}).get("gas_used", 0)),
+    "height": lambda tx: int(tx["block_header"]["height"]) if "block_header" in tx else None,
+    "timestamp_us": lambda tx: int(tx["block_header"]["timestamp"]["microseconds_since_unix_epoch"])
+    if "block_header" in tx else None,
+    "args": lambda tx: entry_function(tx).get("arguments") or [],
+}
+# Fields whose predicates run before any argument is looked at.
+CHEAP_FIELDS = {"hash", "sender", "sequence_number", "function", "multisig_address", "status", "height"}
+
+OPS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "in": lambda value, expected: value in expected,
+}
+
+
+def coerce_arg(raw: Any, like: Any) -> Any:
+    if isinstance(like, bool):
+        if isinstance(raw, str):
+            return raw.lower() in ("true", "0x01", "1")
+        return bool(raw)
+    if isinstance(like, int):
+        if isinstance(raw, int):
+            return raw
+        if isinstance(raw, str) and raw.startswith("0x"):
+            return int.from_bytes(bytes.fromhex(raw[2:]), "little")
+        return int(raw)
+    if isinstance(like, str) and like.startswith("0x") and isinstance(raw, str):
+        return normalize_addr(raw)
+    return raw
+
+
+def arg_getter(i: int) -> Callable[[dict], Any]:
+    def get(tx: dict) -> Any:
+        args = FIELDS["args"](tx)
+        return args[i] if i < len(args) else None
+    return get
+
+
+def make_predicate(name: str, expected: Any) -> tuple[bool, Callable[[dict], bool]]:
+    # Returns (cheap, predicate).
+    field, _, op_name = name.partition("__")
+    op = OPS[op_name or "eq"]
+    sample = next(iter(expected)) if op_name == "in" else expected
+    if field.startswith("arg") and field[3:].isdigit():
+        get = arg_getter(int(field[3:]))
+        if op_name == "in":
+            expected = {coerce_arg(e, sample) for e in expected}
+        elif isinstance(expected, str) and expected.startswith("0x"):
+            expected = normalize_addr(expected)
+
+        def predicate(tx: dict) -> bool:
+            raw = get(tx)
+            return raw is not None and op(coerce_arg(raw, sample), expected)
+        return False, predicate
+
+    get = FIELDS[field]
+    if field in ("sender", "multisig_address"):
+        expected = {normalize_addr(e) for e in expected} if op_name == "in" else normalize_addr(expected)
+    elif field == "function":
+        expected = {normalize_function(e) for e in expected} if op_name == "in" else normalize_function(expected)
+    return field in CHEAP_FIELDS, lambda tx: op(get(tx), expected)
+
+
+def select_fields(tx: dict, names: tuple[str, ...]) -> dict[str, Any]:
+    return {name: (arg_getter(int(name[3:])) if name.startswith("arg") and name[3:].isdigit() else FIELDS[name])(tx)
+            for name in names}
+
+
+class TxQuery:
+    def __init__(self, source: Iterable[tuple[int, list[dict]]]):
+        self.source = source
+        self.cheap: list[Callable[[dict], bool]] = []
+        self.costly: list[Callable[[dict], bool]] = []
+        self.callables: list[Callable[[dict], bool]] = []
+        self.fields: tuple[str, ...] = ()
+        self.max_results: int = None
+
+    def copy(self) -> "TxQuery":
+        q = TxQuery(self.source)
+        q.cheap, q.costly, q.callables = list(self.cheap), list(self.costly), list(self.callables)
+        q.fields, q.max_results = self.fields, self.max_results
+        return q
+
+    def where(self, *callables: Callable[[dict], bool], **conditions: Any) -> "TxQuery":
+        q = self.copy()
+        q.callables.extend(callables)
+        for name, expected in conditions.items():
+            cheap, predicate = make_predicate(name, expected)
+            (q.cheap if cheap else q.costly).append(predicate)
+        return q
+
+    def select(self, *fields: str) -> "TxQuery":
+        # Yields dicts of just these fields instead of the transaction JSON.
+        q = self.copy()
+        q.fields = fields
+        return q
+
+    def limit(self, n: int) -> "TxQuery":
+        # Stops the scan, including fetching, once n results were produced.
+        q = self.copy()
+        q.max_results = n
+        return q
+
+    def __iter__(self) -> Iterator[dict]:
+        predicates = self.cheap + self.costly + self.callables
+        produced = 0
+        if self.max_results == 0:
+            return
+        for height, txs in self.source:
+            for tx in txs:
+                if "block_header" not in tx:
+                    # Block transactions may omit the header they came with.
+                    tx["block_header"] = {"height": height}
+                if all(predicate(tx) for predicate in predicates):
+                    yield select_fields(tx, self.fields) if self.fields else tx
+                    produced += 1
+                    if produced == self.max_results:
+                        return
+
+    def count(self) -> int:
+        return sum(1 for _ in self)
+
+
+class BlockQuery:
+    def __init__(self, source: Iterable[tuple[int, list[dict]]]):
+        self.source = source
+
+    def __iter__(self) -> Iterator[tuple[int, list[dict]]]:
+        return iter(self.source)
+
+    def transactions(self) -> TxQuery:
+        return TxQuery(self.source)
+
+
+class RangeSource:
+    # Re-iterable, so one query object can be run more than once.
+    def __init__(self, base_url: str, heights: range, max_workers: int, fields: list[str] = None):
+        self.base_url = base_url
+        self.heights = heights
+        self.max_workers = max_workers
+        self.fields = fields
+
+    def __iter__(self) -> Iterator[tuple[int, list[dict]]]:
+        if self.heights:
+            yield from iter_block_txs(self.base_url, self.heights[0], self.heights[-1], self.max_workers,
+                                      self.fields)
+
+
+class FileSource:
+    def __init__(self, file_path: str, heights: range = None):
+        self.file_path = file_path
+        self.heights = heights
+
+    def __iter__(self) -> Iterator[tuple[int, list[dict]]]:
+        for height, txs in read_blocks(self.file_path):
+            if self.heights is None or height in self.heights:
+                yield height, txs
+
+
+def blocks(base_url: str, heights: range, max_workers: int = 8, fields: list[str] = None) -> BlockQuery:
+    # `fields` decodes only those transaction paths (see scan_blocks.get_block_txs); queries may then only use
+    # fields derived from them, e.g. ["hash", "header.sender", "payload"] for sender, function and arguments.
+    return BlockQuery(RangeSource(base_url, heights, max_workers, fields))
+
+
+def blocks_from_file(file_path: str, heights: range = None) -> BlockQuery:
+    return BlockQuery(FileSource(file_path, heights))
+
+
+# Local block files are JSON lines of {"height": ..., "transactions": [...]}, gzip-compressed when the file name ends
+# in .gz.
+
+def open_blocks_file(file_path: str, mode: str):
+    return gzip.open(file_path, mode) if file_path.endswith(".gz") else open(file_path, mode)
+
+
+def save_blocks(source: Iterable[tuple[int, list[dict]]], file_path: str) -> int:
+    n = 0
+    with open_blocks_file(file_path, "wt") as f:
+        for height, txs in source:
+            f.write(json.dumps({"height": height, "transactions": txs}) + "\n")
+            n += 1
+    return n
+
+
+def read_blocks(file_path: str) -> Iterator[tuple[int, list[dict]]]:
+    with open_blocks_file(file_path, "rt") as f:
+        for line in f:
+            block = json.loads(line)
+            yield block["height"], block["transactions"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query transactions in a block range.")
+    parser.add_argument("start", type=int)
+    parser.add_argument("end", type=int, help="inclusive")
+    parser.add_argument("--url", default="https://rpc-testnet.supra.com")
+    parser.add_argument("--file", help="read blocks from this local block file instead of the node")
+    parser.add_argument("--save", help="only save the blocks to this local block file")
+    parser.add_argument("--where", action="append", default=[], metavar="FIELD=VALUE",
+                        help="e.g. sender=0x1, function=0x1::supra_account::transfer, arg1__gt=1000; "
+                             "integer values are compared as integers")
+    parser.add_argument("--select", nargs="*", default=["height", "hash", "sender", "function"])
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    heights = range(args.start, args.end + 1)
+    block_query = blocks_from_file(args.file, heights) if args.file else blocks(args.url.rstrip("/"), heights,
+                                                                               args.workers)
+    if args.save:
+        print("Saved blocks:", save_blocks(block_query, args.save))
+    else:
+        conditions = {}
+        for condition in args.where:
+            name, value = condition.split("=", 1)
+            conditions[name] = int(value) if value.isdigit() else value
+        query = block_query.transactions().where(**conditions).select(*args.select)
+        if args.limit is not None:
+            query = query.limit(args.limit)
+        for row in query:
+            print(json.dumps(row))
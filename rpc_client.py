@@ -0,0 +1,250 @@
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+from adaptive_limit import AdaptiveLimiter, OK, THROTTLED, ERROR
+from metrics import registry
+
+# One pooled session for the whole process, so concurrent callers reuse keep-alive connections
+# instead of opening a new TLS connection per request. `requests` is only imported when the first
+# request is made, which keeps it off the startup path of commands that never touch the network.
+session = None
+session_lock = threading.Lock()
+
+
+def get_session():
+    global session
+    if session is None:
+        with session_lock:
+            if session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                new_session = requests.Session()
+                new_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+                new_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+                session = new_session
+    return session
+
+
+class RpcCall:
+    # A plain class rather than a dataclass: this module is on the startup path of every CLI command.
+    __slots__ = ("method", "endpoint", "status", "request_bytes", "response_bytes", "latency_sec", "error", "retries")
+
+    def __init__(self, method: str, endpoint: str, status: int, request_bytes: int, response_bytes: int,
+                 latency_sec: float, error: str = None, retries: int = 0):
+        self.method = method
+        self.endpoint = endpoint
+        self.status = status
+        self.request_bytes = request_bytes
+        self.response_bytes = response_bytes
+        self.latency_sec = latency_sec
+        # Exception class name for transport failures, "decode" for a response that is not JSON.
+        self.error = error
+        self.retries = retries
+
+
+# Every RPC call is passed to each hook once it completes. Hooks run on the calling thread and must be cheap.
+hooks: list = []
+
+ID_SEGMENT = re.compile(r"^(0x[0-9a-fA-F]+|[0-9a-fA-F]{16,})$")
+
+
+def endpoint_of(url: str) -> str:
+    # Collapses addresses, hashes, heights and type tags so calls group by endpoint, e.g.
+    # /rpc/v1/accounts/{id}/resources/{type}.
+    segments = []
+    for segment in urlsplit(url).path.split("/"):
+        if ID_SEGMENT.match(segment):
+            segment = "{id}"
+        elif segment.isdigit():
+            segment = "{n}"
+        elif "::" in segment or "%3A%3A" in segment:
+            segment = "{type}"
+        segments.append(segment)
+    return "/".join(segments)
+
+
+def record_metrics(call: RpcCall) -> None:
+    labels = {"method": call.method, "endpoint": call.endpoint}
+    registry.inc("supra_rpc_requests_total", status=call.status, **labels)
+    registry.observe_us("supra_rpc_latency", call.latency_sec * 1e6, **labels)
+    registry.inc("supra_rpc_request_bytes_total", call.request_bytes, **labels)
+    registry.inc("supra_rpc_response_bytes_total", call.response_bytes, **labels)
+    if call.error is not None:
+        registry.inc("supra_rpc_errors_total", error=call.error, **labels)
+    if call.retries:
+        registry.inc("supra_rpc_retries_total", call.retries, **labels)
+
+
+hooks.append(record_metrics)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    registry.inc("supra_cache_lookups_total", cache=cache, result="hit" if hit else "miss")
+
+
+def decode_json(content: bytes, status: int, fields: list[str] = None) -> dict:
+    # With `fields`, only those paths of a successful response are decoded, see json_stream.py. Error responses
+    # are small and decoded whole, so their message is kept.
+    if fields is None or status != 200:
+        return json.loads(content)
+    from json_stream import loads_fields
+
+    return loads_fields(content, fields)
+
+
+# Concurrency of reads and of submits adapts separately to the node, see adaptive_limit.py: a scan backing off on
+# 429s does not hold back transaction submission, and the other way round. Reads are retried on 429, 5xx and
+# transport errors; submits only on 429, since a 5xx or a lost connection may come after the node accepted the
+# transaction.
+READ = "read"
+SUBMIT = "submit"
+SUBMIT_PATH = "/transactions/submit"
+MAX_RETRIES = 3
+RETRY_BACKOFF_SEC = 0.25
+REQUEST_TIMEOUT_SEC = 30
+limiters = {
+    READ: AdaptiveLimiter(READ, initial=16, max_limit=64),
+    SUBMIT: AdaptiveLimiter(SUBMIT, initial=8, max_limit=32),
+}
+
+
+def configure_limiter(budget: str, **kwargs) -> AdaptiveLimiter:
+    # e.g. configure_limiter(SUBMIT, initial=32, min_limit=32, max_limit=32) for a fixed concurrency.
+    limiters[budget] = AdaptiveLimiter(budget, **kwargs)
+    return limiters[budget]
+
+
+def retry_after_sec(resp) -> float:
+    try:
+        return max(0.0, float(resp.headers.get("Retry-After", 1)))
+    except ValueError:
+        # An HTTP date; waiting a second and letting the limiter adapt is close enough.
+        return 1.0
+
+
+def send(method: str, url: str, d: dict = None):
+    # Returns (response, retries).
+    budget = SUBMIT if urlsplit(url).path.endswith(SUBMIT_PATH) else READ
+    retries = 0
+    while True:
+        limiter = limiters[budget]
+        limiter.acquire()
+        start = time.perf_counter()
+        resp, outcome, retry_after = None, ERROR, None
+        try:
+            if method == "GET":
+                resp = get_session().get(url, timeout=REQUEST_TIMEOUT_SEC)
+            else:
+                resp = get_session().post(url, json=d, timeout=REQUEST_TIMEOUT_SEC)
+            if resp.status_code == 429:
+                outcome, retry_after = THROTTLED, retry_after_sec(resp)
+            elif resp.status_code < 500:
+                outcome = OK
+        except Exception:
+            if budget == SUBMIT or retries >= MAX_RETRIES:
+                raise
+        finally:
+            limiter.release(time.perf_counter() - start, outcome, retry_after)
+        retry = outcome == THROTTLED or (outcome == ERROR and budget == READ)
+        if not retry or retries >= MAX_RETRIES:
+            return resp, retries
+        retries += 1
+        if retry_after is None:
+            time.sleep(RETRY_BACKOFF_SEC * 2 ** (retries - 1))
+
+
+def request_json(method: str, url: str, d: dict = None, fields: list[str] = None, raw: bool = False) -> dict:
+    # With `raw`, returns the undecoded response body, e.g. to decode it in another process.
+    start = time.perf_counter()
+    status, request_bytes, response_bytes, error, retries = 0, 0, 0, None, 0
+    try:
+        if player is not None:
+            status, content, request_bytes = player.play(method, url, d)
+        else:
+            resp, retries = send(method, url, d)
+            status, content = resp.status_code, resp.content
+            request_bytes = len(resp.request.body or b"")
+        response_bytes = len(content)
+        if recorder is not None:
+            recorder.record(method, url, d, status, content, request_bytes, time.perf_counter() - start)
+        if raw:
+            return content
+        try:
+            return decode_json(content, status, fields)
+        except:
+            error = "decode"
+            print(f"{method.lower()}_json: error decoding JSON <Response [{status}]>, with error text: "
+                  f"{content.decode(errors='replace')}")
+            return {}
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        call = RpcCall(method, endpoint_of(url), status, request_bytes, response_bytes,
+                       time.perf_counter() - start, error, retries)
+        for hook in hooks:
+            hook(call)
+
+
+def get_json(url: str, fields: list[str] = None) -> dict:
+    return request_json("GET", url, fields=fields)
+
+
+def get_raw(url: str) -> bytes:
+    return request_json("GET", url, raw=True)
+
+
+def post_json(url: str, d: dict) -> dict:
+    return request_json("POST", url, d)
+
+
+# Record/replay, see cassette.py. Either can be switched on for a whole run through the environment, e.g.
+#   SUPRA_CASSETTE_RECORD=scan.ndjson.gz python scan_blocks.py
+#   SUPRA_CASSETTE_REPLAY=scan.ndjson.gz SUPRA_CASSETTE_REALTIME=1 python scan_blocks.py
+RECORD_ENV = "SUPRA_CASSETTE_RECORD"
+REPLAY_ENV = "SUPRA_CASSETTE_REPLAY"
+REALTIME_ENV = "SUPRA_CASSETTE_REALTIME"
+recorder = None
+player = None
+
+
+def start_recording(file_path: str):
+    global recorder
+    import atexit
+    from cassette import CassetteRecorder
+
+    stop_recording()
+    recorder = CassetteRecorder(file_path)
+    atexit.register(recorder.close)
+    return recorder
+
+
+def stop_recording() -> None:
+    global recorder
+    if recorder is not None:
+        recorder.close()
+        recorder = None
+
+
+def start_replay(file_path: str, realtime: bool = False):
+    global player
+    from cassette import CassettePlayer
+
+    player = CassettePlayer(file_path, realtime)
+    return player
+
+
+def stop_replay() -> None:
+    global player
+    player = None
+
+
+if os.environ.get(RECORD_ENV):
+    start_recording(os.environ[RECORD_ENV])
+if os.environ.get(REPLAY_ENV):
+    start_replay(os.environ[REPLAY_ENV], bool(os.environ.get(REALTIME_ENV)))
@@ -1,10 +1,47 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator
+
 from check_block import get_block_by_height
 from check_transaction import get_transaction_block_height
+from rpc_client import get_raw
+
+
+def get_block_txs(base_url: str, height: int, fields: list[str] = None) -> list[dict]:
+    # `fields` are paths within each transaction, e.g. ["hash", "output.Move.events"]; only those are decoded.
+    d = get_block_by_height(base_url, height, True,
+                            [f"transactions.item.{field}" for field in fields] if fields is not None else None)
+    if not isinstance(d, dict) or "transactions" not in d:
+        # An error response, or a block that has not been produced yet.
+        message = d.get("message", d) if isinstance(d, dict) else d
+        raise Exception(f"block {height}: no transactions in the response ({message})")
+    return d["transactions"]
+
+
+def get_block_bytes(base_url: str, height: int) -> bytes:
+    # The undecoded block with its transactions, see decode_pool.py.
+    return get_raw(f"{base_url}/rpc/v1/block/height/{height}?with_finalized_transactions=true")
+
+
+def iter_ordered(fetch: Callable[[int], Any], start: int, end: int, max_workers: int) -> Iterator[tuple[int, Any]]:
+    # Yields (height, fetch(height)) for every height in [start, end] in order, keeping up to `max_workers`
+    # blocks in flight so that fetching overlaps with the caller's processing.
+    with ThreadPoolExecutor(max_workers) as executor:
+        in_flight = deque()
+        next_height = start
+        while next_height <= end or in_flight:
+            while next_height <= end and len(in_flight) < max_workers * 2:
+                in_flight.append((next_height, executor.submit(fetch, next_height)))
+                next_height += 1
+            height, future = in_flight.popleft()
+            yield height, future.result()
 
 
-def get_block_txs(base_url: str, height: int) -> list[dict]:
-    d = get_block_by_height(base_url, height, True)
-    return d['transactions']
+def iter_block_txs(base_url: str, start: int, end: int, max_workers: int = 8,
+                   fields: list[str] = None) -> Iterator[tuple[int, list[dict]]]:
+    # Yields (height, txs) for every height in [start, end] in order.
+    for height, txs in iter_ordered(lambda h: get_block_txs(base_url, h, fields), start, end, max_workers):
+        yield height, txs or []
 
 
 if __name__ == "__main__":
@@ -21,8 +58,7 @@ if __name__ == "__main__":
 
     target_tx_hash = "0xdf33c5493e5b8cf694b1c59a3f9add67433fbe6cc33983eb4f415e39ba2f0a3b"
     # 632092
-    for h in range(637230, end_block_height + 1):
-        txs = get_block_txs(base_url, h)
+    for h, txs in iter_block_txs(base_url, 637230, end_block_height, fields=["hash"]):
         print(f"Block height: {h}:")
         for tx in txs:
             tx_hash = tx['hash']
@@ -0,0 +1,322 @@
+import argparse
+import json
+import os
+import sys
+
+# Every subcommand is registered with a loader that imports what the command needs and returns the function
+# that runs it. Nothing heavy is imported at module level, so e.g. `supra.py block` never loads the Aptos SDK,
+# bip_utils or cryptography.
+NETWORKS = {
+    "testnet": "https://rpc-testnet.supra.com",
+    "mainnet": "https://rpc-mainnet.supra.com",
+}
+HEAVY_MODULES = ("aptos_sdk", "bip_utils", "cryptography", "nacl", "requests")
+# When set, the CLI exits right after the subcommand's imports are resolved and prints which heavy modules got
+# loaded. Used by bench_startup.py.
+STARTUP_PROBE_ENV = "SUPRA_CLI_STARTUP_PROBE"
+
+
+class SessionState:
+    # Caches that outlive a single command when the CLI is driven by supra_daemon.py. A one-shot run only
+    # ever fills them once.
+    def __init__(self):
+        self.accounts = {}
+        self.multisig_metadata = {}
+        # A transfer_supra.SequenceAllocator, set by the daemon so that back-to-back transactions from the
+        # same sender don't re-fetch the sequence number.
+        self.allocator = None
+        self.gas_estimator = None
+
+    def reset(self) -> None:
+        self.multisig_metadata.clear()
+        if self.allocator is not None:
+            self.allocator.clear()
+
+
+state = SessionState()
+
+
+def load_account(mnemonic_file: str, account_number: int):
+    key = (mnemonic_file, account_number)
+    if key not in state.accounts:
+        from aptos_sdk.account import Account
+        from derive_keys import generate_bip44_account
+        from gen_mnemonic import load_mnemonic
+
+        private_key = generate_bip44_account(load_mnemonic(mnemonic_file), account_number)
+        state.accounts[key] = Account.load_key(private_key.hex())
+    return state.accounts[key]
+
+
+def get_gas_estimator():
+    if state.gas_estimator is None:
+        from gas_estimator import GasEstimator
+
+        state.gas_estimator = GasEstimator()
+    return state.gas_estimator
+
+
+def submit_and_wait(args, sender_account, payload) -> str:
+    # max_gas comes from the gas estimator, which only simulates kinds of transactions it has not seen yet.
+    from check_transaction import wait_for_tx
+    from transfer_supra import send_tx
+
+    estimator = get_gas_estimator()
+    max_gas, key = estimator.max_gas_for(args.url, sender_account, payload)
+    sender_addr = str(sender_account.address())
+    seq = state.allocator.allocate(sender_addr) if state.allocator is not None else None
+    tx_hash = send_tx(args.url, sender_account, payload, max_gas, sequence_number=seq, simulate=False)
+    print("Transaction submitted with hash:", tx_hash)
+    if not tx_hash.startswith("0x"):
+        if state.allocator is not None:
+            state.allocator.release(sender_addr, seq)
+        return tx_hash
+    estimator.track(tx_hash, key)
+    wait_for_tx(args.url, tx_hash, args.wait, 1)
+    estimator.learn_from_confirmed(args.url, [tx_hash])
+    estimator.save()
+    return tx_hash
+
+
+def load_balance():
+    from check_balance import get_account_supra_coin_balance
+
+    def run(args):
+        print("Balance:", get_account_supra_coin_balance(args.url, args.address))
+    return run
+
+
+def load_block():
+    from check_block import get_block_by_height
+
+    def run(args):
+        block = get_block_by_height(args.url, args.height, args.txs)
+        print(f"Block height: {args.height}, round: {block['header']['view']['round']}")
+        for tx in block.get("transactions") or []:
+            print(tx["hash"])
+    return run
+
+
+def load_tx():
+    from check_transaction import wait_for_tx, get_transaction_block_height, get_transaction_block_time
+
+    def run(args):
+        wait_for_tx(args.url, args.hash, args.wait, 1, True)
+        print("Block height:", get_transaction_block_height(args.url, args.hash))
+        print("Block time (us):", get_transaction_block_time(args.url, args.hash))
+    return run
+
+
+def load_transfer():
+    from transfer_supra import create_transfer_supra_entry_func
+
+    def run(args):
+        sender_account = load_account(args.mnemonic, args.account)
+        print(f"Transferring {args.amount} quants from {sender_account.address()} to {args.recipient}.")
+        entry_func, _ = create_transfer_supra_entry_func(args.url, args.recipient, args.amount)
+        submit_and_wait(args, sender_account, entry_func)
+    return run
+
+
+def load_scan():
+    from scan_blocks import iter_block_txs
+
+    def run(args):
+        for h, txs in iter_block_txs(args.url, args.start, args.end, args.workers, ["hash"]):
+            print(f"Block height: {h}:")
+            for tx in txs:
+                print(tx["hash"])
+                if tx["hash"] == args.target:
+                    print("Found target!")
+                    return
+    return run
+
+
+def load_derive():
+    from derive_keys import generate_bip44_account, print_keys
+    from gen_mnemonic import load_mnemonic
+
+    def run(args):
+        mnemonic = load_mnemonic(args.mnemonic)
+        for i in range(args.start, args.start + args.count):
+            print(f"\nAccount {i}:")
+            print_keys(generate_bip44_account(mnemonic, i))
+    return run
+
+
+def load_multisig_view():
+    from multisig_snapshot import address_str, get_multisig_snapshot, print_multisig_snapshot
+
+    def run(args):
+        owners, threshold = state.multisig_metadata.get(args.multisig, (None, None))
+        snapshot = get_multisig_snapshot(args.url, address_str(args.multisig),
+                                         owners=owners, threshold=threshold)
+        state.multisig_metadata[args.multisig] = (snapshot.owners, snapshot.threshold)
+        print_multisig_snapshot(snapshot)
+    return run
+
+
+def load_multisig_propose():
+    from aptos_sdk.account_address import AccountAddress
+    from propose_multisig_tx import compute_multisig_tx_payload_hash, create_propose_multisig_tx_entry_func, \
+        get_multisig_tx_sequence_from_tx_hash
+    from transfer_supra import create_transfer_supra_entry_func
+
+    def run(args):
+        sender_account = load_account(args.mnemonic, args.account)
+        multisig_addr = AccountAddress.from_str_relaxed(args.multisig)
+        entry_func, _ = create_transfer_supra_entry_func(args.url, args.recipient, args.amount)
+        entry_func = create_propose_multisig_tx_entry_func(multisig_addr, compute_multisig_tx_payload_hash(entry_func))
+        tx_hash = submit_and_wait(args, sender_account, entry_func)
+        print("Multisig sequence number:", get_multisig_tx_sequence_from_tx_hash(args.url, tx_hash))
+    return run
+
+
+def load_multisig_vote():
+    from aptos_sdk.account_address import AccountAddress
+    from vote_multisig_tx import create_vote_multisig_tx_entry_func
+
+    def run(args):
+        sender_account = load_account(args.mnemonic, args.account)
+        multisig_addr = AccountAddress.from_str_relaxed(args.multisig)
+        entry_func = create_vote_multisig_tx_entry_func(multisig_addr, args.seq, not args.reject)
+        submit_and_wait(args, sender_account, entry_func)
+    return run
+
+
+def load_multisig_execute():
+    from aptos_sdk.account_address import AccountAddress
+    from execute_multisig_tx import create_multisig, create_remove_multisig_tx_entry_func
+    from transfer_supra import create_transfer_supra_entry_func
+
+    def run(args):
+        sender_account = load_account(args.mnemonic, args.account)
+        multisig_addr = AccountAddress.from_str_relaxed(args.multisig)
+        if args.remove_rejected:
+            payload = create_remove_multisig_tx_entry_func(multisig_addr)
+        else:
+            if args.recipient is None or args.amount is None:
+                raise SystemExit("recipient and amount are required unless --remove-rejected is given")
+            entry_func, _ = create_transfer_supra_entry_func(args.url, args.recipient, args.amount)
+            payload = create_multisig(multisig_addr, entry_func)
+        submit_and_wait(args, sender_account, payload)
+    return run
+
+
+def add_signer_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--mnemonic", required=True, help="encrypted mnemonic file")
+    parser.add_argument("--account", type=int, default=0, help="BIP44 account number")
+    parser.add_argument("--wait", type=int, default=30, help="seconds to wait for the transaction")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="supra", description="Minimal Supra client.")
+    parser.add_argument("--network", choices=NETWORKS, default="testnet")
+    parser.add_argument("--url", help="RPC base URL, overrides --network")
+    parser.add_argument("--metrics", choices=("prometheus", "json"), help="print RPC metrics to stderr when done")
+    parser.add_argument("--record", metavar="CASSETTE", help="record RPC traffic to this cassette file")
+    parser.add_argument("--replay", metavar="CASSETTE", help="answer RPC calls from this cassette file")
+    parser.add_argument("--replay-realtime", action="store_true", help="replay at the recorded latencies")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("balance", help="SUPRA balance of an account")
+    p.add_argument("address")
+    p.set_defaults(load=load_balance)
+
+    p = commands.add_parser("block", help="block by height")
+    p.add_argument("height", type=int)
+    p.add_argument("--txs", action="store_true", help="list transaction hashes")
+    p.set_defaults(load=load_block)
+
+    p = commands.add_parser("tx", help="transaction status")
+    p.add_argument("hash")
+    p.add_argument("--wait", type=int, default=0)
+    p.set_defaults(load=load_tx)
+
+    p = commands.add_parser("transfer", help="transfer SUPRA")
+    p.add_argument("recipient")
+    p.add_argument("amount", type=int)
+    add_signer_args(p)
+    p.set_defaults(load=load_transfer)
+
+    p = commands.add_parser("scan", help="list transactions in a block range")
+    p.add_argument("start", type=int)
+    p.add_argument("end", type=int)
+    p.add_argument("--target", help="stop at this transaction hash")
+    p.add_argument("--workers", type=int, default=8)
+    p.set_defaults(load=load_scan)
+
+    p = commands.add_parser("derive", help="print keys derived from a mnemonic")
+    p.add_argument("--mnemonic", required=True)
+    p.add_argument("--start", type=int, default=0)
+    p.add_argument("--count", type=int, default=1)
+    p.set_defaults(load=load_derive)
+
+    multisig = commands.add_parser("multisig", help="on-chain multisig accounts")
+    multisig_commands = multisig.add_subparsers(dest="multisig_command", required=True)
+
+    p = multisig_commands.add_parser("view", help="owners, threshold and votes of pending proposals")
+    p.add_argument("multisig")
+    p.set_defaults(load=load_multisig_view)
+
+    p = multisig_commands.add_parser("propose", help="propose a SUPRA transfer from the multisig account")
+    p.add_argument("multisig")
+    p.add_argument("recipient")
+    p.add_argument("amount", type=int)
+    add_signer_args(p)
+    p.set_defaults(load=load_multisig_propose)
+
+    p = multisig_commands.add_parser("vote", help="vote on a pending proposal")
+    p.add_argument("multisig")
+    p.add_argument("seq", type=int)
+    p.add_argument("--reject", action="store_true", help="vote against instead of for")
+    add_signer_args(p)
+    p.set_defaults(load=load_multisig_vote)
+
+    p = multisig_commands.add_parser("execute", help="execute the next proposal, or remove it if rejected")
+    p.add_argument("multisig")
+    p.add_argument("recipient", nargs="?")
+    p.add_argument("amount", type=int, nargs="?")
+    p.add_argument("--remove-rejected", action="store_true")
+    add_signer_args(p)
+    p.set_defaults(load=load_multisig_execute)
+
+    return parser
+
+
+def main(argv: [str] = None) -> None:
+    args = build_parser().parse_args(argv)
+    args.url = (args.url or NETWORKS[args.network]).rstrip("/")
+    if args.record or args.replay:
+        import rpc_client
+
+        if args.record:
+            rpc_client.start_recording(args.record)
+        if args.replay:
+            rpc_client.start_replay(args.replay, args.replay_realtime)
+    run = args.load()
+    if os.environ.get(STARTUP_PROBE_ENV):
+        loaded = sorted({name.split(".")[0] for name in sys.modules} & set(HEAVY_MODULES))
+        print(",".join(loaded))
+        return
+    try:
+        run(args)
+    finally:
+        if args.record or args.replay:
+            rpc_client.stop_recording()
+            rpc_client.stop_replay()
+        if args.metrics:
+            print_metrics(args.metrics, sys.stderr)
+
+
+def print_metrics(fmt: str, file=sys.stdout) -> None:
+    from metrics import registry
+
+    if fmt == "prometheus":
+        print(registry.prometheus_text(), end="", file=file)
+    else:
+        print(json.dumps(registry.snapshot()), file=file)
+
+
+if __name__ == "__main__":
+    main()
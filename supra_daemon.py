@@ -0,0 +1,129 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+
+import supra
+from metrics import registry
+
+# Long-lived mode for the supra CLI. Requests are JSON lines such as
+#   {"id": 1, "argv": ["balance", "0x1"]}
+# and every request gets exactly one JSON line back:
+#   {"id": 1, "ok": true, "output": ["Balance: 100"], "elapsed_ms": 12.3}
+# The pooled RPC session, cached chain ids, unlocked accounts, sequence numbers and multisig metadata all stay
+# warm between commands. Besides CLI argv, "reset" drops the warm caches (keys stay unlocked) and "ping" answers
+# immediately, and "metrics" returns the RPC metrics collected so far in the Prometheus text format. Every command
+# runs against the daemon's node; requests passing --url or --network are rejected.
+
+# Commands print to stdout, which is process-global, so they run one at a time.
+command_lock = threading.Lock()
+
+
+def check_node_args(argv: list[str], base_url: str) -> None:
+    # The warm sequence numbers and multisig metadata belong to the daemon's node, so a request cannot pick another.
+    parser = supra.build_parser()
+    parser.set_defaults(network=None)
+    args = parser.parse_args(argv)
+    if args.url is not None or args.network is not None:
+        parser.error(f"--url and --network are not accepted by the daemon, which serves {base_url}")
+
+
+def handle_request(request: dict, base_url: str) -> dict:
+    argv = request.get("argv") or []
+    reply = {"id": request.get("id")}
+    start = time.perf_counter()
+    if argv == ["ping"]:
+        reply.update(ok=True, output=[])
+    elif argv == ["reset"]:
+        supra.state.reset()
+        reply.update(ok=True, output=[])
+    elif argv == ["metrics"]:
+        reply.update(ok=True, output=registry.prometheus_text().splitlines())
+    else:
+        out = io.StringIO()
+        with command_lock, contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            try:
+                check_node_args(argv, base_url)
+                supra.main(["--url", base_url, *argv])
+                ok = True
+            except SystemExit as e:
+                ok = not e.code
+            except Exception as e:
+                print(f"{type(e).__name__}: {e}")
+                ok = False
+        reply.update(ok=ok, output=out.getvalue().splitlines())
+    reply["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return reply
+
+
+def handle_line(line: str, base_url: str) -> str:
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as e:
+        return json.dumps({"id": None, "ok": False, "output": [f"invalid JSON: {e}"]})
+    return json.dumps(handle_request(request, base_url))
+
+
+def serve_stdin(base_url: str) -> None:
+    for line in sys.stdin:
+        if line.strip():
+            sys.stdout.write(handle_line(line, base_url) + "\n")
+            sys.stdout.flush()
+
+
+def serve_socket(base_url: str, socket_path: str) -> None:
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if line.strip():
+                    self.wfile.write((handle_line(line.decode(), base_url) + "\n").encode())
+                    self.wfile.flush()
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with socketserver.ThreadingUnixStreamServer(socket_path, Handler) as server:
+        os.chmod(socket_path, 0o600)
+        print(f"Listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(socket_path)
+
+
+def unlock_accounts(mnemonic_file: str, account_numbers: [int]) -> None:
+    # Decrypt the mnemonic once and cache every requested account, so signing commands never prompt.
+    from aptos_sdk.account import Account
+    from derive_keys import generate_bip44_account
+    from gen_mnemonic import load_mnemonic
+
+    mnemonic = load_mnemonic(mnemonic_file)
+    for account_number in account_numbers:
+        private_key = generate_bip44_account(mnemonic, account_number)
+        supra.state.accounts[(mnemonic_file, account_number)] = Account.load_key(private_key.hex())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve supra CLI commands as JSON lines over stdin or a socket.")
+    parser.add_argument("--network", choices=supra.NETWORKS, default="testnet")
+    parser.add_argument("--url", help="RPC base URL, overrides --network")
+    parser.add_argument("--socket", help="listen on this Unix socket instead of stdin")
+    parser.add_argument("--mnemonic", help="encrypted mnemonic file to unlock at startup")
+    parser.add_argument("--accounts", type=int, nargs="*", default=[0], help="account numbers to unlock")
+    args = parser.parse_args()
+    base_url = (args.url or supra.NETWORKS[args.network]).rstrip("/")
+
+    from transfer_supra import SequenceAllocator
+
+    supra.state.allocator = SequenceAllocator(base_url)
+    if args.mnemonic:
+        unlock_accounts(args.mnemonic, args.accounts)
+
+    if args.socket:
+        serve_socket(base_url, args.socket)
+    else:
+        serve_stdin(base_url)
@@ -6,6 +6,8 @@ from aptos_sdk.transactions import Script, EntryFunction
 
 
 class TransactionPayload:
+    __slots__ = ("variant", "value")
+
     SCRIPT: int = 0
     SCRIPT_FUNCTION: int = 2
     MULTISIG: int = 3
@@ -53,6 +55,8 @@ class TransactionPayload:
 
 
 class MultiSigTransactionPayload:
+    __slots__ = ("transaction_payload",)
+
     transaction_payload: EntryFunction
 
     def __init__(self, transaction_payload: EntryFunction):
@@ -71,6 +75,8 @@ class MultiSigTransactionPayload:
 
 
 class Multisig:
+    __slots__ = ("multisig_address", "transaction_payload")
+
     multisig_address: AccountAddress
     transaction_payload: MultiSigTransactionPayload
 
@@ -95,9 +101,16 @@ class Multisig:
         return cls(multisig_address, transaction_payload)
 
 
+def fields_of(obj: Any) -> dict[str, Any]:
+    # The payload classes above use __slots__ and have no __dict__; the SDK classes they contain do.
+    if hasattr(obj, "__dict__"):
+        return obj.__dict__
+    return {k: getattr(obj, k) for k in type(obj).__slots__}
+
+
 def payload_to_dict(obj: Any) -> dict[str, Any]:
     result = {}
-    for k, v in obj.__dict__.items():
+    for k, v in fields_of(obj).items():
         if k.startswith("_") or k == "prehash":
             pass
         elif isinstance(v, TransactionPayload):
@@ -117,7 +130,7 @@ def payload_to_dict(obj: Any) -> dict[str, Any]:
             result[k] = [list(item) for item in v]
         elif k == "expiration_timestamps_secs":
             result["expiration_timestamp_secs"] = v
-        elif hasattr(v, "__dict__"):
+        elif hasattr(v, "__dict__") or hasattr(type(v), "__slots__"):
             result[k] = payload_to_dict(v)  # Recursively handle nested objects
         else:
             result[k] = v
@@ -1,20 +1,23 @@
+import functools
+import re
+import threading
 from types import MethodType
 from typing import List, Any, Callable
 
-import requests
 import time
 import hashlib
 from aptos_sdk.account import Account
 from aptos_sdk.authenticator import Ed25519Authenticator, Authenticator
 from aptos_sdk.ed25519 import Signature, PublicKey, PrivateKey
-from aptos_sdk.bcs import Serializer
+from aptos_sdk.bcs import Serializer, Deserializer
 from aptos_sdk.transactions import RawTransaction, TypeTag, ModuleId, AccountAddress, EntryFunction, \
     TransactionArgument, Script, MultiAgentRawTransaction
 
-from airdrop import get_account_addr
 from check_balance import get_account_supra_coin_balance, get_account, account_exists, get_json
 from check_block import get_block_round_by_height
 from check_transaction import wait_for_tx, get_transaction_block_time, get_transaction_block_height
+from metrics import span
+from rpc_client import post_json
 from transaction_payload import TransactionPayload, payload_to_dict, Multisig
 
 
@@ -22,17 +25,76 @@ def get_account_seq_num(base_url: str, account_addr: str) -> int:
     return int(get_account(base_url, account_addr)["sequence_number"])
 
 
-def post_json(url: str, d: dict) -> dict:
-    resp = requests.post(url, json=d)
-    try:
-        return resp.json()
-    except:
-        print(f"post_json: error decoding JSON {resp}, with error text: {resp.text}")
-        return {}
+@functools.lru_cache
+def get_chain_id(base_url: str) -> int:
+    # Errors are raised, not cached: the node answers with a {"message"} dict, or get_json with {} on a bad body.
+    res = get_json(f"{base_url}/rpc/v1/transactions/chain_id")
+    if isinstance(res, bool) or not isinstance(res, (int, str)) or not str(res).isdigit():
+        message = res.get("message", res) if isinstance(res, dict) else res
+        raise Exception(f"Failed to get the chain id from {base_url}: {message}")
+    return int(res)
+
+
+class SequenceAllocator:
+    # Hands out sender sequence numbers locally, so that many transactions from the same sender can be
+    # in flight at once. The on-chain value is only fetched the first time a sender is seen, or after `reset`.
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.lock = threading.Lock()
+        self.next_seq: dict[str, int] = {}
+        # Numbers below next_seq that were given back with `release`, handed out again lowest first.
+        self.released: dict[str, set[int]] = {}
+        self.sender_locks: dict[str, threading.Lock] = {}
+
+    def sender_lock(self, account_addr: str) -> threading.Lock:
+        with self.lock:
+            return self.sender_locks.setdefault(account_addr, threading.Lock())
+
+    def allocate(self, account_addr: str) -> int:
+        with self.sender_lock(account_addr):
+            released = self.released.get(account_addr)
+            if released:
+                seq = min(released)
+                released.remove(seq)
+                return seq
+            if account_addr not in self.next_seq:
+                self.next_seq[account_addr] = get_account_seq_num(self.base_url, account_addr)
+            seq = self.next_seq[account_addr]
+            self.next_seq[account_addr] = seq + 1
+            return seq
+
+    def reset(self, account_addr: str) -> None:
+        # Re-reads the on-chain value on the next `allocate`. Only safe while none of the sender's transactions are
+        # in flight, else their numbers are handed out again; use `release` for a number that was never used.
+        with self.sender_lock(account_addr):
+            self.next_seq.pop(account_addr, None)
+            self.released.pop(account_addr, None)
+
+    def release(self, account_addr: str, seq: int) -> None:
+        # Gives back a sequence number that will never reach the chain. The next `allocate` reuses it, so the gap
+        # it would leave is filled while the sender's later numbers are still in flight.
+        with self.sender_lock(account_addr):
+            if account_addr not in self.next_seq or seq >= self.next_seq[account_addr]:
+                return
+            released = self.released.setdefault(account_addr, set())
+            released.add(seq)
+            # Numbers released from the top go back to the counter.
+            while self.next_seq[account_addr] - 1 in released:
+                self.next_seq[account_addr] -= 1
+                released.remove(self.next_seq[account_addr])
+
+    def clear(self) -> None:
+        with self.lock:
+            self.next_seq.clear()
+            self.released.clear()
+
+
+def simulate_tx(base_url: str, simulate_tx_dict: dict) -> dict:
+    return post_json(f"{base_url}/rpc/v1/transactions/simulate", simulate_tx_dict)
 
 
 def simulate_tx_json(base_url: str, simulate_tx_dict: dict):
-    res_data = post_json(f"{base_url}/rpc/v1/transactions/simulate", simulate_tx_dict)
+    res_data = simulate_tx(base_url, simulate_tx_dict)
     try:
         res = res_data["output"]["Move"]["vm_status"]
     except:
@@ -45,6 +107,13 @@ def submit_tx_json(base_url: str, send_tx_dict: dict) -> str:
     return str(post_json(f"{base_url}/rpc/v1/transactions/submit", send_tx_dict))
 
 
+def submit_error_code(response: str) -> str | None:
+    # Rejections by the node name an upper-case status, e.g. SEQUENCE_NUMBER_TOO_OLD. Anything else (an HTTP error
+    # page, a rate limit, an empty reply) says nothing about the transaction itself.
+    match = re.search(r"\b[A-Z][A-Z0-9]*(?:_[A-Z0-9]+)+\b", response)
+    return match.group(0) if match else None
+
+
 def supra_prehash(self: RawTransaction | MultiAgentRawTransaction) -> bytes:
     salt = b"SUPRA::RawTransactionWithData" if isinstance(self,
                                                           MultiAgentRawTransaction) else b"SUPRA::RawTransaction"
@@ -74,7 +143,7 @@ def create_raw_tx(
         base_url: str = None,
 ) -> RawTransaction:
     tx_expiry_time = int(time.time()) + tx_expiry_timespan
-    chain_id = chain_id or get_json(f"{base_url}/rpc/v1/transactions/chain_id")
+    chain_id = chain_id or get_chain_id(base_url)
     payload = TransactionPayload(payload_content)
     raw_tx = RawTransaction(sender_addr, sender_sequence_number, payload, max_gas, gas_unit_price,
                             tx_expiry_time, chain_id)
@@ -82,6 +151,21 @@ def create_raw_tx(
     return raw_tx
 
 
+def deserialize_raw_tx(raw_tx_bytes: bytes) -> RawTransaction:
+    deserializer = Deserializer(raw_tx_bytes)
+    raw_tx = RawTransaction(
+        AccountAddress.deserialize(deserializer),
+        deserializer.u64(),
+        TransactionPayload.deserialize(deserializer),
+        deserializer.u64(),
+        deserializer.u64(),
+        deserializer.u64(),
+        deserializer.u8(),
+    )
+    raw_tx.prehash = MethodType(supra_prehash, raw_tx)
+    return raw_tx
+
+
 def auth_to_dict(obj: Any) -> dict[str, Any]:
     result = {}
     if isinstance(obj, Authenticator):
@@ -126,26 +210,44 @@ def send_tx(base_url: str,
             sender_account: Account,
             payload_content: EntryFunction | Multisig | Script,
             max_gas: int = 500_000,
-            gas_price: int = 100) -> str:
-    raw_txn = create_raw_tx(
-        sender_account.address(),
-        get_account_seq_num(base_url, str(sender_account.address())),
-        payload_content,
-        max_gas,
-        gas_price,
-        base_url=base_url,
-    )
-    sim_tx_dict = create_simulate_tx_dict(sender_account.public_key(), raw_txn)
-    simulate_tx_json(base_url, sim_tx_dict)
-    send_tx_dict = create_send_tx_dict(sender_account, raw_txn)
-    return submit_tx_json(base_url, send_tx_dict)
+            gas_price: int = 100,
+            sequence_number: int = None,
+            simulate: bool = True) -> str:
+    with span("send_tx"):
+        with span("send_tx.build"):
+            if sequence_number is None:
+                sequence_number = get_account_seq_num(base_url, str(sender_account.address()))
+            raw_txn = create_raw_tx(
+                sender_account.address(),
+                sequence_number,
+                payload_content,
+                max_gas,
+                gas_price,
+                base_url=base_url,
+            )
+        if simulate:
+            with span("send_tx.simulate"):
+                sim_tx_dict = create_simulate_tx_dict(sender_account.public_key(), raw_txn)
+                simulate_tx_json(base_url, sim_tx_dict)
+        with span("send_tx.sign"):
+            send_tx_dict = create_send_tx_dict(sender_account, raw_txn)
+        with span("send_tx.submit"):
+            return submit_tx_json(base_url, send_tx_dict)
 
 
 def create_transfer_supra_entry_func(
         base_url: str,
         rcpt_account_addr: str,
-        amount: int):
-    max_gas = 10 if account_exists(base_url, rcpt_account_addr) else 1020
+        amount: int,
+        estimator=None):
+    # `estimator` is an optional gas_estimator.GasEstimator; without one, or before it has seen a transfer of this
+    # kind, max_gas is a fixed guess.
+    recipient_exists = account_exists(base_url, rcpt_account_addr)
+    max_gas = 10 if recipient_exists else 1020
+    if estimator is not None:
+        from gas_estimator import transfer_gas_key
+
+        max_gas = estimator.estimate_key(transfer_gas_key(recipient_exists)) or max_gas
     entry_func = create_entry_func(
         "supra_account",
         "transfer",
@@ -155,6 +257,8 @@ def create_transfer_supra_entry_func(
 
 
 if __name__ == "__main__":
+    from airdrop import get_account_addr
+
     is_testnet = True
     base_url = "https://rpc-testnet1.supra.com" if is_testnet else "https://rpc-mainnet.supra.com"
     mnemonic_file = "mnemonic_multisig.enc" if is_testnet else "mnemonic_multisig_mainnet.enc"
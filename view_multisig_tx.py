@@ -1,6 +1,9 @@
-from aptos_sdk.account_address import AccountAddress
+from typing import TYPE_CHECKING
 
-from transfer_supra import post_json
+from rpc_client import post_json
+
+if TYPE_CHECKING:
+    from aptos_sdk.account_address import AccountAddress
 
 
 def invoke_module_view_function(base_url: str,
@@ -20,7 +23,7 @@ def invoke_module_view_function(base_url: str,
         return {}
 
 
-def get_multisig_account_owners(base_url: str, account_addr: AccountAddress) -> [str]:
+def get_multisig_account_owners(base_url: str, account_addr: "AccountAddress") -> [str]:
     res_data = invoke_module_view_function(
         base_url,
         "0x1::multisig_account::owners",
@@ -29,7 +32,7 @@ def get_multisig_account_owners(base_url: str, account_addr: AccountAddress) ->
     return res_data[0]
 
 
-def get_multisig_account_last_resolved_seq(base_url: str, account_addr: AccountAddress) -> int:
+def get_multisig_account_last_resolved_seq(base_url: str, account_addr: "AccountAddress") -> int:
     res_data = invoke_module_view_function(
         base_url,
         "0x1::multisig_account::last_resolved_sequence_number",
@@ -38,7 +41,7 @@ def get_multisig_account_last_resolved_seq(base_url: str, account_addr: AccountA
     return int(res_data[0])
 
 
-def get_multisig_account_next_sequence_number(base_url: str, account_addr: AccountAddress) -> int:
+def get_multisig_account_next_sequence_number(base_url: str, account_addr: "AccountAddress") -> int:
     res_data = invoke_module_view_function(
         base_url,
         "0x1::multisig_account::next_sequence_number",
@@ -47,7 +50,7 @@ def get_multisig_account_next_sequence_number(base_url: str, account_addr: Accou
     return int(res_data[0])
 
 
-def get_multisig_num_signatures_required(base_url: str, account_addr: AccountAddress) -> int:
+def get_multisig_num_signatures_required(base_url: str, account_addr: "AccountAddress") -> int:
     res_data = invoke_module_view_function(
         base_url,
         "0x1::multisig_account::num_signatures_required",
@@ -56,7 +59,7 @@ def get_multisig_num_signatures_required(base_url: str, account_addr: AccountAdd
     return int(res_data[0])
 
 
-def get_multisig_tx_can_be_executed(base_url: str, account_addr: AccountAddress, seq_num: int) -> bool:
+def get_multisig_tx_can_be_executed(base_url: str, account_addr: "AccountAddress", seq_num: int) -> bool:
     res_data = invoke_module_view_function(
         base_url,
         "0x1::multisig_account::can_be_executed",
@@ -65,7 +68,7 @@ def get_multisig_tx_can_be_executed(base_url: str, account_addr: AccountAddress,
     return bool(res_data[0])
 
 
-def get_multisig_tx_vote(base_url: str, account_addr: AccountAddress, seq_num: int, voter_addr: AccountAddress) -> (
+def get_multisig_tx_vote(base_url: str, account_addr: "AccountAddress", seq_num: int, voter_addr: "AccountAddress") -> (
         bool, bool):
     res_data = invoke_module_view_function(
         base_url,
@@ -75,7 +78,18 @@ def get_multisig_tx_vote(base_url: str, account_addr: AccountAddress, seq_num: i
     return res_data
 
 
+def get_multisig_tx_creation_time(base_url: str, account_addr: "AccountAddress", seq_num: int) -> int:
+    res_data = invoke_module_view_function(
+        base_url,
+        "0x1::multisig_account::get_transaction",
+        [str(account_addr), str(seq_num)],
+    )
+    return int(res_data[0]["creation_time_secs"])
+
+
 if __name__ == "__main__":
+    from aptos_sdk.account_address import AccountAddress
+
     is_testnet = False
     base_url = "https://rpc-testnet1.supra.com/" if is_testnet else "https://rpc-mainnet.supra.com"
     mnemonic_file = "mnemonic_multisig.enc" if is_testnet else "mnemonic_multisig_mainnet.enc"